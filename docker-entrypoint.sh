@@ -24,8 +24,11 @@ echo "Database is ready! Running Django setup..."
 # This creates/updates database tables based on models
 python manage.py migrate --noinput
 
-# Collect static files
-# This gathers all static files (CSS, JS, images) into STATIC_ROOT for Nginx to serve
+# Build the CSS/JS bundles and image variants (unchanged images are skipped), then collect static files
+# This gathers all static files (CSS, JS, images) into STATIC_ROOT for Nginx to serve,
+# with content-hashed names
+python manage.py build_bundles
+python manage.py build_images
 python manage.py collectstatic --noinput
 
 echo "Starting Gunicorn server..."
@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import Contact
+from django.http import StreamingHttpResponse
+from django.contrib.admin.views.main import SEARCH_VAR
+from .models import Contact, EmailOutbox
+from . import export, fulltext, pagination
 from django import forms
 
 
@@ -10,9 +13,61 @@ class ContactAdmin(admin.ModelAdmin):
     search_fields = ['name', 'email', 'subject', 'message']
     readonly_fields = ['created_at']
     ordering = ['-created_at']
+    # Estimated counts and keyset pages on the (created_at, id) index (portfolio_app.pagination)
+    paginator = pagination.ContactPaginator
+    show_full_result_count = False  # Skips a second COUNT(*) of the whole table
+    actions = ['export_csv', 'export_jsonl']
+
+    def get_changelist(self, request, **kwargs):
+        return pagination.ContactChangeList
+
+    def _fulltext_term(self, request):
+        """Return the search term if MySQL FULLTEXT search applies to it, else None."""
+        term = request.GET.get(SEARCH_VAR, '')
+        if fulltext.is_supported() and fulltext.build_query(term) is not None:
+            return term
+        return None
+
+    def get_search_results(self, request, queryset, search_term):
+        # MATCH ... AGAINST on the FULLTEXT index instead of LIKE scans (MySQL only)
+        results = fulltext.search(queryset, search_term)
+        if results is None:
+            return super().get_search_results(request, queryset, search_term)
+        return results, False
+
+    def get_ordering(self, request):
+        # Best matches first unless the admin sorts by a column
+        if self._fulltext_term(request) is not None:
+            return ['-search_rank', *self.ordering]
+        return super().get_ordering(request)
+
+    def _export(self, request, queryset, fmt):
+        # Streamed in chunks (portfolio_app.export); gzipped on the wire when the browser accepts it
+        compress = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+        response = StreamingHttpResponse(export.stream(queryset, fmt, compress), content_type=export.CONTENT_TYPES[fmt])
+        response['Content-Disposition'] = f'attachment; filename="{export.filename(fmt)}"'
+        response['Vary'] = 'Accept-Encoding'
+        if compress:
+            response['Content-Encoding'] = 'gzip'
+        return response
+
+    @admin.action(description='Export selected submissions as CSV')
+    def export_csv(self, request, queryset):
+        return self._export(request, queryset, 'csv')
+
+    @admin.action(description='Export selected submissions as JSON Lines')
+    def export_jsonl(self, request, queryset):
+        return self._export(request, queryset, 'jsonl')
+
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ['contact', 'status', 'attempts', 'created_at', 'sent_at']
+    list_filter = ['status']
+    readonly_fields = ['contact', 'attempts', 'last_error', 'created_at', 'queued_at', 'sent_at']
+    ordering = ['-id']
 
 # Register models
 admin.site.register(Contact, ContactAdmin)
+admin.site.register(EmailOutbox, EmailOutboxAdmin)
 
 
 admin.site.site_title = "Admin Panel" #on tab title
@@ -0,0 +1,206 @@
+"""
+Native async views for the ASGI deployment.
+
+These are async versions of ``contact``, ``refresh_captcha_ajax``,
+``health_check`` and ``ready`` from ``views.py``. Under an ASGI worker a request that waits
+on the database, the broker or a slow SMTP server no longer holds one of the
+few gunicorn request slots: blocking work runs in a thread pool while the
+event loop keeps serving other connections.
+
+They are routed instead of the sync views when ``ASYNC_VIEWS_ENABLED`` is set.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.http import JsonResponse
+from django.shortcuts import redirect, render
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+from django.views.decorators.vary import vary_on_headers
+
+from . import captcha, duplicates, page_cache, ratelimit, readiness, worker_monitor
+from .forms import ContactForm
+from .views import (
+    CELERY_AVAILABLE,
+    duplicate_submission,
+    is_celery_worker_available,
+    send_contact_email_sync,
+)
+
+if CELERY_AVAILABLE:
+    from .tasks import send_contact_email
+
+# Blocking email I/O (broker publish, SMTP fallback) waits in its own pool so a
+# slow server does not exhaust the event loop's small default executor. The pool
+# is created on first use, so processes that never send (WSGI workers, Celery,
+# management commands) do not get one, and again after a fork.
+_email_executor = {'pid': None, 'pool': None}
+_email_executor_lock = threading.Lock()
+
+
+def get_email_executor():
+    """Return the email thread pool of this process, creating it if needed."""
+    if _email_executor['pid'] != os.getpid():
+        with _email_executor_lock:
+            if _email_executor['pid'] != os.getpid():
+                _email_executor['pool'] = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'ASYNC_EMAIL_THREADS', 32), thread_name_prefix='async-email'
+                )
+                _email_executor['pid'] = os.getpid()
+    return _email_executor['pool']
+
+
+async def aissue_captcha(request):
+    """Async version of ``views.issue_captcha``."""
+    if captcha.is_stateless():
+        return captcha.new_challenge()
+    captcha_question, captcha_answer = captcha.generate_captcha()
+    await request.session.aset('captcha_answer', (captcha_question, captcha_answer))
+    return captcha.Challenge(captcha_question, '')
+
+
+async def _dispatch_contact_email(name, email, subject, message):
+    """
+    Send the contact notification without blocking the event loop.
+
+    Queues the Celery task when workers are available and falls back to SMTP
+    in a worker thread otherwise.
+    """
+    if is_celery_worker_available():
+        try:
+            result = await sync_to_async(send_contact_email.delay, thread_sensitive=False, executor=get_email_executor())(
+                name, email, subject, message
+            )
+            worker_monitor.record_success()
+            print(f"✅ Email sent Asynchronously (Task ID: {result.id})")
+            return True
+        except Exception as celery_error:
+            print(f"Async email failed, using synchronous email: {celery_error}")
+            worker_monitor.record_failure()
+    # thread_sensitive=False keeps a slow SMTP server from serialising other requests
+    return await sync_to_async(send_contact_email_sync, thread_sensitive=False, executor=get_email_executor())(
+        name, email, subject, message
+    )
+
+
+@ratelimit.limit('contact')
+@vary_on_headers('User-Agent')
+async def contact(request):
+    """
+    Async version of ``views.contact``.
+
+    Args:
+        request: HTTP request object
+
+    Returns:
+        HttpResponse: Rendered home page with form or redirect to the contact section
+    """
+    if request.method == 'POST':
+        captcha_answer = None
+        if not captcha.is_stateless():
+            captcha_answer = await request.session.aget('captcha_answer')
+
+        form = ContactForm(request.POST, captcha_answer=captcha_answer)
+        # Validation touches the cache (CAPTCHA replay check) but not the
+        # database, so it need not queue behind ORM work on the shared thread
+        if not await sync_to_async(form.is_valid, thread_sensitive=False)():
+            if 'captcha' in form.errors:
+                messages.error(request, 'Incorrect CAPTCHA answer. Please try again.')
+            return redirect('/#contact-msg')
+
+        fingerprint = duplicates.fingerprint(form.cleaned_data)
+        if not await sync_to_async(duplicates.claim, thread_sensitive=False)(fingerprint):
+            return await sync_to_async(duplicate_submission)(request)
+
+        # transaction.atomic() has no async API, so the whole transaction runs in one thread
+        with_outbox = getattr(settings, 'EMAIL_OUTBOX_ENABLED', True)
+        if not await sync_to_async(duplicates.save_once)(form, fingerprint, with_outbox):
+            return await sync_to_async(duplicate_submission)(request, counted=True)
+
+        if with_outbox:
+            if not captcha.is_stateless():
+                # Generate new CAPTCHA for next submission
+                await aissue_captcha(request)
+            messages.success(request, 'Your message has been sent successfully!')
+            return redirect('/#contact-msg')
+
+        if not settings.EMAIL_HOST_PASSWORD:
+            messages.error(request, 'Email configuration error: EMAIL_HOST_PASSWORD not set.')
+            return redirect('/#contact-msg')
+
+        data = form.cleaned_data
+        try:
+            email_sent = await _dispatch_contact_email(data['name'], data['email'], data['subject'], data['message'])
+        except Exception as e:
+            print(f"Unexpected error: {e}")  # For debugging
+            messages.error(request, 'An unexpected error occurred while processing your request.')
+            return redirect('/#contact-msg')
+
+        if email_sent:
+            if not captcha.is_stateless():
+                await aissue_captcha(request)
+            messages.success(request, 'Your message has been sent successfully!')
+        else:
+            messages.error(request, 'Failed to send email. Please try again later.')
+        return redirect('/#contact-msg')
+
+    challenge = await aissue_captcha(request)
+
+    if getattr(settings, 'HOMEPAGE_CACHE_ENABLED', True):
+        # Reading flash messages may need the session: load it here, so the
+        # splice only does cache and template work and can run in any thread
+        await request.session.aitems()
+        return await sync_to_async(page_cache.render_homepage, thread_sensitive=False)(request, challenge)
+
+    def render_page():
+        form = ContactForm(captcha_challenge=challenge)
+        response = render(request, 'index.html', {'form': form})
+        # Clear any existing messages when page loads normally
+        messages.get_messages(request).used = True
+        return response
+
+    # The full render may reach the database (context processors), so it keeps
+    # to the thread the ORM expects
+    return await sync_to_async(render_page)()
+
+
+@csrf_exempt
+@ratelimit.limit('captcha_refresh', json_response=True)
+async def refresh_captcha_ajax(request):
+    """
+    Async version of ``views.refresh_captcha_ajax``.
+    """
+    if request.method == 'POST':
+        challenge = await aissue_captcha(request)
+        return JsonResponse({
+            'question': challenge.question,
+            'token': challenge.token,
+            'success': True
+        })
+
+    return JsonResponse({'success': False, 'error': 'Invalid request method'})
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+async def health_check(request):
+    """Health check endpoint for AWS ECS load balancer"""
+    return JsonResponse({
+        'status': 'healthy',
+        'service': 'portfolio-django',
+        'timestamp': timezone.now().isoformat()
+    })
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+async def ready(request):
+    """Async version of ``views.ready``; the snapshot is an in-memory read."""
+    is_ready, payload = readiness.snapshot()
+    return JsonResponse(payload, status=200 if is_ready else 503)
@@ -0,0 +1,121 @@
+"""
+Small timing helpers shared by the ``bench_*`` management commands.
+"""
+
+import socketserver
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def percentile(values, pct):
+    """Return the ``pct`` percentile of ``values`` (nearest-rank)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def run(func, iterations, concurrency=1, warmup=0):
+    """
+    Call ``func`` ``iterations`` times and time every call.
+
+    Args:
+        func: Zero-argument callable to benchmark
+        iterations (int): Number of timed calls
+        concurrency (int): Number of threads issuing calls
+        warmup (int): Untimed calls made before measuring
+
+    Returns:
+        dict: Total wall time and the list of per-call latencies in seconds
+    """
+    for _ in range(warmup):
+        func()
+
+    def timed(_):
+        start = time.perf_counter()
+        func()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            latencies = list(pool.map(timed, range(iterations)))
+    else:
+        latencies = [timed(i) for i in range(iterations)]
+    return {'wall': time.perf_counter() - start, 'latencies': latencies}
+
+
+def summarize(label, result):
+    """Return a one-line summary with throughput and latency percentiles."""
+    latencies = result['latencies']
+    rate = len(latencies) / result['wall'] if result['wall'] else 0.0
+    return (
+        f"{label:<24} {rate:>10.1f}/s   "
+        f"p50 {percentile(latencies, 50) * 1000:>8.3f} ms   "
+        f"p99 {percentile(latencies, 99) * 1000:>8.3f} ms"
+    )
+
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """Minimal SMTP server that accepts and discards every message."""
+
+    handshake_delay = 0.0
+
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        # Stands in for the TCP + STARTTLS + AUTH cost of a real server
+        time.sleep(self.handshake_delay)
+        self.reply('220 sink ready')
+        in_data = False
+        for raw in self.rfile:
+            line = raw.decode(errors='replace').rstrip('\r\n')
+            if in_data:
+                if line == '.':
+                    in_data = False
+                    self.reply('250 OK queued')
+                continue
+            command = line[:4].upper()
+            if command == 'EHLO':
+                self.reply('250-sink')
+                self.reply('250 8BITMIME')
+            elif command == 'DATA':
+                in_data = True
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('250 OK')
+
+
+def start_smtp_sink(handshake_delay=0.0):
+    """
+    Start a local SMTP sink in a background thread.
+
+    Args:
+        handshake_delay (float): Seconds each connection waits before the greeting
+
+    Returns:
+        socketserver.ThreadingTCPServer: The running server; call ``shutdown()`` when done
+    """
+    handler = type('DelayedSMTPSinkHandler', (SMTPSinkHandler,), {'handshake_delay': handshake_delay})
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def smtp_sink_settings(server, password=''):
+    """Return email settings that point Django at a sink from ``start_smtp_sink``."""
+    return {
+        'EMAIL_BACKEND': 'django.core.mail.backends.smtp.EmailBackend',
+        'EMAIL_HOST': '127.0.0.1',
+        'EMAIL_PORT': server.server_address[1],
+        'EMAIL_USE_TLS': False,
+        'EMAIL_HOST_USER': '',
+        'EMAIL_HOST_PASSWORD': password,
+    }
@@ -0,0 +1,500 @@
+"""
+Two-tier cache backend: a small per-process LRU in front of Redis.
+
+Without ``CACHES`` Django gave every gunicorn worker its own LocMemCache, so
+the page cache and the CAPTCHA nonces were not shared between workers or
+pods. ``TwoTierCache`` keeps the data in Redis (through the shared pool of
+``portfolio_app.redis_client``) and serves hot keys from a bounded LRU in
+each process, so reading the homepage costs no network round trip.
+
+Coherence:
+
+- Every write (set, delete, delete_if, incr, touch, clear) is published on a Redis
+  pub/sub channel. A listener thread in each process drops the key from its
+  local tier when the message arrives.
+- Values enter the local tier only when read from Redis, only while the
+  listener is subscribed, and never if an invalidation arrived during the
+  read. A local copy expires with the Redis key, after LOCAL_TIMEOUT
+  seconds at the latest.
+- The local tier is cleared whenever the listener (re)subscribes, since
+  messages published while it was away are lost.
+
+If Redis is unreachable, operations fall back to the local tier alone, the
+per-process behaviour the project had before. ``add()`` (CAPTCHA nonces,
+render locks) is always decided by Redis while it is up, and
+``delete_if()`` releases such a lock only for the holder of its value.
+
+``clear()`` deletes only the keys under KEY_PREFIX. The Redis database also
+holds the Celery queues, so it never runs FLUSHDB.
+
+Hit, miss and error counters per tier are reported by ``stats()`` on
+``/metrics/``.
+"""
+
+import logging
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from . import redis_client
+from .redis_client import RedisError
+
+logger = logging.getLogger(__name__)
+
+CLEAR_ALL = '*'  # Invalidation message for clear(); real keys always contain ':'
+
+_REMOTE_ERRORS = (RedisError, RuntimeError, OSError)
+
+# KEYS[1]: key; ARGV: expected serialized value, invalidation channel
+# Returns 1 if the key held the value and was deleted, else 0
+_DELETE_IF = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+redis.call('DEL', KEYS[1])
+redis.call('PUBLISH', ARGV[2], KEYS[1])
+return 1
+"""
+
+# KEYS[1]: key; ARGV: delta, invalidation channel
+# Returns the new value, or nil if the key does not exist (it is not created)
+_INCR = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return nil
+end
+local value = redis.call('INCRBY', KEYS[1], ARGV[1])
+redis.call('PUBLISH', ARGV[2], KEYS[1])
+return value
+"""
+
+_scripts = {}
+
+
+class LocalTier:
+    """
+    Per-process LRU of serialized values with expiry and a byte budget.
+
+    Shared by every thread of the process; the backend instances Django
+    creates per thread are thin wrappers around it.
+    """
+
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.generation = 0  # Bumped by every invalidation
+        self.subscribed = False
+        self.listener_pid = None
+        self.error_logged_at = float('-inf')
+        self.lock = threading.Lock()
+        self._data = OrderedDict()  # key -> (expires at, serialized value)
+        self._bytes = 0
+        self.counters = {
+            'local_hits': 0, 'local_misses': 0, 'local_evictions': 0,
+            'remote_hits': 0, 'remote_misses': 0, 'remote_errors': 0,
+            'invalidations': 0,
+        }
+
+    def get(self, key):
+        """Return the serialized value of a live key, or None."""
+        with self.lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._data.move_to_end(key)
+                self.counters['local_hits'] += 1
+                return entry[1]
+            if entry is not None:
+                self._pop(key)
+            self.counters['local_misses'] += 1
+            return None
+
+    def store(self, key, data, ttl, generation=None):
+        """
+        Keep a serialized value for ``ttl`` seconds.
+
+        Args:
+            generation (int): The generation seen before reading ``data``
+                from Redis; the value is dropped if an invalidation came in since
+        """
+        if ttl <= 0 or len(data) > self.max_bytes:
+            return
+        with self.lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._pop(key)
+            self._data[key] = (time.monotonic() + ttl, data)
+            self._bytes += len(data)
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                self._pop(next(iter(self._data)))
+                self.counters['local_evictions'] += 1
+
+    def delete(self, key):
+        with self.lock:
+            return self._pop(key) is not None
+
+    def delete_if(self, key, data):
+        """Drop a live key only if its serialized value is ``data``."""
+        with self.lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= time.monotonic() or entry[1] != data:
+                return False
+            self._pop(key)
+            return True
+
+    def invalidate(self, key):
+        """Drop a key (or everything, for CLEAR_ALL) after a write anywhere."""
+        with self.lock:
+            self.generation += 1
+            self.counters['invalidations'] += 1
+            if key == CLEAR_ALL:
+                self._clear()
+            else:
+                self._pop(key)
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self._clear()
+
+    def expiry(self, key):
+        """Return the seconds left of a live local key, or None."""
+        with self.lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            left = entry[0] - time.monotonic()
+            return left if left > 0 else None
+
+    def _pop(self, key):
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[1])
+        return entry
+
+    def _clear(self):
+        self._data.clear()
+        self._bytes = 0
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters, local_entries=len(self._data), local_bytes=self._bytes,
+                        subscribed=self.subscribed)
+
+
+# Channel name -> LocalTier of this process
+_tiers = {}
+_tiers_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    # The listener threads do not survive the fork and the copies may be stale
+    for tier in _tiers.values():
+        tier.clear()
+        tier.subscribed = False
+        tier.listener_pid = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _listen(tier, channel, retry_delay):
+    """Apply the invalidations published on ``channel`` to ``tier``; runs in a daemon thread."""
+    delay = retry_delay
+    while True:
+        pubsub = None
+        try:
+            pubsub = redis_client.get_redis().pubsub()
+            pubsub.subscribe(channel)
+            while True:
+                # A timeout instead of listen(), which would trip the pool's socket_timeout when idle
+                message = pubsub.get_message(timeout=1.0)
+                if message is None:
+                    continue
+                if message['type'] == 'subscribe':
+                    # Writes made while nobody was listening were missed
+                    tier.invalidate(CLEAR_ALL)
+                    tier.subscribed = True
+                    delay = retry_delay
+                    logger.info(f'Cache invalidation listener subscribed to {channel}')
+                elif message['type'] == 'message':
+                    tier.invalidate(message['data'].decode())
+        except Exception as e:
+            if tier.subscribed:
+                logger.warning(f'Cache invalidation listener lost Redis, local tier disabled: {e}')
+            tier.subscribed = False
+        finally:
+            if pubsub is not None:
+                try:
+                    pubsub.close()
+                except Exception:
+                    pass
+        time.sleep(delay)
+        delay = min(delay * 2, 30)
+
+
+def _serialize(value):
+    # Plain ints stay readable by INCRBY
+    if type(value) is int:
+        return str(value).encode()
+    return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+
+def _deserialize(data):
+    try:
+        return int(data)
+    except ValueError:
+        return pickle.loads(data)
+
+
+def _script(client, name, source):
+    if name not in _scripts:
+        _scripts[name] = client.register_script(source)
+    return _scripts[name]
+
+
+def _ms(timeout):
+    return max(1, int(timeout * 1000))
+
+
+class TwoTierCache(BaseCache):
+    """
+    Django cache backend with a per-process LRU in front of Redis.
+
+    OPTIONS:
+        LOCAL_MAX_ENTRIES (int): Keys kept per process (default 500)
+        LOCAL_MAX_BYTES (int): Serialized bytes kept per process (default 8 MB)
+        LOCAL_TIMEOUT (int): Longest a local copy is used, in seconds (default 60)
+        CHANNEL (str): Pub/sub channel for invalidations (default '<KEY_PREFIX>:invalidate')
+        RETRY_DELAY (float): First delay before the listener reconnects (default 1)
+    """
+
+    def __init__(self, server, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._local_timeout = options.get('LOCAL_TIMEOUT', 60)
+        self._channel = options.get('CHANNEL', f'{self.key_prefix or "cache"}:invalidate')
+        self._retry_delay = options.get('RETRY_DELAY', 1)
+        with _tiers_lock:
+            if self._channel not in _tiers:
+                _tiers[self._channel] = LocalTier(
+                    options.get('LOCAL_MAX_ENTRIES', 500),
+                    options.get('LOCAL_MAX_BYTES', 8 * 1024 * 1024),
+                )
+        self._tier = _tiers[self._channel]
+
+    # -----------------------------------------------------------------------
+    # Helpers
+    # -----------------------------------------------------------------------
+
+    def get_backend_timeout(self, timeout=DEFAULT_TIMEOUT):
+        # Seconds from now like RedisCache, not the absolute time of BaseCache
+        if timeout == DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        return None if timeout is None else max(0, timeout)
+
+    def _local_ready(self):
+        """Start the listener of this process if needed; True if local copies are coherent."""
+        tier = self._tier
+        if tier.listener_pid != os.getpid():
+            with _tiers_lock:
+                if tier.listener_pid != os.getpid():
+                    tier.listener_pid = os.getpid()
+                    threading.Thread(
+                        target=_listen,
+                        args=(tier, self._channel, self._retry_delay),
+                        name='cache-invalidation',
+                        daemon=True,
+                    ).start()
+        return tier.subscribed
+
+    def _remote_failed(self, operation, error):
+        tier = self._tier
+        tier.counters['remote_errors'] += 1
+        # Once a minute is enough while Redis is down
+        if time.monotonic() - tier.error_logged_at > 60:
+            tier.error_logged_at = time.monotonic()
+            logger.warning(f'Cache {operation} fell back to the local tier, Redis failed: {error}')
+
+    def _local_ttl(self, timeout):
+        return self._local_timeout if timeout is None else min(timeout, self._local_timeout)
+
+    def _write(self, key, *commands):
+        """Run write commands plus the invalidation in one round trip."""
+        pipe = redis_client.get_redis().pipeline(transaction=False)
+        for method, *args in commands:
+            getattr(pipe, method)(*args)
+        pipe.publish(self._channel, key)
+        results = pipe.execute()
+        self._tier.delete(key)
+        return results
+
+    # -----------------------------------------------------------------------
+    # Cache API
+    # -----------------------------------------------------------------------
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        coherent = self._local_ready()
+        if coherent:
+            data = self._tier.get(key)
+            if data is not None:
+                return _deserialize(data)
+
+        generation = self._tier.generation
+        try:
+            pipe = redis_client.get_redis().pipeline(transaction=False)
+            pipe.get(key)
+            pipe.pttl(key)
+            data, pttl = pipe.execute()
+        except _REMOTE_ERRORS as e:
+            self._remote_failed('get', e)
+            data = self._tier.get(key)
+            return default if data is None else _deserialize(data)
+
+        if data is None:
+            self._tier.counters['remote_misses'] += 1
+            return default
+        self._tier.counters['remote_hits'] += 1
+        if coherent:
+            self._tier.store(key, data, self._local_ttl(pttl / 1000 if pttl > 0 else None), generation)
+        return _deserialize(data)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        timeout = self.get_backend_timeout(timeout)
+        data = _serialize(value)
+        try:
+            if timeout is not None and timeout <= 0:
+                self._write(key, ('delete', key))
+            else:
+                self._write(key, ('set', key, data) if timeout is None else ('psetex', key, _ms(timeout), data))
+        except _REMOTE_ERRORS as e:
+            self._remote_failed('set', e)
+            self._tier.store(key, data, self._local_ttl(timeout))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        timeout = self.get_backend_timeout(timeout)
+        data = _serialize(value)
+        if timeout is not None and timeout <= 0:
+            return False
+        try:
+            # A key that did not exist has no local copies anywhere, so nothing to publish
+            return bool(redis_client.get_redis().set(
+                key, data, px=None if timeout is None else _ms(timeout), nx=True,
+            ))
+        except _REMOTE_ERRORS as e:
+            self._remote_failed('add', e)
+            if self._tier.get(key) is not None:
+                return False
+            self._tier.store(key, data, self._local_ttl(timeout))
+            return True
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        timeout = self.get_backend_timeout(timeout)
+        try:
+            if timeout is None:
+                results = self._write(key, ('persist', key), ('exists', key))
+                return bool(results[1])
+            return bool(self._write(key, ('pexpire', key, _ms(timeout)))[0])
+        except _REMOTE_ERRORS as e:
+            self._remote_failed('touch', e)
+            data = self._tier.get(key)
+            if data is None:
+                return False
+            self._tier.store(key, data, self._local_ttl(timeout))
+            return True
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        try:
+            return bool(self._write(key, ('delete', key))[0])
+        except _REMOTE_ERRORS as e:
+            self._remote_failed('delete', e)
+            return self._tier.delete(key)
+
+    def delete_if(self, key, value, version=None):
+        """
+        Delete a key only while it still holds ``value``, in one step.
+
+        Releases locks taken with add(): a holder whose lock expired must not
+        delete the lock another process took since.
+
+        Returns:
+            bool: True if the key held the value and was deleted
+        """
+        key = self.make_and_validate_key(key, version=version)
+        data = _serialize(value)
+        try:
+            client = redis_client.get_redis()
+            deleted = _script(client, 'delete_if', _DELETE_IF)(keys=[key], args=[data, self._channel], client=client)
+        except _REMOTE_ERRORS as e:
+            self._remote_failed('delete', e)
+            return self._tier.delete_if(key, data)
+        self._tier.delete(key)
+        return bool(deleted)
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        try:
+            # Checked and incremented in one script: a key that expired in between
+            # would otherwise be recreated by INCRBY, without a TTL
+            client = redis_client.get_redis()
+            value = _script(client, 'incr', _INCR)(keys=[key], args=[delta, self._channel], client=client)
+        except _REMOTE_ERRORS as e:
+            self._remote_failed('incr', e)
+            data = self._tier.get(key)
+            if data is None:
+                raise ValueError(f"Key '{key}' not found.")
+            value = _deserialize(data) + delta
+            self._tier.store(key, _serialize(value), self._tier.expiry(key) or self._local_timeout)
+            return value
+        self._tier.delete(key)
+        if value is None:
+            raise ValueError(f"Key '{key}' not found.")
+        return value
+
+    def clear(self):
+        """Delete every key under KEY_PREFIX; the rest of the database is left alone."""
+        self._tier.clear()
+        try:
+            client = redis_client.get_redis()
+            batch = []
+            for key in client.scan_iter(match=f'{self.key_prefix}:*', count=500):
+                batch.append(key)
+                if len(batch) >= 500:
+                    client.delete(*batch)
+                    batch = []
+            if batch:
+                client.delete(*batch)
+            client.publish(self._channel, CLEAR_ALL)
+        except _REMOTE_ERRORS as e:
+            self._remote_failed('clear', e)
+
+    def stats(self):
+        """
+        Return the counters of both tiers in this process.
+
+        Returns:
+            dict: Local hits, misses, evictions, entries and bytes; Redis
+            hits, misses and errors; invalidations received and whether
+            the listener is subscribed
+        """
+        return self._tier.stats()
+
+
+def stats():
+    """Return ``stats()`` of every TwoTierCache in CACHES, by alias."""
+    from django.core.cache import caches
+
+    return {
+        alias: caches[alias].stats()
+        for alias, config in getattr(settings, 'CACHES', {}).items()
+        if config.get('BACKEND') == f'{__name__}.TwoTierCache'
+    }
@@ -0,0 +1,102 @@
+"""
+Math CAPTCHA for the contact form.
+
+Two modes are supported:
+
+* Session mode keeps the ``(question, answer)`` pair in the visitor's
+  session, which costs a session write on every page view.
+* Stateless mode (``CAPTCHA_STATELESS = True``) hands the visitor a signed,
+  expiring token instead. The token carries a random nonce and an HMAC of
+  the answer keyed with SECRET_KEY, so the answer is never exposed and
+  nothing has to be stored until the form is submitted. Each token can be
+  checked once; used nonces are kept in the cache until they expire.
+"""
+
+import random
+import secrets
+from collections import namedtuple
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+SIGNING_SALT = 'portfolio_app.captcha'
+USED_KEY_PREFIX = 'captcha:used:'
+
+Challenge = namedtuple('Challenge', ['question', 'token'])
+
+
+def generate_captcha():
+    """
+    Generate a random math problem for CAPTCHA.
+    Returns a tuple of (question, answer).
+    Ensures all results are positive numbers under 100.
+    """
+    # Generate numbers between 1 and 50 to ensure sum is under 100
+    num1 = random.randint(1, 50)
+    num2 = random.randint(1, 50)
+
+    # Only use addition
+    answer = num1 + num2
+
+    # Create the question string
+    question = f"{num1} + {num2} = ?"
+
+    return (question, answer)
+
+
+def is_stateless():
+    """Return True when CAPTCHA challenges are carried in signed tokens."""
+    return getattr(settings, 'CAPTCHA_STATELESS', True)
+
+
+def _max_age():
+    return getattr(settings, 'CAPTCHA_TOKEN_MAX_AGE', 600)
+
+
+def _answer_digest(nonce, answer):
+    return salted_hmac(SIGNING_SALT, f'{nonce}:{answer}').hexdigest()[:20]
+
+
+def new_challenge():
+    """
+    Create a stateless CAPTCHA challenge.
+
+    Returns:
+        Challenge: The question to display and the signed token to embed
+        in the form
+    """
+    question, answer = generate_captcha()
+    nonce = secrets.token_urlsafe(12)
+    token = signing.TimestampSigner(salt=SIGNING_SALT).sign(f'{nonce}.{_answer_digest(nonce, answer)}')
+    return Challenge(question, token)
+
+
+def verify_token(token, answer):
+    """
+    Check a submitted answer against a signed CAPTCHA token.
+
+    The token is consumed on the first attempt, right or wrong, so a single
+    token cannot be used to try several answers or be replayed later.
+
+    Args:
+        token (str): Token that was embedded in the form
+        answer (int): Answer submitted by the visitor
+
+    Returns:
+        bool: True if the token is valid, unused and the answer matches
+    """
+    if not token:
+        return False
+    try:
+        payload = signing.TimestampSigner(salt=SIGNING_SALT).unsign(token, max_age=_max_age())
+        nonce, digest = payload.split('.', 1)
+    except (signing.BadSignature, ValueError):
+        return False
+
+    # cache.add() only succeeds for the first use of a nonce
+    if not cache.add(f'{USED_KEY_PREFIX}{nonce}', 1, _max_age()):
+        return False
+
+    return constant_time_compare(digest, _answer_digest(nonce, answer))
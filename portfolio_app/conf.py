@@ -0,0 +1,13 @@
+"""
+Settings access shared by the portfolio_app modules.
+
+Every optional setting of the app has its default where it is read, so
+a settings file only needs the values it changes.
+"""
+
+from django.conf import settings
+
+
+def setting(name, default):
+    """Return ``settings.<name>``, or ``default`` if it is not set."""
+    return getattr(settings, name, default)
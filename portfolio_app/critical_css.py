@@ -0,0 +1,183 @@
+"""
+Critical CSS for the above-the-fold part of the page templates.
+
+First paint of the homepage waits for the full CSS bundles, although the
+navbar and hero section use a small fraction of their rules. During
+``collectstatic`` (see ``portfolio_app.storage``) this module takes the
+markup of each template in ``CRITICAL_CSS`` up to its
+``<!-- /above-the-fold -->`` marker, keeps the bundle rules whose selectors
+can match that markup and saves them as ``critical/<template>.css`` in
+STATIC_ROOT. Critical CSS larger than ``CRITICAL_CSS_MAX_BYTES`` (about the
+first round trip of a new connection) would delay first paint as much as the
+stylesheets it replaces, so it is not saved and the template keeps loading
+the normal stylesheets.
+
+The ``{% critical_css %}`` tag inlines that file and loads the full bundles
+without blocking rendering. Matching is done offline with the same rules as
+``portfolio_app.css_purge``, without a browser.
+"""
+
+import logging
+import posixpath
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.files.base import ContentFile
+from django.template.loader import get_template
+
+from . import css_purge
+from .conf import setting
+
+logger = logging.getLogger(__name__)
+
+FOLD_MARKER = '<!-- /above-the-fold -->'
+
+_URL_RE = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+
+
+def artifact_name(template_name):
+    """Return the static path of the critical CSS file for a template."""
+    return f"critical/{posixpath.splitext(template_name)[0]}.css"
+
+
+# ---------------------------------------------------------------------------
+# Above-the-fold markup
+# ---------------------------------------------------------------------------
+
+def used_names(template_name):
+    """
+    Collect the tag, class and id names used above the fold of a template.
+
+    Names that only appear in template variables or are added by scripts
+    after load must be listed in CRITICAL_CSS_SAFELIST.
+
+    Returns:
+        dict: Sets of names under 'tags', 'classes' and 'ids'
+    """
+    source = get_template(template_name).template.source
+    if FOLD_MARKER in source:
+        source = source[:source.index(FOLD_MARKER)]
+    names = css_purge.empty_names()
+    css_purge.add_markup(names, source)
+
+    # Classes added by JavaScript on load (carousel, sticky navbar...)
+    css_purge.add_safelist(names, setting('CRITICAL_CSS_SAFELIST', ()))
+    return names
+
+
+def _absolute_urls(css, stylesheet):
+    """Make relative ``url()`` references absolute, since the CSS is inlined into the page."""
+    base = posixpath.dirname(stylesheet)
+
+    def absolute(match):
+        quote, url = match.groups()
+        if url.startswith(('data:', 'http:', 'https:', '//', '/', '#')):
+            return match.group(0)
+        return f'url({quote}{settings.STATIC_URL}{posixpath.normpath(posixpath.join(base, url))}{quote})'
+
+    return _URL_RE.sub(absolute, css)
+
+
+def extract(css, names, stylesheet):
+    """
+    Return the critical part of one stylesheet.
+
+    Args:
+        css (str): Stylesheet contents
+        names (dict): Names used above the fold, from ``used_names()``
+        stylesheet (str): Static path of the stylesheet, to resolve ``url()``
+
+    Returns:
+        str: The matching rules plus the fonts and keyframes they use
+    """
+    # Rules that only apply on interaction, or to attributes the markup above
+    # the fold does not have, are not needed for first paint
+    return _absolute_urls(css_purge.purge(css, names, interactive=False, attributes=True), stylesheet)
+
+
+# ---------------------------------------------------------------------------
+# Building
+# ---------------------------------------------------------------------------
+
+def build_all(storage):
+    """
+    Build the critical CSS of every template in CRITICAL_CSS into ``storage``.
+
+    Args:
+        storage: The static files storage collectstatic writes to; the
+            stylesheets are read from it by their hashed names
+
+    Returns:
+        list: (template name, artifact name, critical bytes, full CSS bytes);
+        the artifact name is None if the critical CSS was over
+        CRITICAL_CSS_MAX_BYTES
+    """
+    max_bytes = setting('CRITICAL_CSS_MAX_BYTES', 14 * 1024)
+    results = []
+    for template_name, stylesheets in setting('CRITICAL_CSS', {}).items():
+        names = used_names(template_name)
+        parts, full_size = [], 0
+        for stylesheet in stylesheets:
+            try:
+                hashed = storage.stored_name(stylesheet)
+            except ValueError:
+                logger.warning(f'Skipping critical CSS for {template_name}: {stylesheet} not collected')
+                break
+            with storage.open(hashed) as f:
+                css = f.read().decode('utf-8')
+            full_size += len(css.encode())
+            parts.append(extract(css, names, hashed))
+        else:
+            critical = ''.join(parts).encode()
+            name = artifact_name(template_name)
+            if storage.exists(name):
+                storage.delete(name)
+            if max_bytes is not None and len(critical) > max_bytes:
+                logger.warning(
+                    f'Critical CSS for {template_name} is {len(critical)} bytes, over '
+                    f'CRITICAL_CSS_MAX_BYTES ({max_bytes}); the page loads its stylesheets instead'
+                )
+                results.append((template_name, None, len(critical), full_size))
+                continue
+            storage.save(name, ContentFile(critical))
+            results.append((template_name, name, len(critical), full_size))
+            logger.info(f'Built critical CSS for {template_name}')
+    return results
+
+
+def report(results):
+    """Return a human-readable line per template with the bytes saved."""
+    return [
+        f'Critical CSS {template_name:<12} {size / 1024:>7.1f} KB inline, '
+        f'{(full - size) / 1024:>7.1f} KB of {full / 1024:.1f} KB render-blocking CSS deferred'
+        if name else
+        f'Critical CSS {template_name:<12} {size / 1024:>7.1f} KB, too large to inline; '
+        f'{full / 1024:.1f} KB of stylesheets stay render-blocking'
+        for template_name, name, size, full in results
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Request path
+# ---------------------------------------------------------------------------
+
+_cache = {}
+
+
+def get_critical_css(template_name):
+    """
+    Return the critical CSS of a template, or None if it has not been built.
+
+    The file is read once per process outside of DEBUG.
+    """
+    if template_name in _cache and not settings.DEBUG:
+        return _cache[template_name]
+
+    name = artifact_name(template_name)
+    css = None
+    if staticfiles_storage.exists(name):
+        with staticfiles_storage.open(name) as f:
+            css = f.read().decode('utf-8')
+    _cache[template_name] = css
+    return css
@@ -0,0 +1,270 @@
+"""
+Remove CSS rules that no template uses.
+
+The vendored stylesheets (animate, icomoon, ionicons, the theme's
+style.css...) ship thousands of selectors the portfolio never references.
+``build_bundles`` runs every CSS source through ``purge()`` before
+concatenating it, so the bundles collectstatic hashes only contain rules
+that can match something.
+
+Usage is collected from the files matching ``CSS_PURGE_CONTENT``: class, id
+and tag names from the HTML templates, and every word inside a string
+literal of the scripts (``addClass('show')``, ``$('.owl-nav')``...).
+Classes that libraries add at runtime are listed in ``CSS_PURGE_SAFELIST``;
+entries may be shell-style patterns such as ``owl-*``.
+
+A rule is kept when every class, id and tag name in one of its selectors is
+used, so the result errs on the side of keeping too much. ``@font-face`` and
+``@keyframes`` blocks are kept only if a kept rule refers to them.
+"""
+
+import fnmatch
+import glob
+import re
+
+from .conf import setting
+
+_COMMENT_RE = re.compile(r'/\*.*?\*/', re.DOTALL)
+_TEMPLATE_TAG_RE = re.compile(r'{%.*?%}|{{.*?}}|{#.*?#}', re.DOTALL)
+_HTML_TAG_RE = re.compile(r'<([a-zA-Z][a-zA-Z0-9-]*)([^>]*)>')
+_HTML_ATTR_RE = re.compile(r'''\b(class|id)\s*=\s*(["'])(.*?)\2''', re.DOTALL)
+_HTML_ANY_ATTR_RE = re.compile(r'''([^\s"'=<>/]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+)))?''')
+_SCRIPT_RE = re.compile(r'<script\b[^>]*>(.*?)</script>', re.DOTALL | re.IGNORECASE)
+_STRING_RE = re.compile(r'''(["'])((?:\\.|(?!\1).)*)\1''')
+_WORD_RE = re.compile(r'-?[_a-zA-Z][\w-]*')
+
+_SELECTOR_CLASS_RE = re.compile(r'\.(-?[_a-zA-Z][\w-]*)')
+_SELECTOR_ID_RE = re.compile(r'#(-?[_a-zA-Z][\w-]*)')
+_SELECTOR_TAG_RE = re.compile(r'(?:^|[\s>+~])([a-zA-Z][a-zA-Z0-9]*)')
+_SELECTOR_NOISE_RE = re.compile(r'\[[^\]]*\]|::?[\w-]+(\([^)]*\))?')
+_SELECTOR_ATTR_RE = re.compile(r'''\[\s*([\w-]+)\s*(?:([~|^$*]?=)\s*(["']?)(.*?)\3\s*(?:[iIsS]\s*)?)?\]''')
+_SELECTOR_NOT_RE = re.compile(r':not\([^)]*\)')
+_INTERACTIVE_RE = re.compile(r':(hover|focus|focus-within|focus-visible|active|visited)\b')
+
+_FONT_FAMILY_RE = re.compile(r'font-family\s*:\s*([^;}]+)', re.IGNORECASE)
+_ANIMATION_RE = re.compile(r'animation(?:-name)?\s*:\s*([^;}]+)', re.IGNORECASE)
+
+
+# ---------------------------------------------------------------------------
+# Usage
+# ---------------------------------------------------------------------------
+
+def empty_names():
+    """Return an empty usage record; ``html`` and ``body`` always exist."""
+    return {'tags': {'html', 'body'}, 'classes': set(), 'ids': set(), 'attributes': {}, 'patterns': []}
+
+
+def add_markup(names, source):
+    """Add the tag, class, id and attribute names of an HTML template source to ``names``."""
+    for script in _SCRIPT_RE.findall(source):
+        add_script(names, script)
+    source = _TEMPLATE_TAG_RE.sub(' ', source)
+    for tag, attrs in _HTML_TAG_RE.findall(source):
+        names['tags'].add(tag.lower())
+        for attr, _, value in _HTML_ATTR_RE.findall(attrs):
+            key = 'classes' if attr == 'class' else 'ids'
+            names[key].update(value.split())
+        for attr, *values in _HTML_ANY_ATTR_RE.findall(attrs):
+            names['attributes'].setdefault(attr.lower(), set()).add(''.join(values))
+
+
+def add_script(names, source):
+    """Add every word found in the string literals of a script as a class and id."""
+    for _, literal in _STRING_RE.findall(source):
+        words = _WORD_RE.findall(literal)
+        names['classes'].update(words)
+        names['ids'].update(words)
+
+
+def add_safelist(names, safelist):
+    """Add class names, or shell-style patterns of class names, to ``names``."""
+    for entry in safelist:
+        if any(char in entry for char in '*?['):
+            names['patterns'].append(entry)
+        else:
+            names['classes'].add(entry)
+
+
+def collect_names(patterns=None, safelist=None):
+    """
+    Collect the names used by the project.
+
+    Args:
+        patterns (list): Glob patterns of templates and scripts to scan
+            (CSS_PURGE_CONTENT by default)
+        safelist (list): Extra class names or patterns (CSS_PURGE_SAFELIST)
+
+    Returns:
+        dict: Sets of names under 'tags', 'classes' and 'ids', plus the
+        safelist 'patterns'
+    """
+    names = empty_names()
+    for pattern in patterns if patterns is not None else setting('CSS_PURGE_CONTENT', []):
+        for path in glob.glob(pattern, recursive=True):
+            with open(path, encoding='utf-8') as f:
+                source = f.read()
+            if path.endswith('.js'):
+                add_script(names, source)
+            else:
+                add_markup(names, source)
+    add_safelist(names, safelist if safelist is not None else setting('CSS_PURGE_SAFELIST', []))
+    return names
+
+
+# ---------------------------------------------------------------------------
+# Matching
+# ---------------------------------------------------------------------------
+
+def _class_used(name, names):
+    return name in names['classes'] or any(fnmatch.fnmatchcase(name, p) for p in names['patterns'])
+
+
+def _attribute_used(name, operator, expected, names):
+    values = names['attributes'].get(name.lower())
+    if values is None:
+        return False
+    if not operator:
+        return True
+    tests = {
+        '=': lambda value: value == expected,
+        '~=': lambda value: expected in value.split(),
+        '|=': lambda value: value == expected or value.startswith(f'{expected}-'),
+        '^=': lambda value: value.startswith(expected),
+        '$=': lambda value: value.endswith(expected),
+        '*=': lambda value: expected in value,
+    }
+    return any(tests[operator](value) for value in values)
+
+
+def selector_matches(selector, names, interactive=True, attributes=False):
+    """
+    Return True if every class, id and tag name in ``selector`` is used.
+
+    Args:
+        selector (str): One selector of a rule
+        names (dict): Usage from ``collect_names()``
+        interactive (bool): Whether :hover/:focus/... selectors are wanted
+        attributes (bool): Whether [attribute] selectors must match an
+            attribute of the markup too. Off for the bundles, since scripts
+            set attributes after load (AOS, for one)
+    """
+    if not interactive and _INTERACTIVE_RE.search(selector):
+        return False
+    if attributes and not all(
+        _attribute_used(name, operator, expected, names)
+        for name, operator, _, expected in _SELECTOR_ATTR_RE.findall(_SELECTOR_NOT_RE.sub('', selector))
+    ):
+        return False
+    plain = _SELECTOR_NOISE_RE.sub('', selector).strip()
+    if plain in ('', '*'):
+        return True
+    return (
+        all(_class_used(name, names) for name in _SELECTOR_CLASS_RE.findall(plain))
+        and set(_SELECTOR_ID_RE.findall(plain)) <= names['ids']
+        and {tag.lower() for tag in _SELECTOR_TAG_RE.findall(plain)} <= names['tags']
+    )
+
+
+def split_blocks(css):
+    """
+    Split a stylesheet into top-level (prelude, body) pairs.
+
+    Statements without a block (``@charset``, ``@import``) have a None body.
+    """
+    blocks = []
+    i, length = 0, len(css)
+    while i < length:
+        start = i
+        while i < length and css[i] not in '{;':
+            if css[i] in '"\'':
+                i = css.index(css[i], i + 1)
+            i += 1
+        if i >= length:
+            break
+        prelude = css[start:i].strip()
+        if css[i] == ';':
+            blocks.append((prelude, None))
+            i += 1
+            continue
+        depth, i = 1, i + 1
+        body_start = i
+        while i < length and depth:
+            char = css[i]
+            if char in '"\'':
+                i = css.index(char, i + 1)
+            elif char == '{':
+                depth += 1
+            elif char == '}':
+                depth -= 1
+            i += 1
+        blocks.append((prelude, css[body_start:i - 1]))
+    return blocks
+
+
+def _filter_rules(css, names, interactive, attributes):
+    """Keep the rules that match ``names``, recursing into @media and @supports."""
+    kept = []
+    deferred = []  # (@font-face / @keyframes prelude, body), kept only if used
+    for prelude, body in split_blocks(css):
+        if body is None:
+            continue
+        lowered = prelude.lower()
+        if lowered.startswith(('@media', '@supports')):
+            inner, inner_deferred = _filter_rules(body, names, interactive, attributes)
+            deferred.extend(inner_deferred)
+            if inner:
+                kept.append(f'{prelude}{{{inner}}}')
+        elif lowered.startswith(('@font-face', '@keyframes', '@-webkit-keyframes')):
+            deferred.append((prelude, body))
+        elif prelude.startswith('@'):
+            continue
+        else:
+            selectors = [s.strip() for s in prelude.split(',')]
+            matching = [s for s in selectors if selector_matches(s, names, interactive, attributes)]
+            if matching:
+                kept.append(f"{','.join(matching)}{{{body.strip()}}}")
+    return ''.join(kept), deferred
+
+
+def _font_families(value):
+    value = re.sub(r'!\s*important', '', value, flags=re.IGNORECASE)
+    return {family.strip().strip('"\'').lower() for family in value.split(',')}
+
+
+def _used_at_rules(rules, deferred):
+    """Return the @font-face and @keyframes blocks referenced by the kept rules."""
+    families = set()
+    for value in _FONT_FAMILY_RE.findall(rules):
+        families |= _font_families(value)
+    animations = {
+        word.lower() for value in _ANIMATION_RE.findall(rules) for word in re.split(r'[\s,]+', value)
+    }
+    used = []
+    for prelude, body in deferred:
+        if prelude.lower().startswith('@font-face'):
+            match = _FONT_FAMILY_RE.search(body)
+            if match and _font_families(match.group(1)) & families:
+                used.append(f'{prelude}{{{body.strip()}}}')
+        elif prelude.split()[-1].lower() in animations:
+            used.append(f'{prelude}{{{body.strip()}}}')
+    return ''.join(used)
+
+
+def purge(css, names, interactive=True, attributes=False):
+    """
+    Return the rules of a stylesheet that can match the used names.
+
+    Args:
+        css (str): Stylesheet contents
+        names (dict): Usage from ``collect_names()``
+        interactive (bool): Keep :hover/:focus/... rules (False for critical CSS)
+        attributes (bool): Match [attribute] selectors against the markup
+            (True for critical CSS)
+
+    Returns:
+        str: The matching rules plus the fonts and keyframes they use,
+        without comments
+    """
+    css = _COMMENT_RE.sub('', css)
+    rules, deferred = _filter_rules(css, names, interactive, attributes)
+    return _used_at_rules(rules, deferred) + rules
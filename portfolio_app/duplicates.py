@@ -0,0 +1,147 @@
+"""
+Duplicate contact submission detection.
+
+A refresh that resubmits the form, a double click or a bot replaying the
+same payload used to create one Contact row (and one email) per request.
+Submissions are now identified by a fingerprint: a SHA-256 over the email
+address, subject and message, normalized (case and whitespace ignored).
+
+- Redis holds one key per fingerprint for ``CONTACT_DUPLICATE_WINDOW``
+  seconds. ``claim()`` sets it atomically (``SET NX EX``) once the form,
+  CAPTCHA included, is valid, so of two concurrent copies only one is
+  saved. Only submissions that passed validation are checked: a replay
+  with an already used CAPTCHA fails validation like any other bad
+  answer, and an invalid post cannot probe which messages were sent.
+- ``Contact.fingerprint`` is unique and holds the fingerprint combined with
+  the current window number: a backstop for when Redis is down, answered
+  by an IntegrityError in ``save_once()``.
+
+Duplicates get the normal success response without a new row or an
+email, and are counted (``stats()``, shown on /metrics/).
+"""
+
+import hashlib
+import logging
+import time
+
+from django.db import IntegrityError, transaction
+
+from . import redis_client
+from .conf import setting
+from .models import EmailOutbox
+from .redis_client import RedisError
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'contact:dup:'
+COUNTER_KEY = 'contact:dup:suppressed'
+
+_stats = {'suppressed': 0, 'suppressed_by_database': 0}
+
+
+def _normalize(text):
+    return ' '.join(str(text or '').split()).casefold()
+
+
+def fingerprint(data):
+    """
+    Return the fingerprint of a submission.
+
+    Args:
+        data: ``request.POST`` or ``form.cleaned_data``
+
+    Returns:
+        str: Hex SHA-256 of the normalized email, subject and message
+    """
+    parts = (
+        str(data.get('email') or '').strip().lower(),
+        _normalize(data.get('subject')),
+        _normalize(data.get('message')),
+    )
+    return hashlib.sha256('\0'.join(parts).encode()).hexdigest()
+
+
+def _window():
+    return setting('CONTACT_DUPLICATE_WINDOW', 600)
+
+
+def db_fingerprint(value, now=None):
+    """Return the value stored in ``Contact.fingerprint``: unique per fingerprint and window."""
+    window_number = int((now or time.time()) // _window())
+    return hashlib.sha256(f'{value}.{window_number}'.encode()).hexdigest()
+
+
+def claim(value):
+    """
+    Mark a fingerprint as accepted for the window.
+
+    Returns:
+        bool: False if another request claimed it first
+    """
+    try:
+        return bool(redis_client.get_redis().set(f'{KEY_PREFIX}{value}', 1, nx=True, ex=_window()))
+    except (RedisError, RuntimeError) as e:
+        logger.warning(f'Duplicate claim skipped, relying on the database: {e}')
+        return True
+
+
+def release(value):
+    """Forget a claimed fingerprint whose submission could not be saved."""
+    try:
+        redis_client.get_redis().delete(f'{KEY_PREFIX}{value}')
+    except (RedisError, RuntimeError) as e:
+        logger.warning(f'Releasing a duplicate claim failed: {e}')
+
+
+def record_suppressed(by_database=False):
+    """Count a suppressed duplicate, in this process and across all of them in Redis."""
+    _stats['suppressed'] += 1
+    if by_database:
+        _stats['suppressed_by_database'] += 1
+    logger.info('Duplicate contact submission suppressed' + (' by the database' if by_database else ''))
+    try:
+        redis_client.get_redis().incr(COUNTER_KEY)
+    except (RedisError, RuntimeError):
+        pass
+
+
+def save_once(form, value, with_outbox=True):
+    """
+    Save a valid contact form unless its fingerprint is already stored.
+
+    Args:
+        form: Valid ContactForm
+        value (str): Fingerprint of the submission
+        with_outbox (bool): Also queue the notification in the email outbox
+
+    Returns:
+        bool: True if saved, False if it was a duplicate (already counted)
+    """
+    form.instance.fingerprint = db_fingerprint(value)
+    try:
+        with transaction.atomic():
+            contact_submission = form.save()
+            if with_outbox:
+                EmailOutbox.objects.create(contact=contact_submission)
+    except IntegrityError:
+        record_suppressed(by_database=True)
+        return False
+    except Exception:
+        release(value)
+        raise
+    return True
+
+
+def stats():
+    """
+    Return duplicate suppression counters for the metrics endpoint.
+
+    Returns:
+        dict: Duplicates suppressed by this process (and of those, how many
+        only the database caught) and by all processes, from Redis
+    """
+    try:
+        total = int(redis_client.get_redis().get(COUNTER_KEY) or 0)
+    except (RedisError, RuntimeError):
+        total = None
+    return {**_stats, 'suppressed_total': total}
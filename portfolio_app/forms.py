@@ -7,6 +7,7 @@ Forms handle user input validation and provide a clean interface for data collec
 
 from django import forms
 from .models import Contact
+from . import captcha
 from django.contrib.auth.models import User
 from taggit.forms import TagWidget
 
@@ -17,7 +18,49 @@ class ContactForm(forms.ModelForm):
     This form handles contact form submissions from visitors.
     It includes fields for name, email, subject, and message with
     Bootstrap styling for a modern look.
+
+    A simple math CAPTCHA is attached to the form. In session mode the view
+    passes the current ``(question, answer)`` pair through ``captcha_answer``.
+    In stateless mode it passes a ``captcha.Challenge`` through
+    ``captcha_challenge`` and the signed token travels in a hidden field.
     """
+    captcha = forms.IntegerField(
+        label='CAPTCHA',
+        widget=forms.NumberInput(attrs={
+            'class': 'form-control',
+            'placeholder': 'Answer',
+        }),
+    )
+    captcha_token = forms.CharField(required=False, widget=forms.HiddenInput)
+
+    def __init__(self, *args, captcha_answer=None, captcha_challenge=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.captcha_answer = captcha_answer
+        question = None
+        if captcha_challenge:
+            question = captcha_challenge.question
+            self.fields['captcha_token'].initial = captcha_challenge.token
+        elif captcha_answer:
+            question = captcha_answer[0]
+        if question:
+            self.fields['captcha'].label = question
+            self.fields['captcha'].widget.attrs['placeholder'] = question
+
+    def clean(self):
+        """Check the submitted answer against the session answer or signed token."""
+        cleaned_data = super().clean()
+        value = cleaned_data.get('captcha')
+        if value is None:
+            return cleaned_data
+
+        if self.captcha_answer is not None:
+            valid = value == self.captcha_answer[1]
+        else:
+            valid = captcha.verify_token(cleaned_data.get('captcha_token'), value)
+        if not valid:
+            self.add_error('captcha', 'Incorrect CAPTCHA answer.')
+        return cleaned_data
+
     class Meta:
         model = Contact
         fields = ['name', 'email', 'subject', 'message']
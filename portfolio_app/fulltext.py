@@ -0,0 +1,100 @@
+"""
+MySQL FULLTEXT search over contact submissions.
+
+The admin's default search turns every term into ``LIKE '%term%'`` on each
+search field, a full table scan over the ``message`` TextField. Migration
+0004 adds a FULLTEXT index over the searched columns on MySQL, and
+``search()`` filters with ``MATCH ... AGAINST`` on it and annotates every row
+with its relevance as ``search_rank``.
+
+``CONTACT_SEARCH_MODE`` picks the ranking mode:
+
+- ``'boolean'`` (default): every word must match, as a prefix
+  (``+invoice*``); quoted phrases must match as a whole. Rows are ranked by
+  relevance.
+- ``'natural'``: any word may match; rows are ranked by natural language
+  relevance.
+
+On other databases (SQLite in development and tests), or when a search has
+no word InnoDB indexes (shorter than ``innodb_ft_min_token_size``),
+``search()`` returns None and the caller uses the regular LIKE search.
+"""
+
+import re
+
+from django.db import connections
+from django.db.models import FloatField
+from django.db.models.expressions import RawSQL
+from django.utils.text import smart_split, unescape_string_literal
+
+from .conf import setting
+from .models import Contact
+
+FULLTEXT_FIELDS = ('name', 'email', 'subject', 'message')
+INDEX_NAME = 'contact_fulltext_idx'
+MIN_TOKEN_SIZE = 3  # InnoDB's innodb_ft_min_token_size default
+
+# Characters with a meaning in boolean mode; user input is reduced to words
+_OPERATORS_RE = re.compile(r'[+\-<>()~*"@\'.,;:!?\\/]+')
+
+
+def is_supported(using='default'):
+    return connections[using].vendor == 'mysql'
+
+
+def _words(text):
+    return [word for word in _OPERATORS_RE.sub(' ', text).split() if len(word) >= MIN_TOKEN_SIZE]
+
+
+def build_query(search_term, mode=None):
+    """
+    Turn an admin search term into the argument of ``AGAINST``.
+
+    Args:
+        search_term (str): What the admin typed, quoted phrases included
+        mode (str): 'boolean' or 'natural' (CONTACT_SEARCH_MODE by default)
+
+    Returns:
+        str: The query, or None if it has no indexable word
+    """
+    mode = mode or setting('CONTACT_SEARCH_MODE', 'boolean')
+    parts = []
+    for bit in smart_split(search_term):
+        if bit[:1] in '"\'' and bit[:1] == bit[-1:] and len(bit) > 1:
+            words = _words(unescape_string_literal(bit))
+            if len(words) > 1 and mode == 'boolean':
+                parts.append('+"%s"' % ' '.join(words))
+                continue
+        else:
+            words = _words(bit)
+        parts.extend(f'+{word}*' if mode == 'boolean' else word for word in words)
+    return ' '.join(parts) or None
+
+
+def search(queryset, search_term, mode=None):
+    """
+    Filter contacts with MATCH ... AGAINST and annotate their relevance.
+
+    Args:
+        queryset: Contact queryset to search
+        search_term (str): What the admin typed
+        mode (str): 'boolean' or 'natural' (CONTACT_SEARCH_MODE by default)
+
+    Returns:
+        QuerySet: Matching rows annotated with ``search_rank``, or None when
+        FULLTEXT search cannot be used for this database or term
+    """
+    if not is_supported(queryset.db):
+        return None
+    mode = mode or setting('CONTACT_SEARCH_MODE', 'boolean')
+    query = build_query(search_term, mode)
+    if query is None:
+        return None
+
+    qn = connections[queryset.db].ops.quote_name
+    table = qn(Contact._meta.db_table)
+    columns = ', '.join(f'{table}.{qn(Contact._meta.get_field(name).column)}' for name in FULLTEXT_FIELDS)
+    modifier = 'IN BOOLEAN MODE' if mode == 'boolean' else 'IN NATURAL LANGUAGE MODE'
+    rank = RawSQL(f'MATCH ({columns}) AGAINST (%s {modifier})', [query], output_field=FloatField())
+    # MySQL answers "MATCH ... > 0" from the FULLTEXT index
+    return queryset.annotate(search_rank=rank).filter(search_rank__gt=0)
@@ -0,0 +1,159 @@
+"""
+Icon font subsetting for the stylesheet bundles.
+
+The page loads four icon fonts (icomoon, ionicons, flaticon, open-iconic),
+each with hundreds of glyphs, to show a handful of icons. For every
+stylesheet in ``ICON_FONTS``, ``build_bundles`` keeps the icon rules whose
+classes the templates use (``portfolio_app.css_purge``), subsets the font to
+the code points those rules reference, writes it as WOFF2 only and replaces
+the stylesheet's ``@font-face`` with one pointing at the subset. A font none
+of whose icons is used is dropped entirely.
+
+The trimmed stylesheets and fonts are written to ``icons/`` in
+``STATIC_BUNDLES_DIR`` and used by the bundles in place of the originals.
+Subsetting needs fontTools (and brotli for WOFF2); without them the original
+stylesheets are bundled.
+"""
+
+import logging
+import os
+import posixpath
+import re
+
+from django.contrib.staticfiles import finders
+
+from . import css_purge
+from .conf import setting
+
+try:
+    from fontTools import subset
+except ImportError:  # pragma: no cover - the full fonts are used
+    subset = None
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_PREFIX = 'icons'
+
+_CONTENT_RE = re.compile(r'content\s*:\s*(["\'])\\([0-9a-fA-F]{1,6})\s*\1')
+_FAMILY_RE = re.compile(r'font-family\s*:\s*([^;}]+)', re.IGNORECASE)
+
+
+def is_available():
+    if subset is None:
+        return False
+    try:
+        import brotli  # noqa: F401 - needed by fontTools to write WOFF2
+    except ImportError:
+        return False
+    return True
+
+
+def _family(body):
+    match = _FAMILY_RE.search(body)
+    return match.group(1).strip().strip('"\'') if match else None
+
+
+def _strip_font_faces(css):
+    """Return the stylesheet without its @font-face blocks, and the font families they declared."""
+    rules, families = [], []
+    for prelude, body in css_purge.split_blocks(css):
+        if body is None:
+            continue
+        if prelude.lower().startswith('@font-face'):
+            families.append(_family(body))
+        else:
+            rules.append(f'{prelude}{{{body}}}')
+    return ''.join(rules), families
+
+
+def subset_font(font_path, codepoints, output_path):
+    """
+    Write a WOFF2 subset of a font with only the given code points.
+
+    Args:
+        font_path (str): Path of the source font (TTF/OTF/WOFF)
+        codepoints (set): Unicode code points to keep
+        output_path (str): Path of the WOFF2 file to write
+    """
+    options = subset.Options()
+    options.flavor = 'woff2'
+    options.layout_features = []
+    options.name_IDs = []
+    options.notdef_outline = True
+    options.drop_tables += ['FFTM']  # FontForge timestamps, unknown to the subsetter
+    font = subset.load_font(font_path, options)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(unicodes=codepoints)
+    subsetter.subset(font)
+    subset.save_font(font, output_path, options)
+
+
+def build_stylesheet(source, font, names, output_dir):
+    """
+    Trim one icon stylesheet and subset its font.
+
+    Args:
+        source (str): Static path of the icon stylesheet
+        font (str): Static path of its TTF/OTF font
+        names (dict): Usage from ``css_purge.collect_names()``
+        output_dir (str): Root directory of the generated static files
+
+    Returns:
+        dict: Static and file path of the trimmed stylesheet, the glyphs
+        kept, and the sizes of the font a browser downloaded before and after
+    """
+    with open(finders.find(source), encoding='utf-8') as f:
+        css = css_purge.purge(f.read(), names)
+    rules, families = _strip_font_faces(css)
+    codepoints = {int(code, 16) for _, code in _CONTENT_RE.findall(rules)}
+
+    font_path = finders.find(font)
+    stem = posixpath.splitext(posixpath.basename(font))[0].lower()
+    # Browsers used to pick the WOFF2 or WOFF next to the TTF
+    for ext in ('.woff2', '.woff', posixpath.splitext(font)[1]):
+        shipped = os.path.splitext(font_path)[0] + ext
+        if os.path.exists(shipped):
+            break
+
+    os.makedirs(os.path.join(output_dir, OUTPUT_PREFIX), exist_ok=True)
+    face = ''
+    subset_size = 0
+    if codepoints and families:
+        font_name = f'{OUTPUT_PREFIX}/{stem}.woff2'
+        output_path = os.path.join(output_dir, *font_name.split('/'))
+        subset_font(font_path, codepoints, output_path)
+        subset_size = os.path.getsize(output_path)
+        face = (
+            f'@font-face{{font-family:"{families[0]}";src:url("{posixpath.basename(font_name)}") format("woff2");'
+            'font-weight:normal;font-style:normal;font-display:block}'
+        )
+
+    css_name = f'{OUTPUT_PREFIX}/{posixpath.basename(source)}'
+    css_path = os.path.join(output_dir, *css_name.split('/'))
+    with open(css_path, 'w', encoding='utf-8') as f:
+        f.write(face + rules)
+    return {
+        'css': css_name,
+        'path': css_path,
+        'glyphs': len(codepoints),
+        'font_size': os.path.getsize(shipped),
+        'subset_size': subset_size,
+    }
+
+
+def build_all(output_dir, names):
+    """
+    Subset every font in ICON_FONTS.
+
+    Returns:
+        dict: Source stylesheet -> result of ``build_stylesheet()``; empty
+        when fontTools is not installed
+    """
+    if not is_available():
+        logger.warning('fontTools/brotli not installed; icon fonts are not subset')
+        return {}
+    results = {}
+    for source, font in setting('ICON_FONTS', {}).items():
+        results[source] = build_stylesheet(source, font, names, output_dir)
+        logger.info(f'Subset icon font for {source}: {results[source]["glyphs"]} glyphs')
+    return results
@@ -0,0 +1,102 @@
+"""
+Benchmark contact POST capacity of the sync and async views under slow SMTP.
+
+A burst of concurrent contact submissions is sent with the outbox and Celery
+out of the picture, so every request falls back to synchronous SMTP against
+a local sink that answers slowly. The sync view gets a fixed number of
+request slots (gunicorn's 2 workers x 4 threads); the async view runs on one
+event loop. Latency is measured from the start of the burst, so it includes
+time spent waiting for a slot.
+
+Usage:
+    python manage.py bench_async --requests 64 --smtp-delay 500
+"""
+
+import asyncio
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client, override_settings
+from django.urls import path
+
+from portfolio_app import async_views, bench, captcha, views
+
+# Both versions of the view side by side, used as ROOT_URLCONF while benchmarking
+urlpatterns = [
+    path('sync/', views.contact),
+    path('async/', async_views.contact),
+]
+
+
+def contact_post_data():
+    """Return valid contact form data with a fresh stateless CAPTCHA."""
+    challenge = captcha.new_challenge()
+    answer = sum(int(number) for number in re.findall(r'\d+', challenge.question))
+    return {
+        'name': 'Bench',
+        'email': 'bench@example.com',
+        'subject': 'Benchmark',
+        'message': 'Hello from bench_async',
+        'captcha': answer,
+        'captcha_token': challenge.token,
+    }
+
+
+class Command(BaseCommand):
+    help = 'Compare concurrent contact POST capacity of the WSGI-style sync view and the async view'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=64, help='Concurrent requests in the burst')
+        parser.add_argument('--smtp-delay', type=float, default=500.0, help='Milliseconds the SMTP sink stalls')
+        parser.add_argument('--slots', type=int, default=8, help='Request slots of the sync server')
+
+    def handle(self, *args, **options):
+        count = options['requests']
+        server = bench.start_smtp_sink(options['smtp_delay'] / 1000)
+        overrides = dict(
+            bench.smtp_sink_settings(server, password='bench'),
+            ROOT_URLCONF=__name__,
+            ALLOWED_HOSTS=['testserver'],  # Host sent by the test clients
+            EMAIL_OUTBOX_ENABLED=False,
+            CAPTCHA_STATELESS=True,
+        )
+
+        def run_sync():
+            start = time.perf_counter()
+
+            def post(data):
+                Client().post('/sync/', data)
+                return time.perf_counter() - start
+
+            payloads = [contact_post_data() for _ in range(count)]
+            with ThreadPoolExecutor(max_workers=options['slots']) as pool:
+                latencies = list(pool.map(post, payloads))
+            return {'wall': time.perf_counter() - start, 'latencies': latencies}
+
+        async def run_async():
+            start = time.perf_counter()
+
+            async def post(data):
+                await AsyncClient().post('/async/', data)
+                return time.perf_counter() - start
+
+            payloads = [contact_post_data() for _ in range(count)]
+            latencies = await asyncio.gather(*(post(data) for data in payloads))
+            return {'wall': time.perf_counter() - start, 'latencies': list(latencies)}
+
+        # Force the synchronous SMTP fallback in both views
+        no_workers = mock.patch.multiple(
+            'portfolio_app.views', is_celery_worker_available=lambda: False
+        )
+        no_async_workers = mock.patch.multiple(
+            'portfolio_app.async_views', is_celery_worker_available=lambda: False
+        )
+        try:
+            with override_settings(**overrides), no_workers, no_async_workers:
+                self.stdout.write(bench.summarize(f"sync, {options['slots']} slots", run_sync()))
+                self.stdout.write(bench.summarize('async, one event loop', asyncio.run(run_async())))
+        finally:
+            server.shutdown()
@@ -0,0 +1,57 @@
+"""
+Benchmark reads of a hot cache key from Redis alone and through the
+two-tier cache in ``portfolio_app.cache_backend``.
+
+Both caches talk to the Redis server in REDIS_URL. The value defaults to
+the size of the cached homepage, the hottest key of the site.
+
+Usage:
+    python manage.py bench_cache --requests 5000 --size 100000
+"""
+
+import time
+
+from django.core.cache.backends.redis import RedisCache
+from django.core.management.base import BaseCommand
+
+from portfolio_app import bench, redis_client
+from portfolio_app.cache_backend import TwoTierCache
+
+
+class Command(BaseCommand):
+    help = 'Compare reading a hot key from Redis alone and from the two-tier cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=5000, help='Timed reads per cache')
+        parser.add_argument('--warmup', type=int, default=100, help='Untimed reads per cache')
+        parser.add_argument('--size', type=int, default=100_000, help='Bytes of the cached value')
+        parser.add_argument('--concurrency', type=int, default=1, help='Threads reading at once')
+
+    def handle(self, *args, **options):
+        value = 'x' * options['size']
+        caches = [
+            ('redis only', RedisCache(redis_client.get_redis_url(), {'KEY_PREFIX': 'bench'})),
+            ('two-tier', TwoTierCache(None, {'KEY_PREFIX': 'bench', 'OPTIONS': {'CHANNEL': 'bench:invalidate'}})),
+        ]
+        for label, cache in caches:
+            cache.set('hot', value, 300)
+            cache.get('hot')
+            if isinstance(cache, TwoTierCache):
+                # Local copies are only used once the invalidation listener is subscribed
+                deadline = time.monotonic() + 5
+                while not cache.stats()['subscribed'] and time.monotonic() < deadline:
+                    time.sleep(0.05)
+
+            def read(cache=cache):
+                if cache.get('hot') is None:
+                    raise RuntimeError('Cached value disappeared')
+
+            result = bench.run(read, options['requests'], options['concurrency'], options['warmup'])
+            self.stdout.write(bench.summarize(label, result))
+            cache.delete('hot')
+
+        stats = caches[1][1].stats()
+        self.stdout.write(
+            f"two-tier: {stats['local_hits']} local hits, {stats['remote_hits']} Redis hits, "
+            f"{stats['invalidations']} invalidations"
+        )
@@ -0,0 +1,87 @@
+"""
+Time the Contact admin changelist at the top, in the middle and at the end
+of a large table, through numbered pages and through the "Older" links of
+``portfolio_app.pagination``.
+
+``--rows`` contacts are inserted inside a transaction that is rolled back
+at the end, so the command leaves the database as it found it. Run it
+against MySQL to see the estimated counts; other databases count exactly.
+
+Usage:
+    python manage.py bench_changelist --rows 1000000 --requests 20
+"""
+
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.utils import timezone
+
+from portfolio_app import bench
+from portfolio_app.models import Contact
+from portfolio_app.pagination import encode_cursor
+
+URL = '/admin/portfolio_app/contact/'
+
+
+class Command(BaseCommand):
+    help = 'Time Contact changelist pages by offset and by keyset on a large table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100_000, help='Contacts to insert for the run')
+        parser.add_argument('--requests', type=int, default=20, help='Timed views per page')
+        parser.add_argument('--host', default='localhost', help='Host header (must be in ALLOWED_HOSTS)')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self._run(options)
+            transaction.set_rollback(True)
+
+    def _run(self, options):
+        rows = options['rows']
+        start = timezone.now() - datetime.timedelta(seconds=rows)
+        batch = []
+        for i in range(rows):
+            batch.append(Contact(name=f'Bench {i}', email='bench@example.com', subject='Bench', message='x' * 500))
+            if len(batch) == 5000 or i == rows - 1:
+                Contact.objects.bulk_create(batch)
+                batch = []
+        # auto_now_add stamps every row alike; spread them one second apart
+        ids = Contact.objects.filter(subject='Bench').order_by('pk').values_list('pk', flat=True)
+        stamped = [Contact(pk=pk, created_at=start + datetime.timedelta(seconds=i)) for i, pk in enumerate(ids)]
+        Contact.objects.bulk_update(stamped, ['created_at'], batch_size=1000)
+
+        user = get_user_model().objects.create(username='bench-admin', is_staff=True, is_superuser=True)
+        client = Client(HTTP_HOST=options['host'])
+        client.force_login(user)
+
+        per_page = 100
+        pages = max(1, -(-Contact.objects.count() // per_page))
+        newest = Contact.objects.order_by('-created_at', '-pk')
+        middle = newest[(pages // 2) * per_page - 1] if pages > 1 else newest[0]
+        last = newest[(pages - 1) * per_page - 1] if pages > 1 else newest[0]
+        targets = [
+            ('page 1', URL),
+            (f'page {pages // 2}', f'{URL}?p={pages // 2}'),
+            (f'page {pages}', f'{URL}?p={pages}'),
+            (f'older, page {pages // 2 + 1}', f'{URL}?older={encode_cursor(middle)}'),
+            (f'older, page {pages}', f'{URL}?older={encode_cursor(last)}'),
+        ]
+        for label, url in targets:
+            def view(url=url):
+                response = client.get(url)
+                if response.status_code != 200:
+                    raise RuntimeError(f'GET {url} returned {response.status_code}')
+
+            queries = []
+
+            def record(execute, sql, params, many, context):
+                queries.append(sql)
+                return execute(sql, params, many, context)
+
+            with connection.execute_wrapper(record):
+                view()
+            result = bench.run(view, options['requests'])
+            self.stdout.write(f'{bench.summarize(label, result)}   {len(queries)} queries')
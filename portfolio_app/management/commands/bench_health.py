@@ -0,0 +1,100 @@
+"""
+Benchmark the cost of one /health/ probe through Django and through the
+WSGI/ASGI fast path in ``portfolio_django.health``.
+
+The applications are called in-process with a minimal WSGI environ or ASGI
+scope, so the numbers are the server-side CPU cost of a probe without any
+network or server overhead.
+
+Usage:
+    python manage.py bench_health --requests 5000
+"""
+
+import asyncio
+import io
+import sys
+
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+
+from portfolio_app import bench
+from portfolio_django.health import HealthCheckASGIMiddleware, HealthCheckWSGIMiddleware
+
+
+def wsgi_environ(host):
+    return {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': '/health/',
+        'QUERY_STRING': '',
+        'SERVER_NAME': host,
+        'SERVER_PORT': '8000',
+        'HTTP_HOST': host,
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.url_scheme': 'http',
+    }
+
+
+class Command(BaseCommand):
+    help = 'Compare the per-probe cost of /health/ through Django and through the WSGI/ASGI fast path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=5000, help='Timed probes per mode')
+        parser.add_argument('--warmup', type=int, default=100, help='Untimed probes per mode')
+        parser.add_argument('--host', default='localhost', help='Host header (must be in ALLOWED_HOSTS)')
+
+    def handle(self, *args, **options):
+        host = options['host']
+        django_wsgi = get_wsgi_application()
+
+        def wsgi_probe(app):
+            def probe():
+                statuses = []
+                body = b''.join(app(wsgi_environ(host), lambda status, headers: statuses.append(status)))
+                if not statuses[0].startswith('200') or b'healthy' not in body:
+                    raise RuntimeError(f'GET /health/ returned {statuses[0]}')
+            return probe
+
+        for label, app in (('WSGI django', django_wsgi), ('WSGI fast path', HealthCheckWSGIMiddleware(django_wsgi))):
+            result = bench.run(wsgi_probe(app), options['requests'], warmup=options['warmup'])
+            self.stdout.write(bench.summarize(label, result))
+
+        django_asgi = get_asgi_application()
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': '/health/', 'raw_path': b'/health/', 'query_string': b'',
+            'root_path': '', 'headers': [(b'host', host.encode())], 'server': (host, 8000),
+            'client': ('127.0.0.1', 50000),
+        }
+
+        async def asgi_probe(app):
+            messages = []
+            body_sent = asyncio.Event()
+
+            async def receive():
+                if body_sent.is_set():
+                    # Django listens for a disconnect until the response is done
+                    await asyncio.Event().wait()
+                body_sent.set()
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+            async def send(message):
+                messages.append(message)
+
+            await app(dict(scope), receive, send)
+            if messages[0]['status'] != 200:
+                raise RuntimeError(f"GET /health/ returned {messages[0]['status']}")
+
+        # One event loop for all probes, like a long-running ASGI server
+        loop = asyncio.new_event_loop()
+        try:
+            for label, app in (('ASGI django', django_asgi), ('ASGI fast path', HealthCheckASGIMiddleware(django_asgi))):
+                result = bench.run(
+                    lambda: loop.run_until_complete(asgi_probe(app)),
+                    options['requests'],
+                    warmup=options['warmup'],
+                )
+                self.stdout.write(bench.summarize(label, result))
+        finally:
+            loop.close()
@@ -0,0 +1,41 @@
+"""
+Benchmark GET / with and without the homepage page cache.
+
+Usage:
+    python manage.py bench_homepage --requests 500 --concurrency 4
+"""
+
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+
+from portfolio_app import bench, page_cache
+
+
+class Command(BaseCommand):
+    help = 'Compare requests/sec and p99 latency of the cached and uncached homepage'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Timed requests per mode')
+        parser.add_argument('--concurrency', type=int, default=1, help='Concurrent client threads')
+        parser.add_argument('--warmup', type=int, default=20, help='Untimed requests per mode')
+        parser.add_argument('--host', default='localhost', help='Host header (must be in ALLOWED_HOSTS)')
+
+    def handle(self, *args, **options):
+        host = options['host']
+
+        def get_homepage():
+            # A fresh client per request behaves like a new anonymous visitor
+            response = Client().get('/', HTTP_HOST=host)
+            if response.status_code != 200:
+                raise RuntimeError(f'GET / returned {response.status_code}')
+
+        for label, enabled in (('uncached (current)', False), ('page cache', True)):
+            page_cache.clear()
+            with override_settings(HOMEPAGE_CACHE_ENABLED=enabled):
+                result = bench.run(
+                    get_homepage,
+                    options['requests'],
+                    concurrency=options['concurrency'],
+                    warmup=options['warmup'],
+                )
+            self.stdout.write(bench.summarize(label, result))
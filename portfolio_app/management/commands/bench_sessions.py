@@ -0,0 +1,53 @@
+"""
+Count the database writes of homepage views with the database session
+engine and with the Redis engine in ``portfolio_app.session_backend``.
+
+The views run in session CAPTCHA mode (``CAPTCHA_STATELESS = False``), where
+every view stores a new CAPTCHA answer in the session. ``--visitors``
+clients take turns, so most views come from returning visitors.
+
+Usage:
+    python manage.py bench_sessions --views 1000 --visitors 100
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+ENGINES = (
+    ('database', 'django.contrib.sessions.backends.db'),
+    ('redis', 'portfolio_app.session_backend'),
+)
+WRITE_PREFIXES = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+class Command(BaseCommand):
+    help = 'Compare database writes per homepage view with the database and Redis session engines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--views', type=int, default=1000, help='Homepage views per engine')
+        parser.add_argument('--visitors', type=int, default=100, help='Distinct visitors making the views')
+        parser.add_argument('--host', default='localhost', help='Host header (must be in ALLOWED_HOSTS)')
+
+    def handle(self, *args, **options):
+        views = options['views']
+        for label, engine in ENGINES:
+            with override_settings(SESSION_ENGINE=engine, CAPTCHA_STATELESS=False):
+                clients = [Client(HTTP_HOST=options['host']) for _ in range(options['visitors'])]
+                clients[0].get('/')  # Render the page cache outside the count
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    for i in range(views):
+                        response = clients[i % len(clients)].get('/')
+                        if response.status_code != 200:
+                            raise RuntimeError(f'GET / returned {response.status_code}')
+                    elapsed = time.perf_counter() - start
+            writes = sum(1 for query in queries.captured_queries if query['sql'].lstrip().upper().startswith(WRITE_PREFIXES))
+            self.stdout.write(
+                f'{label:<10} {writes * 1000 / views:>8.1f} database writes per 1,000 views   '
+                f'{len(queries) * 1000 / views:>8.1f} queries per 1,000 views   '
+                f'{elapsed / views * 1000:>7.3f} ms per view'
+            )
@@ -0,0 +1,52 @@
+"""
+Benchmark contact email throughput against a local SMTP sink.
+
+Compares the old path (``EmailMessage.send()``, one connection per message)
+with the persistent connection kept by ``portfolio_app.smtp_pool``.
+
+Usage:
+    python manage.py bench_smtp --messages 200 --handshake-delay 50
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from portfolio_app import bench, smtp_pool
+from portfolio_app.tasks import build_contact_email
+
+
+class Command(BaseCommand):
+    help = 'Compare messages/sec of per-message SMTP connections and the persistent SMTP connection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=200, help='Messages per mode')
+        parser.add_argument('--handshake-delay', type=float, default=0.0,
+                            help='Milliseconds the sink waits before greeting, to simulate TLS and AUTH')
+
+    def handle(self, *args, **options):
+        server = bench.start_smtp_sink(options['handshake_delay'] / 1000)
+        email_settings = bench.smtp_sink_settings(server)
+
+        def message():
+            return build_contact_email('Bench', 'bench@example.com', 'Benchmark', 'Hello from bench_smtp')
+
+        try:
+            with override_settings(**email_settings):
+                result = bench.run(lambda: message().send(fail_silently=False), options['messages'])
+                self.stdout.write(bench.summarize('connection per message', result))
+
+                smtp_pool.close()
+                result = bench.run(lambda: smtp_pool.send(message()), options['messages'])
+                self.stdout.write(bench.summarize('persistent connection', result))
+
+                smtp_pool.close()
+                batch = [message() for _ in range(options['messages'])]
+                start = time.perf_counter()
+                smtp_pool.send_messages(batch)
+                wall = time.perf_counter() - start
+                self.stdout.write(f"{'batch (one task)':<24} {len(batch) / wall:>10.1f}/s")
+        finally:
+            smtp_pool.close()
+            server.shutdown()
@@ -0,0 +1,90 @@
+"""
+Benchmark serving a collected static file through Django's ``serve`` view and
+through the WSGI wrapper in ``portfolio_django.static_serving``.
+
+Django's view is called directly with a ``RequestFactory`` request, without
+the middleware stack, so it is a lower bound of what Django would cost. The
+wrapper is measured with brotli, without any compression and for a
+revalidation (304). Run collectstatic first.
+
+Usage:
+    python manage.py bench_static --file bundles/vendor.js --requests 2000
+"""
+
+import io
+import sys
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from django.views.static import serve
+
+from portfolio_app import bench
+from portfolio_django.static_serving import StaticFilesWSGIMiddleware
+
+
+def wsgi_environ(path, headers):
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '8000',
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.url_scheme': 'http',
+    }
+    environ.update({f"HTTP_{name.upper().replace('-', '_')}": value for name, value in headers.items()})
+    return environ
+
+
+class Command(BaseCommand):
+    help = "Compare serving a static file through Django's serve view and the in-process static wrapper"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default='bundles/vendor.js', help='Static path of the file to request')
+        parser.add_argument('--requests', type=int, default=2000, help='Timed requests per mode')
+        parser.add_argument('--warmup', type=int, default=50, help='Untimed requests per mode')
+
+    def handle(self, *args, **options):
+        try:
+            hashed = staticfiles_storage.stored_name(options['file'])
+        except ValueError:
+            raise CommandError(f"{options['file']} is not collected; run collectstatic first")
+        url = settings.STATIC_URL + hashed
+
+        factory = RequestFactory()
+        sizes = {}
+
+        def django_request():
+            response = serve(factory.get(url), hashed, document_root=settings.STATIC_ROOT)
+            sizes['django serve'] = len(b''.join(response))
+            response.close()
+
+        def django_wsgi(environ, start_response):
+            raise RuntimeError(f'{url} fell through to Django')
+
+        app = StaticFilesWSGIMiddleware(django_wsgi)
+        if url not in app.index:
+            raise CommandError(f'{url} is not in the static index; is STATIC_SERVE_ENABLED set?')
+
+        def wrapper_request(label, headers):
+            def request():
+                statuses = []
+                body = b''.join(app(wsgi_environ(url, headers), lambda status, h: statuses.append(status)))
+                if statuses[0][:3] not in ('200', '304'):
+                    raise RuntimeError(f'GET {url} returned {statuses[0]}')
+                sizes[label] = len(body)
+            return request
+
+        etag = app.index[url].variants.get('br', (None, None, app.index[url].etag))[2]
+        modes = [
+            ('django serve', django_request),
+            ('wrapper identity', wrapper_request('wrapper identity', {})),
+            ('wrapper br', wrapper_request('wrapper br', {'accept-encoding': 'gzip, deflate, br'})),
+            ('wrapper 304', wrapper_request('wrapper 304', {'accept-encoding': 'br', 'if-none-match': etag})),
+        ]
+        for label, func in modes:
+            result = bench.run(func, options['requests'], warmup=options['warmup'])
+            self.stdout.write(f"{bench.summarize(label, result)}   {sizes[label] / 1024:>8.1f} KB sent")
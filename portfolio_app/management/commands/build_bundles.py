@@ -0,0 +1,41 @@
+"""
+Build the static asset bundles listed in STATIC_BUNDLES.
+
+Run before ``collectstatic``, which adds the content hash to every bundle:
+
+    python manage.py build_bundles
+    python manage.py collectstatic --noinput
+"""
+
+from django.core.management.base import BaseCommand
+
+from portfolio_app import static_bundles
+
+
+class Command(BaseCommand):
+    help = 'Concatenate and minify the STATIC_BUNDLES into STATIC_BUNDLES_DIR'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output-dir', help='Write the bundles here instead of STATIC_BUNDLES_DIR')
+        parser.add_argument('--no-purge', action='store_true', help='Keep CSS rules no template uses')
+        parser.add_argument('--no-subset', action='store_true', help='Bundle the full icon fonts')
+
+    def handle(self, *args, **options):
+        results, purged, icons = static_bundles.build_all(
+            options['output_dir'],
+            purge=False if options['no_purge'] else None,
+            subset_fonts=False if options['no_subset'] else None,
+        )
+        if options['verbosity'] < 1:
+            return
+        for source, result in icons.items():
+            self.stdout.write(
+                f"font  {source:<34} {result['font_size'] / 1024:>8.1f} KB -> "
+                f"{result['subset_size'] / 1024:>8.1f} KB  ({result['glyphs']} glyphs, woff2)"
+            )
+        for source, before, after in purged:
+            saved = 100 * (before - after) / before if before else 0.0
+            self.stdout.write(f'purge {source:<34} {before / 1024:>8.1f} KB -> {after / 1024:>8.1f} KB  (-{saved:.0f}%)')
+        for name, source_size, bundle_size in results:
+            self.stdout.write(f'{name:<40} {source_size / 1024:>8.1f} KB -> {bundle_size / 1024:>8.1f} KB')
+        self.stdout.write(self.style.SUCCESS('Bundles built; run collectstatic to hash them'))
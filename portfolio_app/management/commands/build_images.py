@@ -0,0 +1,30 @@
+"""
+Build the responsive image variants listed in RESPONSIVE_IMAGES.
+
+Run before ``collectstatic``; unchanged images are skipped:
+
+    python manage.py build_images
+    python manage.py collectstatic --noinput
+"""
+
+from django.core.management.base import BaseCommand
+
+from portfolio_app import responsive_images
+
+
+class Command(BaseCommand):
+    help = 'Generate AVIF/WebP/JPEG variants at several widths for the static images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output-dir', help='Write the variants here instead of STATIC_BUNDLES_DIR')
+        parser.add_argument('--force', action='store_true', help='Rebuild images whose source has not changed')
+
+    def handle(self, *args, **options):
+        results = responsive_images.build_all(options['output_dir'], force=options['force'])
+        if options['verbosity'] < 1:
+            return
+        for name, status, source_size, sizes in results:
+            formats = '  '.join(f'{fmt} {size / 1024:.0f} KB' for fmt, size in sizes.items())
+            self.stdout.write(f'{status:<8} {name:<36} {source_size / 1024:>7.0f} KB -> {formats}')
+        built = sum(1 for result in results if result[1] == 'built')
+        self.stdout.write(self.style.SUCCESS(f'{built} built, {len(results) - built} unchanged'))
@@ -0,0 +1,116 @@
+"""
+Export contact submissions to a CSV or JSON Lines file, optionally gzipped.
+
+Rows are read and written in chunks (``portfolio_app.export``), so memory
+stays flat whatever the table size. After every chunk the file is synced
+and ``<output>.checkpoint`` records the last exported ID and the file size;
+running the same command again after a crash truncates the file to that
+size and carries on from that ID. Gzipped exports write every chunk as its
+own gzip member, so a file cut at a checkpoint is still a valid gzip file
+(gunzip and Python's gzip module read the members as one stream).
+
+Usage:
+    python manage.py export_contacts contacts.csv.gz
+    python manage.py export_contacts contacts.jsonl --since 2026-01-01 --until 2026-07-01
+    python manage.py export_contacts - --format jsonl | jq .email
+"""
+
+import json
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from portfolio_app import export
+from portfolio_app.models import Contact
+
+
+class Command(BaseCommand):
+    help = 'Stream contact submissions to a CSV or JSON Lines file, resuming from a checkpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help="File to write ('-' for stdout); a .gz suffix turns on --gzip")
+        parser.add_argument('--format', choices=export.FORMATS, help='Output format (default: from the file name, else csv)')
+        parser.add_argument('--gzip', action='store_true', help='gzip the output')
+        parser.add_argument('--since', help='Only contacts created at or after this ISO date/datetime')
+        parser.add_argument('--until', help='Only contacts created before this ISO date/datetime')
+        parser.add_argument('--chunk-size', type=int, help='Rows per query (default: CONTACT_EXPORT_CHUNK_SIZE)')
+        parser.add_argument('--restart', action='store_true', help='Ignore an existing checkpoint and start over')
+
+    def handle(self, *args, **options):
+        output = options['output']
+        name = output[:-3] if output.endswith('.gz') else output
+        compress = options['gzip'] or output.endswith('.gz')
+        fmt = options['format'] or ('jsonl' if name.endswith(('.jsonl', '.ndjson')) else 'csv')
+        try:
+            since = export.parse_bound(options['since']) if options['since'] else None
+            until = export.parse_bound(options['until']) if options['until'] else None
+        except ValueError as e:
+            raise CommandError(e)
+        queryset = export.filter_range(Contact.objects.all(), since, until)
+        chunk_args = {'chunk_size': options['chunk_size']}
+
+        if output == '-':
+            for data in export.stream(queryset, fmt, compress, **chunk_args):
+                sys.stdout.buffer.write(data)
+            sys.stdout.buffer.flush()
+            return
+
+        checkpoint_path = f'{output}.checkpoint'
+        job = {
+            'format': fmt,
+            'gzip': compress,
+            'since': since and since.isoformat(),
+            'until': until and until.isoformat(),
+        }
+        state = self._load_checkpoint(checkpoint_path, job, options['restart'])
+        if state and not os.path.exists(output):
+            raise CommandError(f'{checkpoint_path} exists but {output} does not; pass --restart to start over')
+        if state:
+            self.stdout.write(f"Resuming after contact {state['last_id']} ({state['rows']} rows already exported)")
+        else:
+            state = {**job, 'last_id': 0, 'rows': 0, 'offset': 0}
+
+        with open(output, 'r+b' if state['offset'] else 'wb') as fh:
+            fh.truncate(state['offset'])
+            fh.seek(state['offset'])
+            if not state['offset']:
+                self._write(fh, export.header(fmt), compress)
+            for rows in export.iter_chunks(queryset, after=state['last_id'], **chunk_args):
+                self._write(fh, export.encode_rows(rows, fmt), compress)
+                fh.flush()
+                os.fsync(fh.fileno())
+                state.update(last_id=rows[-1][0], rows=state['rows'] + len(rows), offset=fh.tell())
+                self._save_checkpoint(checkpoint_path, state)
+
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        size = os.path.getsize(output)
+        self.stdout.write(self.style.SUCCESS(f"Exported {state['rows']} contacts to {output} ({size / 1024:.0f} KB)"))
+
+    @staticmethod
+    def _write(fh, text, compress):
+        data = text.encode()
+        if compress:
+            compressor = export.gzip_compressor()
+            data = compressor.compress(data) + compressor.flush()
+        if data:
+            fh.write(data)
+
+    @staticmethod
+    def _load_checkpoint(path, job, restart):
+        if restart or not os.path.exists(path):
+            return None
+        with open(path) as fh:
+            state = json.load(fh)
+        if any(state.get(key) != value for key, value in job.items()):
+            raise CommandError(f'{path} belongs to an export with other options; pass --restart to start over')
+        return state
+
+    @staticmethod
+    def _save_checkpoint(path, state):
+        # Replace atomically so a crash never leaves a half-written checkpoint
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as fh:
+            json.dump(state, fh)
+        os.replace(tmp_path, path)
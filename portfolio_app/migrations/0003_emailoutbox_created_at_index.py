@@ -0,0 +1,17 @@
+# Generated by Django 5.2.3 on 2026-10-17 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("portfolio_app", "0002_emailoutbox"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="emailoutbox",
+            index=models.Index(fields=["created_at"], name="outbox_created_at_idx"),
+        ),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations
+
+FULLTEXT_COLUMNS = ('name', 'email', 'subject', 'message')
+INDEX_NAME = 'contact_fulltext_idx'
+
+
+def add_fulltext_index(apps, schema_editor):
+    # FULLTEXT indexes are MySQL-specific; other databases keep the LIKE search
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    qn = schema_editor.quote_name
+    columns = ', '.join(qn(column) for column in FULLTEXT_COLUMNS)
+    schema_editor.execute(
+        f'ALTER TABLE {qn("portfolio_app_contact")} ADD FULLTEXT INDEX {qn(INDEX_NAME)} ({columns})'
+    )
+
+
+def drop_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    qn = schema_editor.quote_name
+    schema_editor.execute(f'ALTER TABLE {qn("portfolio_app_contact")} DROP INDEX {qn(INDEX_NAME)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("portfolio_app", "0003_emailoutbox_created_at_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(add_fulltext_index, drop_fulltext_index),
+    ]
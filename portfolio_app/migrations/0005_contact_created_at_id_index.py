@@ -0,0 +1,17 @@
+# Generated by Django 5.2.3 on 2026-10-17 01:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("portfolio_app", "0004_contact_fulltext_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="contact",
+            index=models.Index(fields=["created_at", "id"], name="contact_created_at_id_idx"),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-17 01:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("portfolio_app", "0005_contact_created_at_id_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="contact",
+            name="fingerprint",
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True),
+        ),
+    ]
@@ -25,6 +25,11 @@ class Contact(models.Model):
     subject = models.CharField(max_length=200)  # Subject line of the message
     message = models.TextField()  # The actual message content
     created_at = models.DateTimeField(auto_now_add=True)  # Timestamp when message was sent
+    # Hash of email/subject/message and time window; rejects duplicate submissions
+    # when Redis is unavailable (portfolio_app.duplicates)
+    fingerprint = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
+    # On MySQL, name/email/subject/message also have a FULLTEXT index for the admin
+    # search (migration 0004, portfolio_app.fulltext)
 
     def __str__(self):
         """String representation for admin interface"""
@@ -32,4 +37,47 @@ class Contact(models.Model):
 
     class Meta:
         verbose_name = "Contact Form Submission"
-        verbose_name_plural = "Contact Form Submissions"
\ No newline at end of file
+        verbose_name_plural = "Contact Form Submissions"
+        indexes = [
+            # Admin changelist order (-created_at, -id), date filter and keyset pages
+            models.Index(fields=['created_at', 'id'], name='contact_created_at_id_idx'),
+        ]
+
+class EmailOutbox(models.Model):
+    """
+    Email Outbox Model
+
+    Pending contact notification emails. A row is written in the same
+    transaction as its Contact, and a Celery beat relay hands the row IDs to
+    workers, so the contact form never waits on SMTP or the broker.
+    """
+    PENDING = 'pending'  # Waiting for the relay
+    QUEUED = 'queued'  # Handed to a Celery worker
+    SENT = 'sent'  # Email delivered to the SMTP server
+    FAILED = 'failed'  # Gave up after EMAIL_OUTBOX_MAX_ATTEMPTS
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (QUEUED, 'Queued'),
+        (SENT, 'Sent'),
+        (FAILED, 'Failed'),
+    ]
+
+    contact = models.ForeignKey(Contact, on_delete=models.CASCADE, related_name='outbox_messages')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)  # Delivery attempts so far
+    last_error = models.TextField(blank=True)  # Error of the last failed attempt
+    created_at = models.DateTimeField(auto_now_add=True)
+    queued_at = models.DateTimeField(null=True, blank=True)  # When the relay last queued it
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        """String representation for admin interface"""
+        return f"{self.contact} ({self.status})"
+
+    class Meta:
+        verbose_name = "Email Outbox Message"
+        verbose_name_plural = "Email Outbox"
+        indexes = [
+            models.Index(fields=['status', 'id'], name='outbox_status_id_idx'),
+            models.Index(fields=['created_at'], name='outbox_created_at_idx'),
+        ]
@@ -0,0 +1,213 @@
+"""
+One-time password store for the admin two-factor login.
+
+The login flow used to keep nine keys in the session (code, user ID, email,
+last send time, failure flag, ...), look the user up again on every resend
+and verification, and compare the code in Python, so two requests racing on
+the same session could both pass or both be counted once. Here the state of
+a login lives in Redis, and the session only holds its random token
+(``otp_token``):
+
+- ``otp:<token>`` is a hash with the code, the user ID and what the login
+  page shows (username, email, masked email), and the attempt counter. It
+  expires ``OTP_TTL`` seconds after the last code was sent.
+- ``otp:<token>:resend`` exists while a new code may not be requested; its
+  TTL is the cooldown (``OTP_RESEND_COOLDOWN``), enforced here and not by
+  the page's timer. A wrong code deletes it, so the user can ask for a new
+  code straight away, as before.
+
+Verification runs as one Lua script: it counts the attempt (``HINCRBY``),
+deletes the login after ``OTP_MAX_ATTEMPTS`` wrong codes (the password has
+to be entered again), and deletes it on success, so a code is used once.
+Resends keep the attempt counter, so asking for new codes does not reset
+the limit. Everything is shared by all web processes and replicas.
+"""
+
+import logging
+import secrets
+
+from . import redis_client
+from .conf import setting
+from .redis_client import RedisError
+
+logger = logging.getLogger(__name__)
+
+SESSION_KEY = 'otp_token'
+
+# Results of verify()
+VERIFIED = 'verified'
+INVALID = 'invalid'
+LOCKED = 'locked'
+EXPIRED = 'expired'
+
+# KEYS[1]: login hash, KEYS[2]: resend cooldown; ARGV: code, max attempts
+# Returns {1, user ID} on success, {0, attempts left} for a wrong code,
+# {-1, 0} if the login expired and {-2, 0} once it is locked out
+_VERIFY = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return {-1, 0}
+end
+local attempts = redis.call('HINCRBY', KEYS[1], 'attempts', 1)
+local max_attempts = tonumber(ARGV[2])
+if redis.call('HGET', KEYS[1], 'code') == ARGV[1] and attempts <= max_attempts then
+    local user_id = redis.call('HGET', KEYS[1], 'user_id')
+    redis.call('DEL', KEYS[1], KEYS[2])
+    return {1, user_id}
+end
+if attempts >= max_attempts then
+    redis.call('DEL', KEYS[1], KEYS[2])
+    return {-2, 0}
+end
+redis.call('DEL', KEYS[2])
+return {0, max_attempts - attempts}
+"""
+
+# KEYS[1]: login hash, KEYS[2]: resend cooldown; ARGV: new code, TTL, cooldown (seconds)
+# Returns {1, 0} if the code was replaced, {0, milliseconds left} during the
+# cooldown and {-1, 0} if the login expired
+_RESEND = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return {-1, 0}
+end
+if redis.call('SET', KEYS[2], 1, 'NX', 'EX', ARGV[3]) == false then
+    return {0, redis.call('PTTL', KEYS[2])}
+end
+redis.call('HSET', KEYS[1], 'code', ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return {1, 0}
+"""
+
+_scripts = {}
+
+
+def _keys(token):
+    prefix = setting('OTP_KEY_PREFIX', 'otp:')
+    return f'{prefix}{token}', f'{prefix}{token}:resend'
+
+
+def _script(client, name, source):
+    if name not in _scripts:
+        _scripts[name] = client.register_script(source)
+    return _scripts[name]
+
+
+def _decode(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def new_code():
+    """Return a random six-digit code."""
+    return f'{secrets.randbelow(1_000_000):06d}'
+
+
+def cooldown():
+    return setting('OTP_RESEND_COOLDOWN', 61)
+
+
+def start(user_id, **profile):
+    """
+    Start an OTP login for a user whose password was checked.
+
+    Args:
+        user_id (int): ID of the user logging in
+        **profile: Strings the login page shows (username, email, masked_email)
+
+    Returns:
+        tuple: (token for the session, code to send)
+
+    Raises:
+        RedisError: If the login cannot be stored
+    """
+    token = secrets.token_urlsafe(24)
+    code = new_code()
+    login_key, resend_key = _keys(token)
+    pipe = redis_client.get_redis().pipeline()
+    pipe.hset(login_key, mapping={**profile, 'user_id': user_id, 'code': code, 'attempts': 0})
+    pipe.expire(login_key, setting('OTP_TTL', 600))
+    pipe.set(resend_key, 1, ex=cooldown())
+    pipe.execute()
+    return token, code
+
+
+def get(token):
+    """
+    Return the state of a login for the login page.
+
+    Returns:
+        dict: Profile fields and ``cooldown`` (seconds until a new code may
+        be sent), or None if there is no such login any more
+    """
+    if not token:
+        return None
+    login_key, resend_key = _keys(token)
+    pipe = redis_client.get_redis().pipeline(transaction=False)
+    pipe.hgetall(login_key)
+    pipe.pttl(resend_key)
+    fields, cooldown_ms = pipe.execute()
+    if not fields:
+        return None
+    state = {_decode(key): _decode(value) for key, value in fields.items()}
+    state.pop('code', None)
+    state['cooldown'] = max(0, -(-cooldown_ms // 1000))
+    return state
+
+
+def resend(token):
+    """
+    Replace the code of a login, unless the cooldown is still running.
+
+    Returns:
+        tuple: (new code or None, seconds left of the cooldown); both are
+        None/0 if the login expired
+    """
+    login_key, resend_key = _keys(token)
+    client = redis_client.get_redis()
+    code = new_code()
+    sent, wait_ms = _script(client, 'resend', _RESEND)(
+        keys=[login_key, resend_key],
+        args=[code, setting('OTP_TTL', 600), cooldown()],
+        client=client,
+    )
+    if sent == 1:
+        return code, 0
+    return None, max(0, -(-wait_ms // 1000))
+
+
+def verify(token, code):
+    """
+    Check a code and count the attempt.
+
+    Args:
+        token (str): Token from the session
+        code (str): Code entered by the user
+
+    Returns:
+        tuple: (VERIFIED, user ID), (INVALID, attempts left), (LOCKED, 0)
+        or (EXPIRED, 0)
+    """
+    if not token:
+        return EXPIRED, 0
+    client = redis_client.get_redis()
+    result, value = _script(client, 'verify', _VERIFY)(
+        keys=list(_keys(token)),
+        args=[(code or '').strip(), setting('OTP_MAX_ATTEMPTS', 5)],
+        client=client,
+    )
+    if result == 1:
+        return VERIFIED, int(value)
+    if result == -2:
+        logger.warning('Admin OTP login locked out after too many wrong codes')
+        return LOCKED, 0
+    if result == -1:
+        return EXPIRED, 0
+    return INVALID, value
+
+
+def discard(token):
+    """Forget a login (the user started over)."""
+    if not token:
+        return
+    try:
+        redis_client.get_redis().delete(*_keys(token))
+    except (RedisError, RuntimeError) as e:
+        logger.warning(f'Discarding an OTP login failed: {e}')
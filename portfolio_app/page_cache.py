@@ -0,0 +1,200 @@
+"""
+Server-side page cache for the portfolio homepage.
+
+Almost all of ``index.html`` is identical for every visitor. The only
+per-request parts are the CSRF token, the CAPTCHA question and token, and
+the flash messages shown after a contact form submission. The page is
+therefore rendered once per content version with placeholder markers in
+those positions, stored in Django's cache, and every request just splices
+its own values into the cached markup.
+
+A cold cache is filled by a single render: threads of one process serialise
+on a process lock, and processes coordinate through a short-lived lock key in
+the shared cache while the others wait for the result. The lock holds a
+random token, and a process only deletes the lock if it still holds its own
+token: a render slower than the lock timeout must not release a lock another
+process has taken since.
+"""
+
+import hashlib
+import logging
+import re
+import secrets
+import threading
+import time
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.template.loader import get_template, render_to_string
+from django.utils.html import escape
+
+from . import responsive_images, static_bundles
+from .captcha import Challenge
+from .conf import setting
+from .forms import ContactForm
+
+logger = logging.getLogger(__name__)
+
+HOMEPAGE_TEMPLATE = 'index.html'
+MESSAGES_TEMPLATE = 'partials/contact_messages.html'
+
+# Placeholder markers rendered into the cached page
+CSRF_SLOT = '__page_cache_csrf__'
+CAPTCHA_SLOT = '__page_cache_captcha__'
+CAPTCHA_TOKEN_SLOT = '__page_cache_captcha_token__'
+MESSAGES_SLOT = '<!--page-cache:messages-->'
+
+_SLOT_PATTERN = re.compile(
+    '(%s)' % '|'.join(re.escape(slot) for slot in (CSRF_SLOT, CAPTCHA_SLOT, CAPTCHA_TOKEN_SLOT, MESSAGES_SLOT))
+)
+
+# Per-process copy of the current page, already split into segments
+_local_page = {'key': None, 'segments': None}
+_render_lock = threading.Lock()
+_version = {'value': None}
+
+
+def get_page_version():
+    """
+    Return the content version of the homepage.
+
+    The version combines ``HOMEPAGE_CACHE_VERSION`` (set per deploy) with a
+    hash of the template sources and the static bundle URLs, so editing a
+    template or rebuilding assets never serves a stale page. It is computed once per process outside of DEBUG.
+    """
+    if _version['value'] is not None and not settings.DEBUG:
+        return _version['value']
+
+    digest = hashlib.sha1(setting('HOMEPAGE_CACHE_VERSION', '').encode())
+    for template_name in (HOMEPAGE_TEMPLATE, MESSAGES_TEMPLATE):
+        template = get_template(template_name)
+        digest.update(template.template.source.encode())
+    # Hashed bundle and image URLs change with every asset build
+    digest.update(static_bundles.version().encode())
+    digest.update(responsive_images.version().encode())
+    _version['value'] = digest.hexdigest()[:12]
+    return _version['value']
+
+
+def _cache_key():
+    return f'page_cache:homepage:{get_page_version()}'
+
+
+def _render_template():
+    """Render the homepage with placeholder markers for the per-visitor parts."""
+    form = ContactForm(captcha_challenge=Challenge(CAPTCHA_SLOT, CAPTCHA_TOKEN_SLOT))
+    context = {
+        'form': form,
+        'csrf_token': CSRF_SLOT,
+        'messages_slot': MESSAGES_SLOT,
+    }
+    return render_to_string(HOMEPAGE_TEMPLATE, context)
+
+
+def _release_lock(lock_key, token):
+    """Delete the render lock if it still holds ``token``."""
+    delete_if = getattr(cache, 'delete_if', None)
+    if delete_if is not None:
+        released = delete_if(lock_key, token)
+    else:
+        # Best effort for backends without an atomic compare-and-delete
+        released = cache.get(lock_key) == token and cache.delete(lock_key)
+    if not released:
+        logger.warning(f'Homepage render lock {lock_key} expired before the render finished')
+
+
+def _fetch_or_render(key):
+    """
+    Return the cached page, rendering it if needed.
+
+    Only the process that wins the lock key renders; the others poll the
+    cache for a short while and fall back to rendering locally if the lock
+    holder is too slow or has died.
+    """
+    page = cache.get(key)
+    if page is not None:
+        return page
+
+    timeout = setting('HOMEPAGE_CACHE_TIMEOUT', 60 * 60 * 24)
+    lock_key = f'{key}:lock'
+    lock_timeout = setting('HOMEPAGE_CACHE_LOCK_TIMEOUT', 10)
+
+    token = secrets.token_hex(16)
+    if cache.add(lock_key, token, lock_timeout):
+        try:
+            page = _render_template()
+            cache.set(key, page, timeout)
+            logger.info('Homepage rendered into page cache (%s)', key)
+        finally:
+            _release_lock(lock_key, token)
+        return page
+
+    deadline = time.monotonic() + setting('HOMEPAGE_CACHE_LOCK_WAIT', 2.0)
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        page = cache.get(key)
+        if page is not None:
+            return page
+
+    logger.warning('Timed out waiting for homepage render, rendering locally')
+    return _render_template()
+
+
+def get_page_segments():
+    """
+    Return the cached homepage split at its placeholder markers.
+
+    Even indexes of the list hold literal markup and odd indexes hold the
+    slot marker that has to be replaced per request.
+    """
+    key = _cache_key()
+    if _local_page['key'] == key:
+        return _local_page['segments']
+
+    with _render_lock:
+        if _local_page['key'] != key:
+            page = _fetch_or_render(key)
+            _local_page['segments'] = _SLOT_PATTERN.split(page)
+            _local_page['key'] = key
+        return _local_page['segments']
+
+
+def render_homepage(request, captcha_challenge):
+    """
+    Build the homepage response for this request from the cached page.
+
+    Args:
+        request: HTTP request object
+        captcha_challenge: ``captcha.Challenge`` to show in the contact form;
+            the token is empty in session CAPTCHA mode
+
+    Returns:
+        HttpResponse: The rendered homepage
+    """
+    storage = messages.get_messages(request)
+    messages_html = ''
+    if storage:
+        messages_html = render_to_string(MESSAGES_TEMPLATE, {'messages': storage})
+    # Messages are only shown once, same as the uncached render
+    storage.used = True
+
+    values = {
+        CSRF_SLOT: get_token(request),
+        CAPTCHA_SLOT: escape(captcha_challenge.question),
+        CAPTCHA_TOKEN_SLOT: escape(captcha_challenge.token),
+        MESSAGES_SLOT: messages_html,
+    }
+    segments = get_page_segments()
+    parts = [values[segment] if index % 2 else segment for index, segment in enumerate(segments)]
+    return HttpResponse(''.join(parts))
+
+
+def clear():
+    """Drop the cached homepage for the current version."""
+    key = _cache_key()
+    cache.delete(key)
+    _local_page['key'] = None
+    _local_page['segments'] = None
@@ -0,0 +1,216 @@
+"""
+Contact admin pagination that stays fast as the table grows.
+
+Django's admin changelist runs ``COUNT(*)`` on every page load and fetches
+page N with ``LIMIT ... OFFSET``, so both get slower with every stored
+contact. For the Contact changelist (ordered by ``-created_at, -pk`` on the
+``(created_at, id)`` index added by migration 0005):
+
+- ``ContactPaginator.count`` reports MySQL's table statistics
+  (``information_schema.TABLES.TABLE_ROWS``) for the unfiltered list once
+  they exceed ``CONTACT_ADMIN_ESTIMATED_COUNT_THRESHOLD``; filtered lists and
+  small tables are counted exactly.
+- Numbered pages deeper than ``CONTACT_ADMIN_MAX_OFFSET`` rows read the
+  ``(created_at, id)`` key of their first row from the index alone, then
+  seek to it, instead of reading every skipped row.
+- The "Older" / "Newer" links carry the key of the last / first row shown
+  (``?older=`` / ``?newer=``), and ``ContactChangeList`` answers them with
+  an index range read of one page: the same cost on page 2 and page 500,000.
+
+Any other sort order (a clicked column, search relevance) falls back to the
+regular OFFSET pages.
+"""
+
+import datetime
+import logging
+
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ChangeList
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from .conf import setting
+
+logger = logging.getLogger(__name__)
+
+KEYSET_ORDERING = ('-created_at', '-pk')
+OLDER_VAR = 'older'
+NEWER_VAR = 'newer'
+CURSOR_VARS = (OLDER_VAR, NEWER_VAR)
+
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def encode_cursor(obj):
+    """Return the ``<microseconds since epoch>-<pk>`` position of ``obj``."""
+    delta = obj.created_at - _EPOCH
+    micros = (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+    return f'{micros}-{obj.pk}'
+
+
+def decode_cursor(value):
+    """
+    Parse a position made by ``encode_cursor``.
+
+    Returns:
+        tuple: (created_at, pk)
+
+    Raises:
+        ValueError, OverflowError: If ``value`` is not a position
+    """
+    micros, _, pk = value.partition('-')
+    return _EPOCH + datetime.timedelta(microseconds=int(micros)), int(pk)
+
+
+def is_keyset_ordered(queryset):
+    # The admin repeats ModelAdmin.ordering after the changelist's own ordering
+    return tuple(dict.fromkeys(queryset.query.order_by)) == KEYSET_ORDERING
+
+
+def estimated_count(queryset):
+    """
+    Return MySQL's estimate of the number of rows in the queryset's table.
+
+    InnoDB's estimate comes from sampled statistics and can be off by a few
+    percent; MySQL 8 also caches it for ``information_schema_stats_expiry``.
+
+    Returns:
+        int: The estimate, or None on other databases or if it is unavailable
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'mysql':
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT TABLE_ROWS FROM information_schema.TABLES '
+                'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s',
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+    except DatabaseError as e:
+        logger.warning(f'Reading the estimated row count failed: {e}')
+        return None
+    return int(row[0]) if row and row[0] is not None else None
+
+
+class ContactPaginator(Paginator):
+    """Paginator with estimated counts and seeks past deep offsets."""
+
+    estimated = False  # True when count is MySQL's estimate
+
+    @cached_property
+    def count(self):
+        # Only the unfiltered list can use the table-wide estimate
+        if not self.object_list.query.where:
+            estimate = estimated_count(self.object_list)
+            if estimate is not None and estimate >= setting('CONTACT_ADMIN_ESTIMATED_COUNT_THRESHOLD', 100_000):
+                self.estimated = True
+                return estimate
+        return super().count
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        if bottom <= setting('CONTACT_ADMIN_MAX_OFFSET', 1000) or not is_keyset_ordered(self.object_list):
+            return super().page(number)
+
+        # Walk the offset on the (created_at, id) index only, then fetch one page of rows
+        boundary = list(self.object_list.values_list('created_at', 'pk')[bottom:bottom + 1])
+        if not boundary:
+            # Past the real end of a table whose estimate was too high
+            return self._get_page([], number, self)
+        created_at, pk = boundary[0]
+        rows = self.object_list.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lte=pk))
+        return self._get_page(rows[:self.per_page], number, self)
+
+    def seek(self, position, newer=False):
+        """
+        Return the page of rows next to a position.
+
+        Args:
+            position (tuple): (created_at, pk) of a row, from ``decode_cursor``
+            newer (bool): Return the rows before the position instead of after
+
+        Returns:
+            tuple: (rows, has_newer, has_older)
+        """
+        created_at, pk = position
+        if newer:
+            after = Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk)
+            rows = list(self.object_list.filter(after).reverse()[:self.per_page + 1])
+            more = len(rows) > self.per_page
+            return rows[:self.per_page][::-1], more, True
+        before = Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk)
+        rows = list(self.object_list.filter(before)[:self.per_page + 1])
+        return rows[:self.per_page], True, len(rows) > self.per_page
+
+
+class ContactChangeList(ChangeList):
+    """Changelist answering ``?older=`` / ``?newer=`` with keyset pages."""
+
+    def __init__(self, request, *args, **kwargs):
+        self.cursor = None
+        self.cursor_newer = NEWER_VAR in request.GET
+        value = request.GET.get(NEWER_VAR if self.cursor_newer else OLDER_VAR)
+        if value is not None:
+            try:
+                self.cursor = decode_cursor(value)
+            except (ValueError, OverflowError):
+                raise IncorrectLookupParameters(f'Invalid position {value!r}')
+        self.newer_url = self.older_url = self.first_url = None
+        super().__init__(request, *args, **kwargs)
+        for var in CURSOR_VARS:
+            self.params.pop(var, None)
+            self.filter_params.pop(var, None)
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        for var in CURSOR_VARS:
+            lookup_params.pop(var, None)
+        return lookup_params
+
+    def get_query_string(self, new_params=None, remove=None):
+        # Filter, sort and page links start from the top again
+        new_params = new_params or {}
+        remove = [*(remove or ()), *(var for var in CURSOR_VARS if var not in new_params)]
+        return super().get_query_string(new_params, remove)
+
+    def get_results(self, request):
+        keyset = is_keyset_ordered(self.queryset) and not self.show_all
+        if self.cursor is None or not keyset:
+            self.cursor = None
+            super().get_results(request)
+            if keyset and self.multi_page:
+                rows = list(self.result_list)
+                has_older = len(rows) == self.list_per_page and (
+                    self.page_num < self.paginator.num_pages or self.paginator.estimated
+                )
+                self._set_links(rows, self.page_num > 1, has_older)
+            return
+
+        paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+        rows, has_newer, has_older = paginator.seek(self.cursor, newer=self.cursor_newer)
+        if self.cursor_newer and not has_newer:
+            # Back at the top: show the full first page rather than a partial one
+            rows = list(paginator.page(1).object_list)
+            has_older = paginator.num_pages > 1
+
+        self.result_count = paginator.count
+        self.show_full_result_count = self.model_admin.show_full_result_count
+        self.full_result_count = self.root_queryset.count() if self.show_full_result_count else None
+        self.show_admin_actions = not self.show_full_result_count or bool(self.full_result_count)
+        self.result_list = rows
+        self.can_show_all = False
+        self.multi_page = True
+        self.paginator = paginator
+        self._set_links(rows, has_newer, has_older)
+
+    def _set_links(self, rows, has_newer, has_older):
+        if rows and has_newer:
+            self.newer_url = self.get_query_string({NEWER_VAR: encode_cursor(rows[0])})
+            self.first_url = self.get_query_string()
+        if rows and has_older:
+            self.older_url = self.get_query_string({OLDER_VAR: encode_cursor(rows[-1])})
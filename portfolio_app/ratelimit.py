@@ -0,0 +1,225 @@
+"""
+Per-IP token-bucket rate limiting for the endpoints that do real work.
+
+The contact POST writes to MySQL (and may send mail), the CSRF-exempt
+CAPTCHA refresh writes the session, and the admin login POST checks a
+password hash and sends OTP emails. Nothing stopped one client from
+sending thousands of them and filling every gunicorn request slot.
+
+Views opt in with the ``limit`` decorator, naming a rule of
+``RATELIMIT_RULES``::
+
+    @ratelimit.limit('contact')
+    def contact(request): ...
+
+Each rule is a bucket of ``burst`` tokens refilled at ``rate`` (``'5/m'``:
+five per minute) per client IP and rule. A request takes a token, or is
+answered ``429 Too Many Requests`` with ``Retry-After`` before the view
+runs: before the session is loaded, before any query and before any SMTP
+connection.
+
+Buckets live in Redis and are updated by one Lua script, so the check and
+the update are atomic across every gunicorn worker and pod. When Redis
+fails, the buckets fall back to memory of the current process (limits then
+apply per process) and Redis is retried after ``RATELIMIT_REDIS_RETRY``
+seconds, so an outage costs one timeout, not one per request.
+
+The client IP is the one nginx saw: the ``RATELIMIT_PROXY_COUNT``-th
+``X-Forwarded-For`` entry from the right (entries further left are sent
+by the client and can be forged), else ``REMOTE_ADDR``. IPv6 clients are
+keyed by their /64 network.
+"""
+
+import ipaddress
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.http import HttpResponse, JsonResponse
+
+from . import redis_client
+from .conf import setting
+from .redis_client import RedisError
+
+logger = logging.getLogger(__name__)
+
+# KEYS[1]: bucket; ARGV: refill rate (tokens/second), burst, now (seconds), cost
+# Returns {allowed (0/1), milliseconds until enough tokens}
+_TOKEN_BUCKET = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or burst
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    wait = math.ceil((cost - tokens) / rate * 1000)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000))
+return {allowed, wait}
+"""
+
+_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+_state = {'script': None, 'redis_retry_at': 0.0, 'allowed': 0, 'limited': 0, 'fallback': 0}
+_local = OrderedDict()  # Fallback buckets: key -> (tokens, last refill time)
+_local_lock = threading.Lock()
+
+
+def parse_rate(rate):
+    """
+    Parse a rate like ``'5/m'``.
+
+    Returns:
+        float: Tokens per second
+    """
+    count, _, unit = rate.partition('/')
+    return int(count) / _UNITS[unit.strip().lower()[:1]]
+
+
+def get_rule(name):
+    """Return (tokens per second, burst) of a RATELIMIT_RULES entry."""
+    rule = setting('RATELIMIT_RULES', {})[name]
+    rate = parse_rate(rule['rate'])
+    return rate, rule.get('burst', max(1, round(rate * 60)))
+
+
+def client_ip(request):
+    """Return the rate limiting identity of the client: its IP, or /64 network for IPv6."""
+    address = request.META.get('REMOTE_ADDR', '')
+    proxies = setting('RATELIMIT_PROXY_COUNT', 0)
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+    if proxies and forwarded:
+        hops = [hop.strip() for hop in forwarded.split(',') if hop.strip()]
+        if len(hops) >= proxies:
+            address = hops[-proxies]
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return address[:64] or 'unknown'
+    if ip.version == 6:
+        if ip.ipv4_mapped is not None:
+            return str(ip.ipv4_mapped)
+        return str(ipaddress.ip_network(f'{ip}/64', strict=False))
+    return str(ip)
+
+
+def _take_local(key, rate, burst, now):
+    with _local_lock:
+        tokens, ts = _local.pop(key, (burst, now))
+        tokens = min(burst, tokens + max(0.0, now - ts) * rate)
+        if tokens >= 1:
+            _local[key] = (tokens - 1, now)
+            result = (True, 0.0)
+        else:
+            _local[key] = (tokens, now)
+            result = (False, (1 - tokens) / rate)
+        while len(_local) > setting('RATELIMIT_LOCAL_MAX_KEYS', 10_000):
+            _local.popitem(last=False)
+    return result
+
+
+def take(rule, identity):
+    """
+    Take a token from the bucket of ``identity`` for ``rule``.
+
+    Args:
+        rule (str): Name of a RATELIMIT_RULES entry
+        identity (str): Who is limited, usually ``client_ip(request)``
+
+    Returns:
+        tuple: (allowed, seconds until a token is available)
+    """
+    rate, burst = get_rule(rule)
+    key = f"{setting('RATELIMIT_KEY_PREFIX', 'ratelimit:')}{rule}:{identity}"
+    now = time.time()
+    result = None
+    if time.monotonic() >= _state['redis_retry_at']:
+        try:
+            client = redis_client.get_redis()
+            if _state['script'] is None:
+                _state['script'] = client.register_script(_TOKEN_BUCKET)
+            allowed, wait_ms = _state['script'](keys=[key], args=[rate, burst, now, 1], client=client)
+            result = (bool(allowed), wait_ms / 1000)
+        except (RedisError, RuntimeError) as e:
+            _state['redis_retry_at'] = time.monotonic() + setting('RATELIMIT_REDIS_RETRY', 5)
+            logger.warning(f'Rate limiting falls back to per-process buckets: {e}')
+    if result is None:
+        _state['fallback'] += 1
+        result = _take_local(key, rate, burst, now)
+    _state['allowed' if result[0] else 'limited'] += 1
+    return result
+
+
+def _too_many_requests(retry_after, json_response):
+    if json_response:
+        response = JsonResponse({'success': False, 'error': 'Too many requests'}, status=429)
+    else:
+        response = HttpResponse('Too many requests. Please try again later.', status=429, content_type='text/plain')
+    response['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def _check(request, rule, methods, json_response):
+    """Return a 429 response if the request is over its limit, else None."""
+    if not setting('RATELIMIT_ENABLED', True) or request.method not in methods:
+        return None
+    identity = client_ip(request)
+    allowed, retry_after = take(rule, identity)
+    if allowed:
+        return None
+    logger.debug(f'Rate limited {request.method} {request.path} from {identity} ({rule})')
+    return _too_many_requests(retry_after, json_response)
+
+
+def limit(rule, methods=('POST',), json_response=False):
+    """
+    Decorate a view (sync or async) with a RATELIMIT_RULES rule.
+
+    Args:
+        rule (str): Name of the rule
+        methods (tuple): HTTP methods that take a token; others pass freely
+        json_response (bool): Answer 429 with JSON (for AJAX endpoints)
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                # One Redis round trip; thread_sensitive=False keeps it off the shared sync thread
+                limited = await sync_to_async(_check, thread_sensitive=False)(request, rule, methods, json_response)
+                if limited is not None:
+                    return limited
+                return await view(request, *args, **kwargs)
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            limited = _check(request, rule, methods, json_response)
+            if limited is not None:
+                return limited
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def stats():
+    """Return rate limiting counters of this process for the metrics endpoint."""
+    return {
+        'allowed': _state['allowed'],
+        'limited': _state['limited'],
+        'fallback': _state['fallback'],
+        'redis_available': time.monotonic() >= _state['redis_retry_at'],
+        'local_buckets': len(_local),
+    }
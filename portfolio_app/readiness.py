@@ -0,0 +1,197 @@
+"""
+Background dependency probes for the readiness endpoint.
+
+``/health/`` is a liveness check and never touches the network. ``/ready/``
+reports whether MySQL, Redis and the Celery workers are reachable, but
+load-balancer polling must not turn into three network round trips per
+probe. Each web process therefore runs a daemon thread that probes the
+dependencies every READINESS_PROBE_INTERVAL seconds and keeps the results in
+memory; ``snapshot()`` only reads them. The WSGI/ASGI entry points start
+the thread when the application is loaded, so the first ``/ready/`` poll
+after a deploy already finds results.
+
+``/ready/`` is unauthenticated, so it only says which checks pass and how
+long each probe took; error messages are logged and shown on /metrics/
+(``details()``).
+
+Only the dependencies listed in READINESS_REQUIRED_CHECKS make the process
+unready. Redis and Celery are reported but optional by default, since contact
+submissions are stored in the outbox and sent once they come back.
+"""
+
+import logging
+import os
+import threading
+import time
+
+from django.db import connection
+
+from . import redis_client, worker_monitor
+from .conf import setting
+
+logger = logging.getLogger(__name__)
+
+OK = 'ok'
+ERROR = 'error'
+
+# In-memory probe results for this process
+_state = {
+    'pid': None,
+    'results': {},
+    'checked_at': 0.0,
+}
+_start_lock = threading.Lock()
+
+
+# ---------------------------------------------------------------------------
+# Probes
+# ---------------------------------------------------------------------------
+
+def probe_database():
+    # Drop a connection the server has closed instead of failing on it forever
+    connection.close_if_unusable_or_obsolete()
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+
+
+def probe_redis():
+    if redis_client.redis is None:
+        raise RuntimeError('The redis package is not installed')
+    redis_client.get_redis().ping()
+
+
+def probe_celery():
+    if redis_client.redis is None:
+        raise RuntimeError('The redis package is not installed')
+    if not redis_client.get_redis().exists(worker_monitor.HEARTBEAT_KEY):
+        raise RuntimeError('No worker heartbeat')
+
+
+PROBES = {
+    'database': probe_database,
+    'redis': probe_redis,
+    'celery': probe_celery,
+}
+
+
+def _run_probe(name, probe):
+    start = time.perf_counter()
+    try:
+        probe()
+        status, error = OK, None
+    except Exception as e:
+        status, error = ERROR, str(e)
+        if name == 'database':
+            connection.close()
+    result = {
+        'status': status,
+        'latency_ms': round((time.perf_counter() - start) * 1000, 2),
+    }
+    if error:
+        result['error'] = error
+    return result
+
+
+def check():
+    """Run every probe once and store the results for this process."""
+    results = {name: _run_probe(name, probe) for name, probe in PROBES.items()}
+    previous = _state['results']
+    for name, result in results.items():
+        before = previous.get(name, {}).get('status')
+        # Log changes, and a first result that is already an error, with the reason
+        if before != result['status'] and (before is not None or result['status'] != OK):
+            reason = f": {result['error']}" if 'error' in result else ''
+            logger.info(f"Readiness probe {name}: {before or 'starting'} -> {result['status']}{reason}")
+    _state['results'] = results
+    _state['checked_at'] = time.time()
+
+
+# ---------------------------------------------------------------------------
+# Probe thread
+# ---------------------------------------------------------------------------
+
+def start_probes():
+    """Start the probe thread for the current process if it is not running."""
+    with _start_lock:
+        if _state['pid'] == os.getpid():
+            return
+        _state['pid'] = os.getpid()
+        _state['results'] = {}
+        _state['checked_at'] = 0.0
+        thread = threading.Thread(target=_probe_loop, name='readiness-probes', daemon=True)
+        thread.start()
+
+
+def _probe_loop():
+    interval = setting('READINESS_PROBE_INTERVAL', 5)
+    while True:
+        try:
+            check()
+        except Exception as e:
+            logger.warning(f'Readiness probes failed: {e}')
+        time.sleep(interval)
+
+
+# ---------------------------------------------------------------------------
+# Request path
+# ---------------------------------------------------------------------------
+
+def snapshot():
+    """
+    Return the last probe results of this process.
+
+    This is a plain in-memory read; the probe thread is started when the
+    application loads, or here in a process that does not have it yet (a
+    forked worker, the development server).
+
+    Returns:
+        tuple: (ready, payload) where ready is False while starting, when the
+        results are stale or when a required dependency is down, and payload
+        is the JSON body for /ready/
+    """
+    if _state['pid'] != os.getpid():
+        start_probes()
+
+    results = _state['results']
+    checked_at = _state['checked_at']
+    age = time.time() - checked_at if checked_at else None
+    required = setting('READINESS_REQUIRED_CHECKS', ('database',))
+
+    if not results:
+        status = 'starting'
+    elif age > setting('READINESS_MAX_AGE', 30):
+        # The probe thread is stuck; its results no longer say anything
+        status = 'stale'
+    elif any(results.get(name, {}).get('status') != OK for name in required):
+        status = 'unavailable'
+    elif any(result['status'] != OK for result in results.values()):
+        # An optional dependency is down; keep taking traffic
+        status = 'degraded'
+    else:
+        status = 'ready'
+
+    payload = {
+        'status': status,
+        'checks': {
+            name: {'status': result['status'], 'latency_ms': result['latency_ms']}
+            for name, result in results.items()
+        },
+    }
+    return status in ('ready', 'degraded'), payload
+
+
+def details():
+    """
+    Return the last probe results with latencies and errors, for /metrics/.
+
+    Returns:
+        dict: Probe results, required checks, breaker state and result age
+    """
+    checked_at = _state['checked_at']
+    return {
+        'checks': _state['results'],
+        'required': list(setting('READINESS_REQUIRED_CHECKS', ('database',))),
+        'celery_worker_breaker': worker_monitor.get_state(),
+        'checked_seconds_ago': round(time.time() - checked_at, 1) if checked_at else None,
+    }
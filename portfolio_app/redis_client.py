@@ -0,0 +1,117 @@
+"""
+Shared Redis client for portfolio_app.
+
+Every Redis user in the project gets its client from ``get_redis()``, which
+is backed by a single ``ConnectionPool`` per process configured from
+``REDIS_URL``. ``redis://``, ``rediss://`` (TLS) and ``unix://`` URLs are
+supported, including passwords and a database number in the URL.
+
+The pool is recreated after a fork, so a pool built in the gunicorn master
+(``--preload``) is never shared with the workers. ``pool_stats()`` reports
+pool usage for the metrics endpoint.
+
+Callers catch ``RedisError`` from here. Without the redis package it is
+``RuntimeError``, which is what ``get_redis()`` raises then.
+"""
+
+import logging
+import os
+import threading
+
+from .conf import setting
+
+try:
+    import redis
+    from redis.exceptions import RedisError
+except ImportError:  # pragma: no cover - Redis is optional in development
+    redis = None
+    RedisError = RuntimeError  # get_redis() raises RuntimeError instead
+
+logger = logging.getLogger(__name__)
+
+_pool = {'pid': None, 'pool': None, 'client': None, 'created': 0}
+_lock = threading.Lock()
+
+
+def get_redis_url():
+    """Return the Redis URL from settings, falling back to the environment."""
+    return setting('REDIS_URL', None) or os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/0')
+
+
+def _build_pool(url):
+    options = {
+        'max_connections': setting('REDIS_MAX_CONNECTIONS', 50),
+        'socket_timeout': setting('REDIS_SOCKET_TIMEOUT', 2),
+        'socket_connect_timeout': setting('REDIS_SOCKET_CONNECT_TIMEOUT', 2),
+        'health_check_interval': setting('REDIS_HEALTH_CHECK_INTERVAL', 30),
+    }
+    if url.startswith('rediss://'):
+        options['ssl_cert_reqs'] = setting('REDIS_SSL_CERT_REQS', 'required')
+    return redis.ConnectionPool.from_url(url, **options)
+
+
+def get_pool():
+    """Return the connection pool of the current process, creating it if needed."""
+    if redis is None:
+        raise RuntimeError('The redis package is not installed')
+
+    if _pool['pid'] != os.getpid():
+        with _lock:
+            if _pool['pid'] != os.getpid():
+                _pool['pool'] = _build_pool(get_redis_url())
+                _pool['client'] = redis.Redis(connection_pool=_pool['pool'])
+                _pool['created'] += 1
+                _pool['pid'] = os.getpid()
+    return _pool['pool']
+
+
+def get_redis():
+    """
+    Return the shared Redis client of the current process.
+
+    Returns:
+        redis.Redis: Client backed by the process-wide connection pool
+    """
+    get_pool()
+    return _pool['client']
+
+
+def reset():
+    """Drop the pool of this process; the next ``get_redis()`` builds a new one."""
+    with _lock:
+        pool = _pool['pool']
+        _pool.update(pid=None, pool=None, client=None)
+    if pool is not None and pool.pid == os.getpid():
+        pool.disconnect()
+
+
+def _reset_after_fork():
+    # Sockets inherited from the parent must never be used by the child
+    _pool.update(pid=None, pool=None, client=None)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def pool_stats():
+    """
+    Return usage counters of the connection pool of this process.
+
+    Returns:
+        dict: Connections created, in use and idle, the pool limit and how
+        many pools this process has built
+    """
+    pool = _pool['pool']
+    if pool is None or _pool['pid'] != os.getpid():
+        return {'pid': os.getpid(), 'active': False, 'pools_created': _pool['created']}
+
+    return {
+        'pid': os.getpid(),
+        'active': True,
+        'pools_created': _pool['created'],
+        'max_connections': pool.max_connections,
+        'created_connections': getattr(pool, '_created_connections', None),
+        'in_use_connections': len(getattr(pool, '_in_use_connections', ())),
+        'idle_connections': len(getattr(pool, '_available_connections', ())),
+    }
@@ -0,0 +1,296 @@
+"""
+Responsive image variants for the templates.
+
+``python manage.py build_images`` resizes every image matching
+``RESPONSIVE_IMAGES`` to the widths in ``RESPONSIVE_IMAGE_WIDTHS`` (never
+upscaling) and encodes each width as AVIF, WebP and JPEG (PNG for images
+with transparency). The variants and ``manifest.json`` go to
+``RESPONSIVE_IMAGES_DIR`` inside ``STATIC_BUNDLES_DIR``, so ``collectstatic``
+hashes them like the CSS/JS bundles.
+
+The build is incremental: the manifest stores a SHA-1 of every source (and
+of the width, format and quality settings), and a source whose hash and
+variants are unchanged is skipped.
+
+The ``{% responsive_image %}`` and ``{% responsive_background %}`` tags read
+the manifest to emit ``<picture>``/``srcset`` markup with intrinsic sizes, or
+a CSS ``image-set()`` for background images.
+"""
+
+import fnmatch
+import hashlib
+import json
+import logging
+import os
+import posixpath
+import shutil
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+
+from .conf import setting
+
+try:
+    from PIL import Image, features
+except ImportError:  # pragma: no cover - Pillow is only needed to build
+    Image = features = None
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+
+MIME_TYPES = {
+    'avif': 'image/avif',
+    'webp': 'image/webp',
+    'jpeg': 'image/jpeg',
+    'png': 'image/png',
+}
+EXTENSIONS = {'avif': 'avif', 'webp': 'webp', 'jpeg': 'jpg', 'png': 'png'}
+
+
+def _output_prefix():
+    """Static path under which variants and the manifest are stored."""
+    return setting('RESPONSIVE_IMAGES_DIR', 'images/responsive')
+
+
+# ---------------------------------------------------------------------------
+# Building
+# ---------------------------------------------------------------------------
+
+def find_sources():
+    """
+    Return the static paths of the images to process, with their file paths.
+
+    Returns:
+        list: (static path, absolute path) tuples, sorted by static path
+    """
+    patterns = setting('RESPONSIVE_IMAGES', [])
+    excludes = setting('RESPONSIVE_IMAGES_EXCLUDE', [])
+    prefix = _output_prefix()
+    sources = {}
+    for finder in finders.get_finders():
+        for path, storage in finder.list(['CVS', '.*', '*~']):
+            path = path.replace(os.sep, '/')
+            if path in sources or path.startswith(prefix + '/'):
+                continue
+            if any(fnmatch.fnmatchcase(path, p) for p in patterns) and not any(
+                fnmatch.fnmatchcase(path, p) for p in excludes
+            ):
+                sources[path] = storage.path(path)
+    return sorted(sources.items())
+
+
+def _formats(has_alpha):
+    formats = list(setting('RESPONSIVE_IMAGE_FORMATS', ['avif', 'webp', 'jpeg']))
+    if 'avif' in formats and not features.check('avif'):
+        logger.warning('Pillow was built without AVIF support; skipping AVIF variants')
+        formats.remove('avif')
+    if has_alpha:
+        # JPEG has no transparency; PNG is the fallback for those images
+        formats = ['png' if fmt == 'jpeg' else fmt for fmt in formats]
+    return formats
+
+
+def _has_alpha(image):
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        alpha = image.convert('RGBA').getchannel('A')
+        return alpha.getextrema()[0] < 255
+    return False
+
+
+def _save(image, path, fmt):
+    quality = setting('RESPONSIVE_IMAGE_QUALITY', {})
+    options = {}
+    if fmt == 'jpeg':
+        image = image.convert('RGB')
+        options = {'quality': quality.get('jpeg', 80), 'optimize': True, 'progressive': True}
+    elif fmt == 'webp':
+        options = {'quality': quality.get('webp', 78), 'method': 6}
+    elif fmt == 'avif':
+        options = {'quality': quality.get('avif', 60)}
+    elif fmt == 'png':
+        options = {'optimize': True}
+    image.save(path, fmt.upper(), **options)
+
+
+def build_image(static_path, file_path, output_dir, digest):
+    """
+    Write every width and format of one source image.
+
+    Args:
+        static_path (str): Static path of the source, e.g. 'images/P1.png'
+        file_path (str): Absolute path of the source
+        output_dir (str): Root directory of the generated static files
+        digest (str): SHA-1 of the source, part of the variant names
+
+    Returns:
+        dict: Manifest entry with the intrinsic size and the variants per format
+    """
+    with Image.open(file_path) as source:
+        source.load()
+        source_format = (source.format or '').lower()
+        image = source.convert('RGBA') if source.mode in ('P', 'LA', 'RGBA') else source.convert('RGB')
+    width, height = image.size
+    widths = sorted({w for w in setting('RESPONSIVE_IMAGE_WIDTHS', []) if w < width} | {width})
+    stem = posixpath.splitext(posixpath.basename(static_path))[0]
+    folder = posixpath.join(_output_prefix(), posixpath.dirname(static_path))
+    os.makedirs(os.path.join(output_dir, *folder.split('/')), exist_ok=True)
+
+    has_alpha = _has_alpha(image)
+    if not has_alpha and image.mode == 'RGBA':
+        image = image.convert('RGB')
+
+    variants = {}
+    for target in widths:
+        resized = image if target == width else image.resize(
+            (target, round(height * target / width)), Image.Resampling.LANCZOS
+        )
+        for fmt in _formats(has_alpha):
+            name = f'{folder}/{stem}.{digest[:8]}-{target}.{EXTENSIONS[fmt]}'
+            path = os.path.join(output_dir, *name.split('/'))
+            _save(resized, path, fmt)
+            if target == width and fmt == source_format and os.path.getsize(file_path) < os.path.getsize(path):
+                # Re-encoding an already optimised original only made it bigger
+                shutil.copyfile(file_path, path)
+            variants.setdefault(fmt, []).append([target, name])
+    return {'hash': digest, 'width': width, 'height': height, 'variants': variants}
+
+
+def _source_digest(file_path):
+    # Changing the widths, formats or quality also invalidates the variants
+    options = json.dumps([
+        setting('RESPONSIVE_IMAGE_WIDTHS', []),
+        setting('RESPONSIVE_IMAGE_FORMATS', []),
+        setting('RESPONSIVE_IMAGE_QUALITY', {}),
+    ], sort_keys=True)
+    digest = hashlib.sha1(options.encode())
+    with open(file_path, 'rb') as f:
+        digest.update(f.read())
+    return digest.hexdigest()
+
+
+def _is_current(entry, digest, output_dir):
+    if not entry or entry.get('hash') != digest:
+        return False
+    return all(
+        os.path.exists(os.path.join(output_dir, *name.split('/')))
+        for variants in entry['variants'].values()
+        for _, name in variants
+    )
+
+
+def build_all(output_dir=None, force=False):
+    """
+    Build the variants of every source image that changed since the last run.
+
+    Args:
+        output_dir (str): Root directory of the generated static files
+            (STATIC_BUNDLES_DIR by default)
+        force (bool): Rebuild unchanged images too
+
+    Returns:
+        list: (static path, 'built' or 'skipped', source bytes, bytes of the
+        full-width variant per format) for each image
+    """
+    if Image is None:
+        raise RuntimeError('Pillow is required to build responsive images')
+    output_dir = output_dir or setting('STATIC_BUNDLES_DIR', None)
+    manifest_path = os.path.join(output_dir, *_output_prefix().split('/'), MANIFEST_NAME)
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+
+    results, current = [], {}
+    for static_path, file_path in find_sources():
+        digest = _source_digest(file_path)
+        entry = manifest.get(static_path)
+        if not force and _is_current(entry, digest, output_dir):
+            status = 'skipped'
+        else:
+            _remove_variants(entry, output_dir)
+            entry = build_image(static_path, file_path, output_dir, digest)
+            status = 'built'
+            logger.info(f'Built responsive variants of {static_path}')
+        current[static_path] = entry
+        sizes = {
+            fmt: os.path.getsize(os.path.join(output_dir, *variants[-1][1].split('/')))
+            for fmt, variants in entry['variants'].items()
+        }
+        results.append((static_path, status, os.path.getsize(file_path), sizes))
+
+    # Sources that were deleted take their variants with them
+    for static_path in set(manifest) - set(current):
+        _remove_variants(manifest[static_path], output_dir)
+
+    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(current, f, indent=1, sort_keys=True)
+    _manifest.clear()
+    return results
+
+
+def _remove_variants(entry, output_dir):
+    for variants in (entry or {}).get('variants', {}).values():
+        for _, name in variants:
+            path = os.path.join(output_dir, *name.split('/'))
+            if os.path.exists(path):
+                os.remove(path)
+
+
+# ---------------------------------------------------------------------------
+# Request path
+# ---------------------------------------------------------------------------
+
+_manifest = {}
+
+
+def get_manifest():
+    """
+    Return the image manifest, or an empty dict before the first build.
+
+    It is read once per process outside of DEBUG.
+    """
+    if 'data' in _manifest and not settings.DEBUG:
+        return _manifest['data']
+    path = finders.find(posixpath.join(_output_prefix(), MANIFEST_NAME))
+    data = {}
+    if path:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+    _manifest['data'] = data
+    return data
+
+
+def get_entry(static_path):
+    """Return the manifest entry of a source image, or None if it has no variants."""
+    return get_manifest().get(static_path)
+
+
+def ordered_variants(entry):
+    """Return (format, variants) pairs, most efficient format first."""
+    return sorted(entry['variants'].items(), key=lambda item: list(MIME_TYPES).index(item[0]))
+
+
+def fallback_format(entry):
+    """Return the format every browser can decode: JPEG, or PNG for transparent images."""
+    return 'png' if 'png' in entry['variants'] else 'jpeg'
+
+
+def srcset(variants):
+    """Return a ``srcset`` value for a list of [width, static path] pairs."""
+    return ', '.join(f'{staticfiles_storage.url(name)} {width}w' for width, name in variants)
+
+
+def pick(variants, width):
+    """Return the static path of the smallest variant at least ``width`` pixels wide."""
+    for variant_width, name in variants:
+        if variant_width >= width:
+            return name
+    return variants[-1][1]
+
+
+def version():
+    """Return a short hash of the image manifest, for cache keys."""
+    return hashlib.sha1(json.dumps(get_manifest(), sort_keys=True).encode()).hexdigest()[:12]
@@ -0,0 +1,193 @@
+"""
+Retention job for contact submissions and expired database sessions.
+
+Nothing ever pruned ``portfolio_app_contact`` or ``django_session``, so both
+tables and their indexes grew forever. The ``prune_old_data`` beat task
+calls ``run()``, which:
+
+- appends contacts older than ``CONTACT_RETENTION_DAYS`` to gzipped monthly
+  JSON Lines files in ``CONTACT_ARCHIVE_DIR``
+  (``contacts-YYYY-MM.jsonl.gz``, one gzip member per batch, same fields as
+  ``export_contacts``), syncs them to disk, then deletes those rows and
+  their outbox rows;
+- deletes expired ``django_session`` rows (left from before sessions moved
+  to Redis).
+
+Rows go in primary-key ranges of ``RETENTION_BATCH_SIZE``, each range in its
+own short transaction, with a ``RETENTION_BATCH_PAUSE`` sleep in between,
+so MySQL never holds locks for long and replicas keep up. A run stops after
+``RETENTION_MAX_SECONDS`` and the next one carries on. A Redis lock keeps
+two workers from pruning at once.
+
+Rows are archived before they are deleted, so a crash in between can leave
+a contact in the archive twice; readers should dedupe on ``id``.
+
+``CONTACT_RETENTION_DAYS`` and ``CONTACT_ARCHIVE_DIR`` both default to
+None, which keeps every contact: the archive is the only copy left, so it
+is never written to a default directory that may not survive a redeploy.
+"""
+
+import datetime
+import logging
+import os
+import time
+import uuid
+from itertools import groupby
+
+from django.apps import apps
+from django.db import transaction
+from django.utils import timezone
+
+from . import export, redis_client
+from .conf import setting
+from .models import Contact, EmailOutbox
+from .redis_client import RedisError
+
+logger = logging.getLogger(__name__)
+
+LOCK_KEY = 'retention:lock'
+
+# KEYS[1]: lock; ARGV[1]: token of this run
+# Deletes the lock only if this run still holds it (it may have expired and been taken over)
+_RELEASE = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class _Budget:
+    """Time limit of one run, with the pause taken between batches."""
+
+    def __init__(self):
+        self.deadline = time.monotonic() + setting('RETENTION_MAX_SECONDS', 240)
+        self.pause = setting('RETENTION_BATCH_PAUSE', 0.2)
+
+    def exhausted(self):
+        return time.monotonic() >= self.deadline
+
+    def rest(self):
+        """Sleep between batches; return False once the run is out of time."""
+        time.sleep(self.pause)
+        return not self.exhausted()
+
+
+def archive_path(month):
+    return os.path.join(setting('CONTACT_ARCHIVE_DIR', None), f'contacts-{month}.jsonl.gz')
+
+
+def _append_archive(path, rows):
+    """Append rows to an archive file as one gzip member and sync it to disk."""
+    compressor = export.gzip_compressor()
+    data = compressor.compress(export.encode_rows(rows, 'jsonl').encode()) + compressor.flush()
+    with open(path, 'ab') as fh:
+        fh.write(data)
+        fh.flush()
+        os.fsync(fh.fileno())
+
+
+def archive_contacts(now, budget):
+    """
+    Archive and delete contacts older than CONTACT_RETENTION_DAYS.
+
+    Args:
+        now (datetime): Reference time for the cutoff
+        budget (_Budget): Time limit of the run
+
+    Returns:
+        int: Number of contacts archived and deleted; 0 unless both
+        CONTACT_RETENTION_DAYS and CONTACT_ARCHIVE_DIR are set
+    """
+    days = setting('CONTACT_RETENTION_DAYS', None)
+    if days is None:
+        return 0
+    archive_dir = setting('CONTACT_ARCHIVE_DIR', None)
+    if not archive_dir:
+        logger.error('Contacts not archived: CONTACT_RETENTION_DAYS is set but CONTACT_ARCHIVE_DIR is not')
+        return 0
+    cutoff = now - datetime.timedelta(days=days)
+    os.makedirs(archive_dir, exist_ok=True)
+
+    archived = 0
+    expired = Contact.objects.filter(created_at__lt=cutoff)
+    for rows in export.iter_chunks(expired, chunk_size=setting('RETENTION_BATCH_SIZE', 500)):
+        # created_at is the last field; rows are in ID order, so a month can come up twice
+        for month, month_rows in groupby(rows, key=lambda row: row[-1].strftime('%Y-%m')):
+            _append_archive(archive_path(month), list(month_rows))
+
+        first, last = rows[0][0], rows[-1][0]
+        with transaction.atomic():
+            EmailOutbox.objects.filter(contact_id__in=[row[0] for row in rows]).delete()
+            Contact.objects.filter(pk__range=(first, last), created_at__lt=cutoff).delete()
+        archived += len(rows)
+        if not budget.rest():
+            break
+    return archived
+
+
+def purge_sessions(now, budget):
+    """
+    Delete expired rows of the database session table.
+
+    Args:
+        now (datetime): Sessions that expired before this are deleted
+        budget (_Budget): Time limit of the run
+
+    Returns:
+        int: Number of sessions deleted
+    """
+    if not apps.is_installed('django.contrib.sessions'):
+        return 0
+    from django.contrib.sessions.models import Session
+
+    batch_size = setting('RETENTION_BATCH_SIZE', 500)
+    expired = Session.objects.filter(expire_date__lt=now).order_by('pk')
+    purged = 0
+    while not budget.exhausted():
+        keys = list(expired.values_list('pk', flat=True)[:batch_size])
+        if not keys:
+            break
+        deleted, _ = Session.objects.filter(pk__range=(keys[0], keys[-1]), expire_date__lt=now).delete()
+        purged += deleted
+        if len(keys) < batch_size or not budget.rest():
+            break
+    return purged
+
+
+def run(now=None):
+    """
+    Prune old contacts and expired sessions, unless another run holds the lock.
+
+    Args:
+        now (datetime): Reference time (defaults to now)
+
+    Returns:
+        dict: Rows removed per table, or None if the run was skipped
+    """
+    now = now or timezone.now()
+    budget = _Budget()
+    token = uuid.uuid4().hex
+    lock_ttl = int(setting('RETENTION_MAX_SECONDS', 240)) + 60
+    try:
+        client = redis_client.get_redis()
+        if not client.set(LOCK_KEY, token, nx=True, ex=lock_ttl):
+            logger.info('Retention run skipped: another run holds the lock')
+            return None
+    except (RedisError, RuntimeError) as e:
+        logger.error(f'Retention run skipped: cannot take the lock: {e}')
+        return None
+
+    try:
+        result = {'contacts': archive_contacts(now, budget)}
+        result['sessions'] = purge_sessions(now, budget) if not budget.exhausted() else 0
+    finally:
+        try:
+            if not client.register_script(_RELEASE)(keys=[LOCK_KEY], args=[token]):
+                logger.warning('Retention lock expired before the run finished')
+        except RedisError as e:
+            logger.warning(f'Releasing the retention lock failed: {e}')
+
+    if any(result.values()):
+        logger.info(f"Retention: archived {result['contacts']} contacts, purged {result['sessions']} sessions")
+    return result
@@ -0,0 +1,182 @@
+"""
+Session engine storing sessions in Redis (``SESSION_ENGINE``).
+
+With the database engine, every anonymous homepage view in session CAPTCHA
+mode inserted or updated a ``django_session`` row in MySQL, and the admin
+OTP login wrote the row on every step. Here a session is a Redis key that
+expires on its own (no ``clearsessions`` needed), written through the
+shared pool of ``portfolio_app.redis_client``.
+
+Writes are kept to a minimum:
+
+- Keys in ``SESSION_EPHEMERAL_KEYS`` (the CAPTCHA answer, the OTP login
+  state) are stored apart from the session record, under
+  ``<key>:ephemeral`` with the short ``SESSION_EPHEMERAL_TTL``. A request
+  that only changes those keys never rewrites the session record, and a
+  visitor with nothing else in the session never gets one.
+- Each part is written only if its contents changed since it was loaded,
+  so popping keys that are not there or setting the same value again is
+  free.
+- Everything a request changes, including the old key dropped by
+  ``cycle_key()`` on login, is written in one pipelined round trip when
+  the response is saved.
+
+While Redis is unavailable, sessions behave as empty and are not saved
+(the failure is logged), so requests carry on without their session
+instead of failing with a 500.
+"""
+
+import logging
+
+from asgiref.sync import sync_to_async
+from django.contrib.sessions.backends.base import CreateError, SessionBase
+
+from . import redis_client
+from .conf import setting
+from .redis_client import RedisError
+
+logger = logging.getLogger(__name__)
+
+
+class SessionStore(SessionBase):
+    """Redis session store with ephemeral keys and write elimination."""
+
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        # Serialized persistent and ephemeral parts as stored, None if absent
+        self._stored = (None, None)
+        self._stale_key = None  # Replaced by cycle_key(), deleted by the next save
+
+    @staticmethod
+    def _redis_keys(session_key):
+        prefix = setting('SESSION_REDIS_KEY_PREFIX', 'session:')
+        return f'{prefix}{session_key}', f'{prefix}{session_key}:ephemeral'
+
+    def _split(self, session):
+        ephemeral_keys = setting('SESSION_EPHEMERAL_KEYS', ())
+        persistent = {key: value for key, value in session.items() if key not in ephemeral_keys}
+        ephemeral = {key: value for key, value in session.items() if key in ephemeral_keys}
+        return persistent, ephemeral
+
+    def _snapshot(self, part):
+        return self.serializer().dumps(part) if part else None
+
+    def load(self):
+        if self.session_key is None:
+            return {}
+        try:
+            record, ephemeral = redis_client.get_redis().mget(self._redis_keys(self.session_key))
+        except (RedisError, RuntimeError) as e:
+            logger.error(f'Loading session failed: {e}')
+            record = ephemeral = None
+        if record is None and ephemeral is None:
+            self._session_key = None
+            return {}
+
+        session = self.decode(record.decode()) if record else {}
+        extra = self.decode(ephemeral.decode()) if ephemeral else {}
+        self._stored = (self._snapshot(session), self._snapshot(extra))
+        session.update(extra)
+        return session
+
+    def exists(self, session_key):
+        try:
+            return bool(redis_client.get_redis().exists(*self._redis_keys(session_key)))
+        except (RedisError, RuntimeError) as e:
+            logger.error(f'Checking session key failed: {e}')
+            return False
+
+    def create(self):
+        while True:
+            self._session_key = self._get_new_session_key()
+            try:
+                self.save(must_create=True)
+            except CreateError:
+                continue
+            self.modified = True
+            return
+
+    def save(self, must_create=False):
+        if self.session_key is None:
+            return self.create()
+        session = self._get_session(no_load=must_create)
+        persistent, ephemeral = self._split(session)
+        record_key, ephemeral_key = self._redis_keys(self.session_key)
+        age = self.get_expiry_age()
+        stored_record, stored_ephemeral = (None, None) if must_create else self._stored
+        record, extra = self._snapshot(persistent), self._snapshot(ephemeral)
+
+        try:
+            pipe = redis_client.get_redis().pipeline(transaction=True)
+        except (RedisError, RuntimeError) as e:
+            logger.error(f'Saving session failed: {e}')
+            return
+        writes = []
+        # A new session with nothing but ephemeral keys gets no record
+        if record != stored_record or (must_create and not ephemeral):
+            if record is None and not must_create:
+                pipe.delete(record_key)
+            else:
+                pipe.set(record_key, self.encode(persistent), ex=age, nx=must_create)
+                writes.append(record_key)
+        if extra != stored_ephemeral:
+            if extra is None:
+                pipe.delete(ephemeral_key)
+            else:
+                ttl = min(age, setting('SESSION_EPHEMERAL_TTL', 600))
+                pipe.set(ephemeral_key, self.encode(ephemeral), ex=ttl, nx=must_create)
+                writes.append(ephemeral_key)
+        if self._stale_key:
+            pipe.delete(*self._redis_keys(self._stale_key))
+        if len(pipe) == 0:
+            return  # Nothing changed
+
+        try:
+            results = pipe.execute()
+        except (RedisError, RuntimeError) as e:
+            # Lose this request's changes rather than fail the response
+            logger.error(f'Saving session failed: {e}')
+            return
+        if must_create and not all(results[:len(writes)]):
+            raise CreateError
+        self._stored = (record, extra)
+        self._stale_key = None
+
+    def delete(self, session_key=None):
+        if session_key is None:
+            if self.session_key is None:
+                return
+            session_key = self.session_key
+        try:
+            redis_client.get_redis().delete(*self._redis_keys(session_key))
+        except (RedisError, RuntimeError) as e:
+            logger.error(f'Deleting session failed: {e}')
+
+    def cycle_key(self):
+        """Move the data to a new key; the old key is deleted in the same write as the new data."""
+        data = self._session
+        if self.session_key is not None and self._stale_key is None:
+            self._stale_key = self.session_key
+        self._session_key = self._get_new_session_key()
+        self._session_cache = data
+        self._stored = (None, None)
+        self.modified = True
+
+    def refresh_ephemeral(self):
+        """
+        Write the ephemeral keys on the next save even if unchanged.
+
+        Restarts their TTL, for state whose lifetime was extended elsewhere
+        (an OTP resend keeps the login for another OTP_TTL).
+        """
+        self._get_session()
+        self._stored = (self._stored[0], None)
+        self.modified = True
+
+    async def acycle_key(self):
+        await sync_to_async(self.cycle_key)()
+
+    @classmethod
+    def clear_expired(cls):
+        # Redis expires the keys itself
+        pass
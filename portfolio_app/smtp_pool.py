@@ -0,0 +1,121 @@
+"""
+Persistent SMTP connection for Celery worker processes.
+
+Every ``EmailMessage.send()`` opens its own connection to the SMTP server:
+TCP connect, STARTTLS, AUTH, one message, QUIT. This module keeps a single
+Django email backend connection open per process and reuses it for every
+message sent by that process. A connection that has been idle for a while is
+checked with NOOP before use, connections older than SMTP_CONNECTION_MAX_AGE
+are recycled, and a send that fails because the server dropped the
+connection is retried once on a fresh one.
+"""
+
+import logging
+import os
+import smtplib
+import threading
+import time
+
+from django.core.mail import get_connection
+
+from .conf import setting
+
+logger = logging.getLogger(__name__)
+
+_conn = {'pid': None, 'backend': None, 'opened_at': 0.0, 'used_at': 0.0}
+_lock = threading.RLock()
+
+
+def _smtp(backend):
+    # Only the SMTP backend has a live smtplib connection to look after
+    return getattr(backend, 'connection', None)
+
+
+def _is_stale(backend, now):
+    smtp = _smtp(backend)
+    if smtp is None:
+        return False
+    if now - _conn['opened_at'] > setting('SMTP_CONNECTION_MAX_AGE', 300):
+        return True
+    if now - _conn['used_at'] > setting('SMTP_IDLE_CHECK_AFTER', 30):
+        try:
+            return smtp.noop()[0] != 250
+        except (smtplib.SMTPException, OSError):
+            return True
+    return False
+
+
+def close():
+    """Close the connection of this process, if any."""
+    with _lock:
+        backend = _conn['backend']
+        _conn.update(backend=None, opened_at=0.0, used_at=0.0)
+        if backend is not None and _conn['pid'] == os.getpid():
+            try:
+                backend.close()
+            except Exception as e:
+                logger.warning(f'Error closing SMTP connection: {e}')
+
+
+def get_smtp_connection():
+    """
+    Return the open email backend connection of this process.
+
+    Opens a new connection on first use, after a fork, or when the current
+    one is stale.
+    """
+    with _lock:
+        now = time.monotonic()
+        if _conn['pid'] != os.getpid():
+            # Never reuse a socket inherited from the parent process
+            _conn.update(pid=os.getpid(), backend=None)
+        elif _conn['backend'] is not None and _is_stale(_conn['backend'], now):
+            logger.info('Recycling stale SMTP connection')
+            close()
+
+        if _conn['backend'] is None or _smtp(_conn['backend']) is None:
+            backend = _conn['backend'] or get_connection(fail_silently=False)
+            backend.open()
+            _conn.update(backend=backend, opened_at=now)
+        _conn['used_at'] = now
+        return _conn['backend']
+
+
+def send_messages(email_messages):
+    """
+    Send messages over the persistent connection, one SMTP transaction each.
+
+    Args:
+        email_messages (list): EmailMessage objects to send
+
+    Returns:
+        list: One entry per message, None if it was sent or the exception
+        raised while sending it
+    """
+    results = []
+    with _lock:
+        for email_message in email_messages:
+            results.append(_send_one(email_message))
+    return results
+
+
+def _send_one(email_message):
+    for attempt in (1, 2):
+        try:
+            get_smtp_connection().send_messages([email_message])
+            return None
+        except (smtplib.SMTPServerDisconnected, ConnectionError) as e:
+            close()
+            if attempt == 2:
+                return e
+            logger.info(f'SMTP connection dropped ({e}), reconnecting')
+        except Exception as e:
+            # The server rejected this message; the connection is still usable
+            return e
+
+
+def send(email_message):
+    """Send one message over the persistent connection, raising if it fails."""
+    error = send_messages([email_message])[0]
+    if error is not None:
+        raise error
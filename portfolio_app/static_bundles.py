@@ -0,0 +1,197 @@
+"""
+Static asset bundles for the homepage.
+
+``STATIC_BUNDLES`` maps a bundle name (a path under ``STATIC_URL``) to the
+static files it is made of, in load order. ``python manage.py build_bundles``
+concatenates and minifies each bundle into ``STATIC_BUNDLES_DIR``, dropping
+CSS rules no template uses (``portfolio_app.css_purge``) and subsetting the
+icon fonts (``portfolio_app.icon_fonts``). That directory is
+one of ``STATICFILES_DIRS``; ``collectstatic`` then gives every bundle a
+content-hashed name through the manifest storage, so nginx can serve it with
+far-future immutable caching.
+
+The ``{% bundle %}`` template tag emits one tag per bundle when
+``STATIC_BUNDLES_ENABLED`` is set and falls back to the individual source
+files otherwise (development, or before the bundles have been built).
+"""
+
+import hashlib
+import logging
+import os
+import posixpath
+import re
+
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+
+from . import css_purge, icon_fonts
+from .conf import setting
+
+try:
+    import rcssmin
+except ImportError:  # pragma: no cover - fall back to the built-in CSS minifier
+    rcssmin = None
+
+try:
+    import rjsmin
+except ImportError:  # pragma: no cover - JavaScript is concatenated unminified
+    rjsmin = None
+
+logger = logging.getLogger(__name__)
+
+_CSS_URL_RE = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+_CSS_CHARSET_RE = re.compile(r'@charset\s+["\'][^"\']*["\']\s*;', re.IGNORECASE)
+_CSS_COMMENT_RE = re.compile(r'/\*(?!!).*?\*/', re.DOTALL)
+_CSS_SPACE_RE = re.compile(r'\s*([{};:,>])\s*')
+
+
+def get_bundles():
+    """Return the configured bundles as {bundle name: [source paths]}."""
+    return setting('STATIC_BUNDLES', {})
+
+
+def is_enabled():
+    return setting('STATIC_BUNDLES_ENABLED', False)
+
+
+def bundle_urls(name):
+    """
+    Return the URLs to load for a bundle.
+
+    Args:
+        name (str): Bundle name from STATIC_BUNDLES
+
+    Returns:
+        list: The hashed URL of the bundle when bundling is enabled, the URLs
+        of its source files otherwise
+    """
+    if is_enabled():
+        return [staticfiles_storage.url(name)]
+    return [staticfiles_storage.url(source) for source in get_bundles()[name]]
+
+
+def version():
+    """Return a short hash of the bundle URLs in use, for cache keys."""
+    digest = hashlib.sha1()
+    for name in sorted(get_bundles()):
+        for url in bundle_urls(name):
+            digest.update(url.encode())
+    return digest.hexdigest()[:12]
+
+
+# ---------------------------------------------------------------------------
+# Building
+# ---------------------------------------------------------------------------
+
+def _rewrite_css_urls(css, source, bundle):
+    """Rebase relative ``url()`` references from the source file to the bundle."""
+    source_dir = posixpath.dirname(source)
+    bundle_dir = posixpath.dirname(bundle)
+
+    def rebase(match):
+        quote, url = match.groups()
+        if url.startswith(('data:', 'http:', 'https:', '//', '/', '#')):
+            return match.group(0)
+        target = posixpath.normpath(posixpath.join(source_dir, url))
+        return f'url({quote}{posixpath.relpath(target, bundle_dir or ".")}{quote})'
+
+    return _CSS_URL_RE.sub(rebase, css)
+
+
+def minify_css(css):
+    if rcssmin is not None:
+        return rcssmin.cssmin(css, keep_bang_comments=True)
+    css = _CSS_COMMENT_RE.sub('', css)
+    css = _CSS_SPACE_RE.sub(r'\1', css)
+    return re.sub(r'\s+', ' ', css).replace(';}', '}').strip()
+
+
+def minify_js(js):
+    if rjsmin is not None:
+        return rjsmin.jsmin(js, keep_bang_comments=True)
+    return js
+
+
+def build_bundle(name, sources, names=None, purged=None, replacements=None):
+    """
+    Concatenate and minify the sources of one bundle.
+
+    Args:
+        name (str): Bundle name, used to rebase CSS ``url()`` references
+        sources (list): Static paths of the source files, in load order
+        names (dict): Usage from ``css_purge.collect_names()``; unused CSS
+            rules are dropped when given
+        purged (list): Receives (source, bytes before, bytes after) for
+            every purged stylesheet
+        replacements (dict): Source -> (static path, file path) of a
+            generated file to bundle instead, e.g. trimmed icon stylesheets
+
+    Returns:
+        str: The bundle contents
+    """
+    parts = []
+    for source in sources:
+        original = source
+        if replacements and source in replacements:
+            source, path = replacements[source]
+        else:
+            path = finders.find(source)
+        if path is None:
+            raise FileNotFoundError(f'Static file not found for bundle {name}: {source}')
+        with open(path, encoding='utf-8') as f:
+            content = f.read()
+        if name.endswith('.css'):
+            # @charset is only valid at the very start of a stylesheet
+            content = _CSS_CHARSET_RE.sub('', content)
+            # Replacements such as trimmed icon stylesheets are purged already
+            if names is not None and source == original:
+                before = len(minify_css(content).encode())
+                content = css_purge.purge(content, names)
+                if purged is not None:
+                    purged.append((original, before, len(minify_css(content).encode())))
+            parts.append(minify_css(_rewrite_css_urls(content, source, name)))
+        else:
+            parts.append(minify_js(content))
+
+    if name.endswith('.css'):
+        return '@charset "UTF-8";\n' + '\n'.join(parts) + '\n'
+    # A leading semicolon keeps a source without a trailing one from merging into the next
+    return '\n;'.join(parts) + '\n'
+
+
+def build_all(output_dir=None, purge=None, subset_fonts=None):
+    """
+    Build every bundle into ``output_dir`` (STATIC_BUNDLES_DIR by default).
+
+    Args:
+        output_dir (str): Directory to write the bundles to
+        purge (bool): Drop CSS rules no template uses (CSS_PURGE_ENABLED by default)
+        subset_fonts (bool): Subset the ICON_FONTS to the icons in use
+            (ICON_FONT_SUBSET_ENABLED by default)
+
+    Returns:
+        tuple: (bundle name, source bytes, bundle bytes) for each bundle,
+        (source, minified bytes, purged bytes) for each purged stylesheet,
+        and the icon font results of ``icon_fonts.build_all()``
+    """
+    output_dir = output_dir or setting('STATIC_BUNDLES_DIR', None)
+    if purge is None:
+        purge = setting('CSS_PURGE_ENABLED', False)
+    if subset_fonts is None:
+        subset_fonts = setting('ICON_FONT_SUBSET_ENABLED', False)
+    names = css_purge.collect_names() if purge or subset_fonts else None
+
+    icons = icon_fonts.build_all(output_dir, names) if subset_fonts else {}
+    replacements = {source: (result['css'], result['path']) for source, result in icons.items()}
+
+    results, purged = [], []
+    for name, sources in get_bundles().items():
+        content = build_bundle(name, sources, names if purge else None, purged, replacements)
+        path = os.path.join(output_dir, *name.split('/'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        source_size = sum(os.path.getsize(finders.find(source)) for source in sources)
+        results.append((name, source_size, len(content.encode())))
+        logger.info(f'Built static bundle {name} from {len(sources)} files')
+    return results, purged, icons
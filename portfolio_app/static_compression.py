@@ -0,0 +1,117 @@
+"""
+Precompressed copies of the collected static files.
+
+After collectstatic has hashed the files (see ``portfolio_app.storage``),
+every text asset in STATIC_ROOT (CSS, JavaScript, SVG, JSON, fonts without
+built-in compression...) gets a ``.gz`` and, when the brotli package is
+installed, a ``.br`` file next to it. They are written once at build time at
+the highest compression levels, so neither nginx (``gzip_static``) nor the
+in-process server (``portfolio_django.static_serving``) compresses anything
+per request.
+
+A variant is only kept if it saves at least 5% over the original, and files
+whose variants are newer than them are skipped on the next run.
+"""
+
+import gzip
+import logging
+import os
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - only gzip variants are written
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_EXTENSIONS = frozenset({
+    '.css', '.js', '.mjs', '.map', '.json', '.webmanifest', '.svg', '.xml', '.txt', '.html',
+    '.ico', '.ttf', '.otf', '.eot',
+})
+MIN_SIZE = 256  # Smaller files fit in one packet either way
+MIN_SAVING = 0.05
+
+
+def _gzip(data):
+    # mtime=0 keeps the output identical across builds
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _brotli(data):
+    return brotli.compress(data, quality=11)
+
+
+def encoders():
+    """Return (file suffix, compress function) pairs for the available encodings."""
+    available = [('.gz', _gzip)]
+    if brotli is not None:
+        available.insert(0, ('.br', _brotli))
+    return available
+
+
+def compress_file(path):
+    """
+    Write the compressed variants of one file that are missing or stale.
+
+    Args:
+        path (str): Absolute path of a file in STATIC_ROOT
+
+    Returns:
+        list: (suffix, original bytes, compressed bytes) of every variant written
+    """
+    mtime = os.path.getmtime(path)
+    pending = [
+        (suffix, compress) for suffix, compress in encoders()
+        if not os.path.exists(path + suffix) or os.path.getmtime(path + suffix) < mtime
+    ]
+    if not pending:
+        return []
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    written = []
+    for suffix, compress in pending:
+        compressed = compress(data)
+        if len(compressed) > len(data) * (1 - MIN_SAVING):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+            continue
+        with open(path + suffix, 'wb') as f:
+            f.write(compressed)
+        written.append((suffix, len(data), len(compressed)))
+    return written
+
+
+def compress_all(root):
+    """
+    Compress every eligible file under ``root`` (STATIC_ROOT).
+
+    Returns:
+        dict: Suffix -> [files, original bytes, compressed bytes] for the
+        variants written in this run
+    """
+    totals = {}
+    if brotli is None:
+        logger.warning('brotli not installed; only gzip variants of static files are written')
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            if os.path.splitext(filename)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+                continue
+            if os.path.getsize(path) < MIN_SIZE:
+                continue
+            for suffix, before, after in compress_file(path):
+                entry = totals.setdefault(suffix, [0, 0, 0])
+                entry[0] += 1
+                entry[1] += before
+                entry[2] += after
+    logger.info(f'Compressed static files in {root}')
+    return totals
+
+
+def report(totals):
+    """Return a human-readable line per encoding."""
+    return [
+        f'Precompressed {files} files as {suffix}: {before / 1024:.1f} KB -> {after / 1024:.1f} KB'
+        for suffix, (files, before, after) in sorted(totals.items())
+    ]
@@ -5,12 +5,47 @@ Celery tasks for portfolio_app.
 from celery import shared_task
 from django.core.mail import EmailMessage
 from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from datetime import timedelta
 from smtplib import SMTPException
 import logging
 
+from .models import EmailOutbox
+from . import retention, smtp_pool
+
 logger = logging.getLogger(__name__)
 
 
+def build_contact_email(name, email, subject, message):
+    """
+    Build the notification email sent to the site owner for a contact submission.
+
+    Returns:
+        EmailMessage: Message ready to be sent
+    """
+    full_message = f"""
+        New Query-Contact Submission on your website- "www.iharpreet.com":
+
+        Name: {name}
+        Email: {email}
+        Subject: {subject}
+
+        Message:
+        {message}
+        """
+
+    return EmailMessage(
+        subject=f"{subject}-[Contact Form]",
+        body=full_message,
+        from_email='From Portfolio <talkwithharpreet@gmail.com>',
+        to=['talkwithharpreet@gmail.com'],
+        reply_to=[email],  # Allow direct reply to visitor
+    )
+
+
 @shared_task
 def test_celery():
     """
@@ -34,32 +69,14 @@ def send_contact_email(self, name, email, subject, message):
         bool: True if email sent successfully, False otherwise
     """
     try:
-        # Prepare email content
-        full_message = f"""
-        New Query-Contact Submission on your website- "www.iharpreet.com":
-
-        Name: {name}
-        Email: {email}
-        Subject: {subject}
-
-        Message:
-        {message}
-        """
-
         # Check if email password is configured
         if not settings.EMAIL_HOST_PASSWORD:
             logger.error('Email configuration error: EMAIL_HOST_PASSWORD not set.')
             return False
 
         # Send email notification to site owner
-        email_message = EmailMessage(
-            subject=f"{subject}-[Contact Form]",
-            body=full_message,
-            from_email='From Portfolio <talkwithharpreet@gmail.com>',
-            to=['talkwithharpreet@gmail.com'],
-            reply_to=[email],  # Allow direct reply to visitor
-        )
-        email_message.send(fail_silently=False)
+        email_message = build_contact_email(name, email, subject, message)
+        smtp_pool.send(email_message)
         
         logger.info(f'Contact email sent successfully from {email}')
         return True
@@ -104,7 +121,7 @@ def send_admin_otp_email(self, user_email, otp_code):
             from_email=settings.DEFAULT_FROM_EMAIL,
             to=[user_email],
         )
-        email_message.send(fail_silently=False)
+        smtp_pool.send(email_message)
         
         logger.info(f'Admin OTP email sent successfully to {user_email}')
         return True
@@ -121,3 +138,250 @@ def send_admin_otp_email(self, user_email, otp_code):
             return False
 
 
+def _claimable_outbox(now):
+    """Pending rows plus queued rows that never finished within EMAIL_OUTBOX_REQUEUE_AFTER."""
+    stale_before = now - timedelta(seconds=settings.EMAIL_OUTBOX_REQUEUE_AFTER)
+    return EmailOutbox.objects.filter(
+        Q(status=EmailOutbox.PENDING) | Q(status=EmailOutbox.QUEUED, queued_at__lt=stale_before)
+    )
+
+
+def _claim_outbox(batch_size, now):
+    """
+    Lock up to ``batch_size`` claimable rows, mark them queued and return their IDs.
+
+    SKIP LOCKED lets concurrent relay and digest runs claim disjoint rows.
+    """
+    with transaction.atomic():
+        ids = list(
+            _claimable_outbox(now).select_for_update(skip_locked=True)
+            .order_by('id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        EmailOutbox.objects.filter(id__in=ids).update(status=EmailOutbox.QUEUED, queued_at=now)
+    return ids
+
+
+def digest_active(now=None):
+    """
+    Return True if contact notifications should currently be sent as digests.
+
+    Digest mode kicks in when CONTACT_DIGEST_ENABLED is set and either the
+    number of submissions in the last CONTACT_DIGEST_WINDOW or the waiting
+    backlog reaches CONTACT_DIGEST_ACTIVATE_AT. Below that, every submission
+    still gets its own email.
+    """
+    if not settings.CONTACT_DIGEST_ENABLED:
+        return False
+    now = now or timezone.now()
+    activate_at = settings.CONTACT_DIGEST_ACTIVATE_AT
+    since = now - timedelta(seconds=settings.CONTACT_DIGEST_WINDOW)
+    if EmailOutbox.objects.filter(created_at__gte=since).count() >= activate_at:
+        return True
+    return _claimable_outbox(now).count() >= activate_at
+
+
+@shared_task
+def relay_email_outbox(batch_size=None):
+    """
+    Celery beat task that drains the email outbox.
+
+    Claims a batch of pending rows (plus rows that were queued too long ago
+    and never finished), marks them queued and hands only their IDs to
+    ``send_outbox_batch`` in chunks of EMAIL_OUTBOX_SEND_BATCH_SIZE.
+
+    While digest mode is active the rows are left for ``send_contact_digest``
+    instead; a digest is triggered at once when the backlog reaches
+    CONTACT_DIGEST_THRESHOLD.
+
+    Args:
+        batch_size (int): Maximum rows to relay, defaults to EMAIL_OUTBOX_BATCH_SIZE
+
+    Returns:
+        int: Number of rows relayed
+    """
+    batch_size = batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE
+    now = timezone.now()
+
+    # Leave the rows pending until there is a way to send them
+    if not settings.EMAIL_HOST_PASSWORD:
+        logger.error('Email configuration error: EMAIL_HOST_PASSWORD not set; outbox not relayed.')
+        return 0
+
+    if digest_active(now):
+        if _claimable_outbox(now).count() >= settings.CONTACT_DIGEST_THRESHOLD:
+            send_contact_digest.delay(flush=True)
+        return 0
+
+    ids = _claim_outbox(batch_size, now)
+
+    # Rows whose dispatch fails stay queued and are picked up again once stale
+    chunk = settings.EMAIL_OUTBOX_SEND_BATCH_SIZE
+    for start in range(0, len(ids), chunk):
+        send_outbox_batch.delay(ids[start:start + chunk])
+
+    if ids:
+        logger.info(f'Relayed {len(ids)} outbox emails')
+    return len(ids)
+
+
+def build_contact_digest(contacts):
+    """
+    Build one email summarising several contact submissions.
+
+    Returns:
+        EmailMessage: Message ready to be sent
+    """
+    max_chars = settings.CONTACT_DIGEST_MESSAGE_CHARS
+    entries = []
+    for index, contact in enumerate(contacts, start=1):
+        message = contact.message
+        if len(message) > max_chars:
+            message = message[:max_chars] + '...'
+        entries.append(
+            f"{index}. {contact.name} <{contact.email}> - {contact.created_at:%Y-%m-%d %H:%M} UTC\n"
+            f"   Subject: {contact.subject}\n"
+            f"   {message}\n"
+        )
+
+    body = (
+        f'{len(contacts)} new Query-Contact Submissions on your website- "www.iharpreet.com":\n\n'
+        + '\n'.join(entries)
+    )
+    return EmailMessage(
+        subject=f"{len(contacts)} new submissions-[Contact Digest]",
+        body=body,
+        from_email='From Portfolio <talkwithharpreet@gmail.com>',
+        to=['talkwithharpreet@gmail.com'],
+    )
+
+
+@shared_task
+def send_contact_digest(flush=False):
+    """
+    Celery beat task that sends waiting contact notifications as one digest email.
+
+    Runs every CONTACT_DIGEST_WINDOW seconds and whenever the relay sees the
+    backlog reach CONTACT_DIGEST_THRESHOLD. Does nothing unless digest mode
+    is active (``digest_active()``), so in low volume the rows are left for
+    the relay and every submission gets its own email.
+
+    Args:
+        flush (bool): Sent by the relay on reaching CONTACT_DIGEST_THRESHOLD,
+            which already checked that digest mode is active
+
+    Returns:
+        int: Number of submissions included in the digest
+    """
+    if not settings.CONTACT_DIGEST_ENABLED:
+        return 0
+    if not flush and not digest_active():
+        return 0
+
+    # Check if email password is configured
+    if not settings.EMAIL_HOST_PASSWORD:
+        logger.error('Email configuration error: EMAIL_HOST_PASSWORD not set.')
+        return 0
+
+    ids = _claim_outbox(settings.CONTACT_DIGEST_MAX_ITEMS, timezone.now())
+    if not ids:
+        return 0
+
+    items = list(EmailOutbox.objects.select_related('contact').filter(pk__in=ids).order_by('id'))
+    error = smtp_pool.send_messages([build_contact_digest([item.contact for item in items])])[0]
+
+    if error is None:
+        EmailOutbox.objects.filter(pk__in=ids).update(
+            status=EmailOutbox.SENT, sent_at=timezone.now(), attempts=F('attempts') + 1
+        )
+        logger.info(f'Contact digest sent with {len(ids)} submissions')
+        return len(ids)
+
+    # Put everything back so the next digest retries it
+    logger.error(f'Failed to send contact digest: {str(error)}')
+    EmailOutbox.objects.filter(pk__in=ids).update(
+        status=EmailOutbox.PENDING, attempts=F('attempts') + 1, last_error=str(error)
+    )
+    return 0
+
+
+@shared_task
+def send_outbox_email(outbox_id):
+    """
+    Celery task to send the contact notification of one outbox row.
+
+    Args:
+        outbox_id (int): Primary key of the EmailOutbox row
+
+    Returns:
+        bool: True if email sent successfully, False otherwise
+    """
+    return send_outbox_batch([outbox_id]) == 1
+
+
+@shared_task
+def send_outbox_batch(outbox_ids):
+    """
+    Celery task to send the contact notifications of several outbox rows.
+
+    All messages go out over this worker's persistent SMTP connection, one
+    SMTP transaction each. Failed rows go back to pending so the relay
+    retries them, until EMAIL_OUTBOX_MAX_ATTEMPTS is reached.
+
+    Args:
+        outbox_ids (list): Primary keys of EmailOutbox rows
+
+    Returns:
+        int: Number of emails sent
+    """
+    items = [
+        item for item in EmailOutbox.objects.select_related('contact').filter(pk__in=outbox_ids).order_by('id')
+        if item.status != EmailOutbox.SENT
+    ]
+
+    if settings.EMAIL_HOST_PASSWORD:
+        errors = smtp_pool.send_messages([
+            build_contact_email(item.contact.name, item.contact.email, item.contact.subject, item.contact.message)
+            for item in items
+        ])
+    else:
+        # Claimed before the setting went missing: count a failed attempt so the
+        # rows go back to pending (or reach failed) instead of staying queued
+        logger.error('Email configuration error: EMAIL_HOST_PASSWORD not set.')
+        errors = [ImproperlyConfigured('EMAIL_HOST_PASSWORD not set')] * len(items)
+
+    sent = 0
+    now = timezone.now()
+    for item, error in zip(items, errors):
+        item.attempts += 1
+        if error is None:
+            sent += 1
+            item.status = EmailOutbox.SENT
+            item.sent_at = now
+            item.save(update_fields=['attempts', 'status', 'sent_at'])
+            continue
+
+        logger.error(f'Failed to send outbox email {item.pk}: {str(error)}')
+        item.last_error = str(error)
+        if item.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+            item.status = EmailOutbox.FAILED
+        else:
+            item.status = EmailOutbox.PENDING
+        item.save(update_fields=['attempts', 'last_error', 'status'])
+
+    logger.info(f'Sent {sent}/{len(items)} outbox emails')
+    return sent
+
+
+@shared_task
+def prune_old_data():
+    """
+    Celery beat task that archives old contacts and purges expired sessions.
+
+    Works in small primary-key batches with pauses in between and stops
+    after RETENTION_MAX_SECONDS; see ``portfolio_app.retention``.
+
+    Returns:
+        dict: Rows removed per table, or None if another run was in progress
+    """
+    return retention.run()
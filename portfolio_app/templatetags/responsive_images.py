@@ -0,0 +1,102 @@
+"""
+Template tags for the responsive image variants built by ``build_images``.
+
+Usage::
+
+    {% load responsive_images %}
+    {% responsive_image 'images/profile-pic.png' alt='Profile' sizes='(min-width: 768px) 200px, 50vw' class='img-fluid' %}
+    <div style="{% responsive_background 'images/P1.png' 480 %}"></div>
+
+Images without variants (not built yet, SVGs) fall back to the original file.
+"""
+
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from portfolio_app import responsive_images
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(name, alt='', sizes='100vw', lazy=True, **attrs):
+    """
+    Emit a <picture> with one <source> per modern format and an <img> fallback.
+
+    Args:
+        name (str): Static path of the source image
+        alt (str): Alternative text
+        sizes (str): ``sizes`` attribute describing the rendered width
+        lazy (bool): Lazy-load the image; pass False for images above the fold
+        **attrs: Extra <img> attributes (class, style...)
+
+    Returns:
+        str: The markup, with intrinsic width and height so the layout does
+        not shift while the image loads
+    """
+    img_attrs = dict(attrs)
+    if lazy:
+        img_attrs.update(loading='lazy', decoding='async')
+    else:
+        img_attrs['fetchpriority'] = 'high'
+
+    entry = responsive_images.get_entry(name)
+    if entry is None:
+        extra = format_html_join('', ' {}="{}"', img_attrs.items())
+        return format_html('<img src="{}" alt="{}"{}>', static(name), alt, extra)
+
+    fallback = responsive_images.fallback_format(entry)
+    sources = format_html_join(
+        '',
+        '<source type="{}" srcset="{}" sizes="{}">',
+        (
+            (responsive_images.MIME_TYPES[fmt], responsive_images.srcset(variants), sizes)
+            for fmt, variants in responsive_images.ordered_variants(entry)
+            if fmt != fallback
+        ),
+    )
+    variants = entry['variants'][fallback]
+    img_attrs.update(width=entry['width'], height=entry['height'])
+    extra = format_html_join('', ' {}="{}"', img_attrs.items())
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" alt="{}"{}></picture>',
+        sources,
+        static(responsive_images.pick(variants, 1280)),
+        responsive_images.srcset(variants),
+        sizes,
+        alt,
+        extra,
+    )
+
+
+@register.simple_tag
+def responsive_background(name, width=1280):
+    """
+    Emit ``background-image`` declarations for a style attribute.
+
+    The first declaration is a plain url() for browsers without
+    ``image-set()``; the second lets the browser choose the best format at
+    1x and 2x of ``width`` CSS pixels.
+
+    Args:
+        name (str): Static path of the source image
+        width (int): Rendered width of the element in CSS pixels
+
+    Returns:
+        str: CSS declarations
+    """
+    entry = responsive_images.get_entry(name)
+    if entry is None:
+        return format_html("background-image: url('{}');", static(name))
+
+    fallback = responsive_images.fallback_format(entry)
+    width = int(width)
+    candidates = []
+    for fmt, variants in responsive_images.ordered_variants(entry):
+        for density in (1, 2):
+            url = static(responsive_images.pick(variants, width * density))
+            candidates.append((url, responsive_images.MIME_TYPES[fmt], density))
+    image_set = format_html_join(", ", "url('{}') type('{}') {}x", candidates)
+    plain = static(responsive_images.pick(entry['variants'][fallback], width))
+    return format_html("background-image: url('{}'); background-image: image-set({});", plain, image_set)
@@ -0,0 +1,69 @@
+"""
+Template tags for static asset bundles.
+
+Usage::
+
+    {% load static_bundles %}
+    {% critical_css 'index.html' %}
+    {% bundle 'bundles/vendor.js' %}
+"""
+
+from django import template
+from django.conf import settings
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
+
+from portfolio_app import critical_css as critical, static_bundles
+
+register = template.Library()
+
+
+@register.simple_tag
+def bundle(name):
+    """
+    Emit the <link> or <script> tags for a bundle.
+
+    Args:
+        name (str): Bundle name from STATIC_BUNDLES
+
+    Returns:
+        str: One tag with the hashed bundle URL, or one tag per source file
+        when bundling is disabled
+    """
+    if name.endswith('.css'):
+        tag = '<link rel="stylesheet" href="{}">'
+    else:
+        tag = '<script src="{}"></script>'
+    return format_html_join('\n', tag, ((url,) for url in static_bundles.bundle_urls(name)))
+
+
+@register.simple_tag
+def critical_css(template_name):
+    """
+    Inline the critical CSS of a template and load its full stylesheets
+    without blocking rendering.
+
+    Falls back to ordinary stylesheet links when bundling is disabled or the
+    critical CSS has not been built by collectstatic.
+
+    Args:
+        template_name (str): Template key in CRITICAL_CSS
+
+    Returns:
+        str: <style> with the critical rules plus preload links, or plain links
+    """
+    stylesheets = settings.CRITICAL_CSS[template_name]
+    css = critical.get_critical_css(template_name) if static_bundles.is_enabled() else None
+    if css is None:
+        return format_html_join('\n', '{}', ((bundle(name),) for name in stylesheets))
+
+    urls = [url for name in stylesheets for url in static_bundles.bundle_urls(name)]
+    # </ cannot appear inside <style>; CSS reads <\/ the same way
+    style = mark_safe('<style>' + css.replace('</', '<\\/') + '</style>')
+    preload = format_html_join(
+        '\n',
+        '<link rel="preload" href="{}" as="style" onload="this.onload=null;this.rel=\'stylesheet\'">'
+        '<noscript><link rel="stylesheet" href="{}"></noscript>',
+        ((url, url) for url in urls),
+    )
+    return format_html('{}\n{}', style, preload)
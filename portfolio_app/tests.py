@@ -1,3 +1,1023 @@
-from django.test import TestCase
+"""
+Tests for portfolio_app.
 
-# Create your tests here.
+Tests that need Redis (the worker breaker, the OTP login) use the server
+at REDIS_URL and are skipped when it cannot be reached. Everything else
+runs on the local memory cache.
+"""
+
+import asyncio
+import csv
+import datetime
+import gzip
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import unittest
+import uuid
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.messages import get_messages
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from portfolio_django import static_serving
+
+from . import cache_backend, captcha, critical_css, duplicates, export, otp, page_cache, pagination, ratelimit, readiness, redis_client, retention, views, worker_monitor
+from .admin import ContactAdmin
+from .captcha import Challenge
+from .models import Contact, EmailOutbox
+from .session_backend import SessionStore
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def redis_available():
+    try:
+        return bool(redis_client.get_redis().ping())
+    except Exception:
+        return False
+
+
+def solve(challenge):
+    """Return the answer to a CAPTCHA question like ``'12 + 30 = ?'``."""
+    return sum(int(number) for number in re.findall(r'\d+', challenge.question))
+
+
+@override_settings(CACHES=LOCMEM_CACHES, HOMEPAGE_CACHE_ENABLED=True)
+class PageCacheTests(TestCase):
+    """The homepage is rendered once and the per-visitor slots are spliced in."""
+
+    def setUp(self):
+        cache.clear()
+        page_cache._local_page.update(key=None, segments=None)
+        self.addCleanup(page_cache._local_page.update, key=None, segments=None)
+
+    def _request(self):
+        request = RequestFactory().get('/')
+        request._messages = CookieStorage(request)
+        return request
+
+    def test_cold_cache_renders_once_then_hits(self):
+        with mock.patch.object(page_cache, '_render_template', wraps=page_cache._render_template) as render:
+            page_cache.render_homepage(self._request(), Challenge('1 + 2 = ?', 'token-a'))
+            page_cache.render_homepage(self._request(), Challenge('3 + 4 = ?', 'token-b'))
+            self.assertEqual(render.call_count, 1)
+
+            # Another process: no local copy, the shared cache still answers
+            page_cache._local_page.update(key=None, segments=None)
+            page_cache.render_homepage(self._request(), Challenge('5 + 6 = ?', 'token-c'))
+            self.assertEqual(render.call_count, 1)
+
+        page_cache.clear()
+        with mock.patch.object(page_cache, '_render_template', wraps=page_cache._render_template) as render:
+            page_cache.render_homepage(self._request(), Challenge('1 + 2 = ?', 'token-a'))
+            self.assertEqual(render.call_count, 1)
+
+    def test_render_lock_is_released_by_its_holder_only(self):
+        key = page_cache._cache_key()
+        lock_key = f'{key}:lock'
+        page_cache._fetch_or_render(key)
+        self.assertIsNone(cache.get(lock_key))
+
+        def slow_render():
+            # The lock timed out during the render and another process took it
+            cache.set(lock_key, 'other-process')
+            return '<html></html>'
+
+        cache.delete(key)
+        with mock.patch.object(page_cache, '_render_template', side_effect=slow_render), \
+                self.assertLogs('portfolio_app.page_cache', 'WARNING'):
+            page_cache._fetch_or_render(key)
+        self.assertEqual(cache.get(lock_key), 'other-process')
+
+    def test_slots_are_replaced_per_request(self):
+        request = self._request()
+        request._messages.add(25, 'Sent <b>now</b>')
+        with mock.patch.object(page_cache, 'get_token', return_value='csrf-for-this-visitor'):
+            content = page_cache.render_homepage(request, Challenge('12 + 30 = ?', 'tok"en')).content.decode()
+
+        for slot in (page_cache.CSRF_SLOT, page_cache.CAPTCHA_SLOT, page_cache.CAPTCHA_TOKEN_SLOT, page_cache.MESSAGES_SLOT):
+            self.assertNotIn(slot, content)
+        self.assertIn('12 + 30 = ?', content)
+        self.assertIn('tok&quot;en', content)
+        self.assertIn('value="csrf-for-this-visitor"', content)
+        self.assertIn('Sent &lt;b&gt;now&lt;/b&gt;', content)
+
+        # The next visitor gets its own values and no leftover message
+        content = page_cache.render_homepage(self._request(), Challenge('8 + 9 = ?', 'other')).content.decode()
+        self.assertIn('8 + 9 = ?', content)
+        self.assertNotIn('12 + 30 = ?', content)
+        self.assertNotIn('Sent &lt;b&gt;now', content)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, CAPTCHA_TOKEN_MAX_AGE=600)
+class CaptchaTokenTests(TestCase):
+    """Signed CAPTCHA tokens are single use and expire."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_right_answer_is_accepted_once(self):
+        challenge = captcha.new_challenge()
+        self.assertTrue(captcha.verify_token(challenge.token, solve(challenge)))
+        # Replaying the same token fails, even with the right answer
+        self.assertFalse(captcha.verify_token(challenge.token, solve(challenge)))
+
+    def test_wrong_answer_consumes_the_token(self):
+        challenge = captcha.new_challenge()
+        self.assertFalse(captcha.verify_token(challenge.token, solve(challenge) + 1))
+        self.assertFalse(captcha.verify_token(challenge.token, solve(challenge)))
+
+    def test_expired_signature_is_rejected(self):
+        challenge = captcha.new_challenge()
+        later = time.time() + 601
+        with mock.patch('django.core.signing.time.time', return_value=later):
+            self.assertFalse(captcha.verify_token(challenge.token, solve(challenge)))
+        # Only the age was wrong: the same token still works within its lifetime
+        self.assertTrue(captcha.verify_token(challenge.token, solve(challenge)))
+
+    def test_tampered_token_is_rejected(self):
+        challenge = captcha.new_challenge()
+        nonce_and_digest, _, signature = challenge.token.rpartition(':')
+        self.assertFalse(captcha.verify_token(f'{nonce_and_digest}x:{signature}', solve(challenge)))
+        self.assertFalse(captcha.verify_token('', solve(challenge)))
+
+
+@override_settings(WORKER_BREAKER_FAILURE_THRESHOLD=2, WORKER_BREAKER_RESET_TIMEOUT=30)
+class WorkerBreakerTests(TestCase):
+    """The shared worker breaker opens, lets one trial through half-open, and closes."""
+
+    @classmethod
+    def setUpClass(cls):
+        if not redis_available():
+            raise unittest.SkipTest('Redis is not reachable')
+        super().setUpClass()
+
+    def setUp(self):
+        prefix = f'test:breaker:{uuid.uuid4().hex}:'
+        for name in ('HEARTBEAT_KEY', 'BREAKER_KEY', 'PROBE_KEY'):
+            patcher = mock.patch.object(worker_monitor, name, prefix + name.lower())
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        # This process counts as monitored, so no monitor thread is started
+        state = mock.patch.dict(worker_monitor._state, {
+            'pid': os.getpid(), 'state': worker_monitor.OPEN, 'available': False,
+            'pending_failures': 0, 'pending_successes': 0, 'trial': False, 'script': None,
+        })
+        state.start()
+        self.addCleanup(state.stop)
+        self.redis = redis_client.get_redis()
+        self.redis.set(worker_monitor.HEARTBEAT_KEY, 'worker', ex=60)
+        self.addCleanup(self.redis.delete, worker_monitor.HEARTBEAT_KEY, worker_monitor.BREAKER_KEY,
+                        worker_monitor.PROBE_KEY)
+        self.now = time.time()
+
+    def _half_open(self):
+        self.redis.hset(worker_monitor.BREAKER_KEY, mapping={'state': worker_monitor.OPEN, 'opened_at': self.now})
+        worker_monitor.check(self.now)
+        self.assertEqual(worker_monitor.get_state(), worker_monitor.OPEN)
+        worker_monitor.check(self.now + 31)
+        self.assertEqual(worker_monitor.get_state(), worker_monitor.HALF_OPEN)
+
+    def test_failures_and_missing_heartbeat_open_a_closed_breaker(self):
+        self.redis.hset(worker_monitor.BREAKER_KEY, 'state', worker_monitor.CLOSED)
+        worker_monitor.check(self.now)
+        self.assertTrue(worker_monitor.is_available())
+
+        # Failures seen by different processes add up to the threshold
+        worker_monitor.record_failure()
+        self.assertFalse(worker_monitor.is_available())
+        worker_monitor.check(self.now)
+        self.assertEqual(worker_monitor.get_state(), worker_monitor.CLOSED)
+        self.assertTrue(worker_monitor.is_available())
+        worker_monitor.record_failure()
+        worker_monitor.check(self.now)
+        self.assertEqual(worker_monitor.get_state(), worker_monitor.OPEN)
+        self.assertFalse(worker_monitor.is_available())
+
+        self.redis.hset(worker_monitor.BREAKER_KEY, mapping={'state': worker_monitor.CLOSED, 'failures': 0})
+        self.redis.delete(worker_monitor.HEARTBEAT_KEY)
+        worker_monitor.check(self.now)
+        self.assertEqual(worker_monitor.get_state(), worker_monitor.OPEN)
+
+    def test_half_open_lets_a_single_trial_through(self):
+        self._half_open()
+        self.assertTrue(worker_monitor.is_available())
+        self.assertFalse(worker_monitor.is_available())
+
+        # Another process sees the same half-open breaker but not the trial
+        worker_monitor._state['trial'] = False
+        worker_monitor.check(self.now + 32)
+        self.assertEqual(worker_monitor.get_state(), worker_monitor.HALF_OPEN)
+        self.assertFalse(worker_monitor.is_available())
+
+    def test_successful_trial_closes_the_breaker(self):
+        self._half_open()
+        self.assertTrue(worker_monitor.is_available())
+        worker_monitor.record_success()
+        worker_monitor.check(self.now + 32)
+        self.assertEqual(worker_monitor.get_state(), worker_monitor.CLOSED)
+        self.assertTrue(worker_monitor.is_available())
+        self.assertTrue(worker_monitor.is_available())
+        self.assertFalse(self.redis.exists(worker_monitor.PROBE_KEY))
+
+    def test_failed_trial_reopens_the_breaker(self):
+        self._half_open()
+        self.assertTrue(worker_monitor.is_available())
+        worker_monitor.record_failure()
+        worker_monitor.check(self.now + 32)
+        self.assertEqual(worker_monitor.get_state(), worker_monitor.OPEN)
+        self.assertFalse(worker_monitor.is_available())
+        self.assertFalse(self.redis.exists(worker_monitor.PROBE_KEY))
+
+        # The reset timeout starts over from the failed trial
+        worker_monitor.check(self.now + 40)
+        self.assertEqual(worker_monitor.get_state(), worker_monitor.OPEN)
+        worker_monitor.check(self.now + 63)
+        self.assertEqual(worker_monitor.get_state(), worker_monitor.HALF_OPEN)
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES, SESSION_ENGINE='django.contrib.sessions.backends.db', RATELIMIT_ENABLED=False,
+    EMAIL_OUTBOX_ENABLED=True, CAPTCHA_STATELESS=False,
+)
+class ContactOutboxTests(TestCase):
+    """A contact submission is saved with its notification, and its CAPTCHA is used up."""
+
+    def _post(self, answer):
+        return self.client.post('/', {
+            'name': 'Ada',
+            'email': 'ada@example.com',
+            'subject': 'Hello',
+            # A new message per run, so no Redis duplicate claim can match it
+            'message': f'Project {uuid.uuid4().hex}',
+            'captcha': answer,
+        })
+
+    @mock.patch.object(views, 'generate_captcha', side_effect=[('1 + 2 = ?', 3), ('4 + 5 = ?', 9)])
+    def test_submission_is_queued_and_the_session_captcha_replaced(self, generate_captcha):
+        self.client.get('/')
+        self.assertRedirects(self._post(3), '/#contact-msg', fetch_redirect_response=False)
+        self.assertEqual(Contact.objects.count(), 1)
+        self.assertEqual(EmailOutbox.objects.get().status, EmailOutbox.PENDING)
+        self.assertEqual(self.client.session['captcha_answer'], ['4 + 5 = ?', 9])
+
+        # Replaying the answer without loading a new form fails the CAPTCHA
+        response = self._post(3)
+        shown = [str(message) for message in get_messages(response.wsgi_request)]
+        self.assertEqual(shown[-1], 'Incorrect CAPTCHA answer. Please try again.')
+        self.assertEqual(Contact.objects.count(), 1)
+
+
+class ReadinessTests(TestCase):
+    """/ready/ reports the status and latency of each probe, but not its error."""
+
+    def test_payload_of_a_degraded_process(self):
+        results = {
+            'database': {'status': readiness.OK, 'latency_ms': 1.5},
+            'redis': {'status': readiness.ERROR, 'latency_ms': 2000.0, 'error': 'Timeout connecting to 10.0.0.7'},
+        }
+        with mock.patch.dict(readiness._state, pid=os.getpid(), results=results, checked_at=time.time()):
+            response = self.client.get('/ready/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            'status': 'degraded',
+            'checks': {
+                'database': {'status': readiness.OK, 'latency_ms': 1.5},
+                'redis': {'status': readiness.ERROR, 'latency_ms': 2000.0},
+            },
+        })
+
+
+class CollectedStorage(FileSystemStorage):
+    """A collectstatic target where every file keeps its name."""
+
+    def stored_name(self, name):
+        return name
+
+
+@override_settings(CRITICAL_CSS={'index.html': ['site.css']}, CRITICAL_CSS_MAX_BYTES=1024)
+class CriticalCssTests(TestCase):
+    """Only rules for the markup above the fold are inlined, and only while they are small."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.storage = CollectedStorage(location=directory.name)
+
+    def _build(self, css):
+        with open(os.path.join(self.storage.location, 'site.css'), 'w') as f:
+            f.write(css)
+        return critical_css.build_all(self.storage)
+
+    def test_attribute_rules_need_the_attribute_above_the_fold(self):
+        self._build(
+            '.navbar{display:flex}'
+            '[data-aos=fade-up]{opacity:0}'
+            '[data-toggle=collapse]{cursor:pointer}'
+            '[type=search]{outline-offset:-2px}'
+        )
+        with self.storage.open(critical_css.artifact_name('index.html')) as f:
+            css = f.read().decode()
+        self.assertIn('.navbar{display:flex}', css)
+        self.assertIn('[data-toggle=collapse]', css)
+        self.assertNotIn('data-aos', css)
+        self.assertNotIn('type=search', css)
+
+    def test_critical_css_over_the_limit_is_not_inlined(self):
+        name = critical_css.artifact_name('index.html')
+        self.storage.save(name, ContentFile(b'.navbar{}'))
+        with self.assertLogs('portfolio_app.critical_css', 'WARNING'):
+            results = self._build(''.join(f'.navbar .nav-link{{margin-left:{i}px}}' for i in range(100)))
+        self.assertIsNone(results[0][1])
+        self.assertFalse(self.storage.exists(name))
+        self.assertIn('too large to inline', critical_css.report(results)[0])
+
+
+class StaticServingTests(SimpleTestCase):
+    """STATIC_ROOT is served with ranges, ETags and the precompressed variants."""
+
+    BODY = b'body{margin:0}' * 100
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'site.0123456789ab.css')
+        with open(path, 'wb') as f:
+            f.write(self.BODY)
+        with open(path + '.gz', 'wb') as f:
+            f.write(gzip.compress(self.BODY))
+        with open(path + '.br', 'wb') as f:
+            f.write(b'brotli')
+        self.url = '/static/site.0123456789ab.css'
+        self.index = static_serving.build_index(directory.name, '/static/', 3600)
+
+    def _get(self, **headers):
+        """Request the file through the WSGI wrapper; returns (status, headers, body)."""
+        response = {}
+
+        def start_response(status, headers):
+            response.update(status=status, headers=dict(headers))
+
+        environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': self.url, **headers}
+        body = b''.join(static_serving.StaticFilesWSGIMiddleware(None, self.index)(environ, start_response))
+        return response['status'], response['headers'], body
+
+    def test_brotli_is_preferred_then_gzip(self):
+        status, headers, body = self._get(HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual((status, headers['Content-Encoding'], body), ('200 OK', 'br', b'brotli'))
+        self.assertEqual(headers['Vary'], 'Accept-Encoding')
+        self.assertEqual(headers['Cache-Control'], 'public, max-age=31536000, immutable')
+
+        _, headers, body = self._get(HTTP_ACCEPT_ENCODING='br;q=0, gzip')
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(body), self.BODY)
+
+        _, headers, body = self._get()
+        self.assertNotIn('Content-Encoding', headers)
+        self.assertEqual(body, self.BODY)
+
+    def test_if_none_match_is_answered_per_representation(self):
+        _, headers, _ = self._get(HTTP_ACCEPT_ENCODING='gzip')
+        gzip_etag = headers['ETag']
+        status, _, body = self._get(HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=gzip_etag)
+        self.assertEqual((status, body), ('304 Not Modified', b''))
+
+        status, headers, _ = self._get(HTTP_IF_NONE_MATCH=gzip_etag)
+        self.assertEqual(status, '200 OK')
+        self.assertNotEqual(headers['ETag'], gzip_etag)
+
+    def test_byte_ranges_come_from_the_uncompressed_file(self):
+        status, headers, body = self._get(HTTP_ACCEPT_ENCODING='br', HTTP_RANGE='bytes=5-10')
+        self.assertEqual((status, body), ('206 Partial Content', self.BODY[5:11]))
+        self.assertEqual(headers['Content-Range'], f'bytes 5-10/{len(self.BODY)}')
+        self.assertNotIn('Content-Encoding', headers)
+
+        _, _, body = self._get(HTTP_RANGE='bytes=-4')
+        self.assertEqual(body, self.BODY[-4:])
+
+        status, headers, _ = self._get(HTTP_RANGE=f'bytes={len(self.BODY)}-')
+        self.assertEqual(status, '416 Range Not Satisfiable')
+        self.assertEqual(headers['Content-Range'], f'bytes */{len(self.BODY)}')
+
+    def test_asgi_reads_the_file_off_the_event_loop(self):
+        reader_threads = []
+        read_chunk = static_serving._read_chunk
+
+        def record_thread(*args):
+            reader_threads.append(threading.current_thread())
+            return read_chunk(*args)
+
+        async def request():
+            messages = []
+
+            async def send(message):
+                messages.append(message)
+
+            scope = {
+                'type': 'http', 'method': 'GET', 'path': self.url,
+                'headers': [(b'range', b'bytes=100-1299')],
+            }
+            await static_serving.StaticFilesASGIMiddleware(None, self.index)(scope, None, send)
+            return threading.current_thread(), messages
+
+        with mock.patch.object(static_serving, 'CHUNK_SIZE', 512), \
+                mock.patch.object(static_serving, '_read_chunk', record_thread):
+            loop_thread, messages = asyncio.run(request())
+
+        self.assertEqual(messages[0]['status'], 206)
+        bodies = messages[1:]
+        self.assertEqual(b''.join(message['body'] for message in bodies), self.BODY[100:1300])
+        self.assertEqual([message['more_body'] for message in bodies], [True, True, False])
+        self.assertEqual(len(reader_threads), 3)
+        self.assertNotIn(loop_thread, reader_threads)
+
+
+def wait_for(condition, timeout=5.0):
+    """Poll ``condition`` until it is true or ``timeout`` seconds have passed."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class TwoTierCacheTests(SimpleTestCase):
+    """Writes in one process drop the local copies of the others, and incr is atomic."""
+
+    @classmethod
+    def setUpClass(cls):
+        if not redis_available():
+            raise unittest.SkipTest('Redis is not reachable')
+        super().setUpClass()
+
+    def setUp(self):
+        prefix = f'test:cache:{uuid.uuid4().hex}'
+        self.cache = cache_backend.TwoTierCache(None, {'KEY_PREFIX': prefix, 'OPTIONS': {'RETRY_DELAY': 0.1}})
+        self.addCleanup(self.cache.clear)
+        # The local tier of another process, fed by its own listener
+        self.other = cache_backend.LocalTier(100, 1024 * 1024)
+        threading.Thread(
+            target=cache_backend._listen, args=(self.other, self.cache._channel, 0.1), daemon=True,
+        ).start()
+        self.assertTrue(wait_for(lambda: self.other.subscribed and self.cache._local_ready()))
+
+    def test_writes_invalidate_the_local_tier_of_other_processes(self):
+        self.cache.set('page', 'v1')
+        key = self.cache.make_key('page')
+        self.assertEqual(self.cache.get('page'), 'v1')
+        self.assertEqual(cache_backend._deserialize(self.cache._tier.get(key)), 'v1')
+
+        for write in (lambda: self.cache.set('page', 'v2'), lambda: self.cache.delete('page')):
+            self.other.store(key, cache_backend._serialize('stale'), 60)
+            write()
+            self.assertTrue(wait_for(lambda: self.other.get(key) is None))
+
+    def test_incr_publishes_and_never_creates_the_key(self):
+        with self.assertRaises(ValueError):
+            self.cache.incr('hits')
+        self.assertIsNone(self.cache.get('hits'))
+
+        self.cache.set('hits', 1, timeout=60)
+        key = self.cache.make_key('hits')
+        self.other.store(key, cache_backend._serialize(1), 60)
+        self.assertEqual(self.cache.incr('hits', 5), 6)
+        self.assertTrue(wait_for(lambda: self.other.get(key) is None))
+        self.assertEqual(self.cache.get('hits'), 6)
+        self.assertGreater(redis_client.get_redis().pttl(key), 0)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, CAPTCHA_STATELESS=False, SESSION_ENGINE='portfolio_app.session_backend')
+class RedisSessionTests(TestCase):
+    """Ephemeral keys never create or rewrite the session record."""
+
+    @classmethod
+    def setUpClass(cls):
+        if not redis_available():
+            raise unittest.SkipTest('Redis is not reachable')
+        super().setUpClass()
+
+    def setUp(self):
+        prefix = override_settings(SESSION_REDIS_KEY_PREFIX=f'test:session:{uuid.uuid4().hex}:')
+        prefix.enable()
+        self.addCleanup(prefix.disable)
+        self.redis = redis_client.get_redis()
+
+    def _stored_keys(self):
+        return sorted(key.decode() for key in self.redis.scan_iter(match=f'{settings.SESSION_REDIS_KEY_PREFIX}*'))
+
+    def test_anonymous_captcha_views_write_no_session_record(self):
+        for _ in range(2):
+            response = self.client.get('/')
+            self.assertEqual(response.status_code, 200)
+        session_key = self.client.cookies[settings.SESSION_COOKIE_NAME].value
+        record_key, ephemeral_key = SessionStore._redis_keys(session_key)
+        self.assertEqual(self._stored_keys(), [ephemeral_key])
+        self.assertLessEqual(self.redis.ttl(ephemeral_key), settings.SESSION_EPHEMERAL_TTL)
+        self.assertIn('captcha_answer', self.client.session)
+
+    def test_refresh_ephemeral_restarts_the_ttl_of_unchanged_keys(self):
+        session = SessionStore()
+        session['otp_token'] = 'token'
+        session.save()
+        _, ephemeral_key = SessionStore._redis_keys(session.session_key)
+        self.redis.expire(ephemeral_key, 5)
+
+        session = SessionStore(session.session_key)
+        session['otp_token'] = 'token'
+        session.save()
+        self.assertLessEqual(self.redis.ttl(ephemeral_key), 5)
+
+        session.refresh_ephemeral()
+        session.save()
+        self.assertGreater(self.redis.ttl(ephemeral_key), 5)
+
+
+@override_settings(SESSION_ENGINE='django.contrib.sessions.backends.db')
+class ContactKeysetPaginationTests(TestCase):
+    """The Contact admin pages with Older / Newer keyset links."""
+
+    @classmethod
+    def setUpTestData(cls):
+        base = timezone.now().replace(microsecond=0)
+        contacts = Contact.objects.bulk_create(
+            Contact(name=f'Visitor {i}', email=f'v{i}@example.com', subject='Hi', message='Hello')
+            for i in range(12)
+        )
+        # Pairs of rows share a timestamp (one pair straddles the first page break),
+        # so the id has to break the ties
+        for i, contact in enumerate(contacts):
+            Contact.objects.filter(pk=contact.pk).update(created_at=base - datetime.timedelta(minutes=i // 2))
+        cls.expected = list(Contact.objects.order_by('-created_at', '-pk').values_list('pk', flat=True))
+        cls.admin_user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pw')
+
+    def setUp(self):
+        self.client.force_login(self.admin_user)
+        patcher = mock.patch.object(ContactAdmin, 'list_per_page', 5)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _page(self, query=''):
+        response = self.client.get(reverse('admin:portfolio_app_contact_changelist') + query)
+        self.assertEqual(response.status_code, 200)
+        cl = response.context['cl']
+        return [contact.pk for contact in cl.result_list], cl
+
+    def test_older_links_walk_every_row_once(self):
+        pages = []
+        rows, cl = self._page()
+        pages.append(rows)
+        self.assertIsNone(cl.newer_url)
+        while cl.older_url:
+            self.assertIn(f'{pagination.OLDER_VAR}=', cl.older_url)
+            rows, cl = self._page(cl.older_url)
+            pages.append(rows)
+        self.assertEqual([len(rows) for rows in pages], [5, 5, 2])
+        self.assertEqual([pk for rows in pages for pk in rows], self.expected)
+
+    def test_newer_links_return_to_the_same_pages(self):
+        first, cl = self._page()
+        second, cl = self._page(cl.older_url)
+        third, cl = self._page(cl.older_url)
+        self.assertIsNone(cl.older_url)
+
+        rows, cl = self._page(cl.newer_url)
+        self.assertEqual(rows, second)
+        rows, cl = self._page(cl.newer_url)
+        self.assertEqual(rows, first)
+        self.assertIsNone(cl.newer_url)
+
+    def test_cursor_round_trip_and_invalid_cursor(self):
+        contact = Contact.objects.get(pk=self.expected[3])
+        self.assertEqual(pagination.decode_cursor(pagination.encode_cursor(contact)), (contact.created_at, contact.pk))
+        response = self.client.get(reverse('admin:portfolio_app_contact_changelist') + '?older=not-a-cursor')
+        # The admin answers invalid lookup parameters with a redirect to ?e=1
+        self.assertEqual(response.status_code, 302)
+
+
+@override_settings(SESSION_ENGINE='django.contrib.sessions.backends.db')
+class ContactExportTests(TestCase):
+    """Contacts stream out of the command and the admin actions, and the command resumes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        messages = ['Hello', '=HYPERLINK("http://evil.example")', 'Bye', '+1 555 0100', 'Again']
+        for day, message in enumerate(messages, start=1):
+            contact = Contact.objects.create(
+                name=f'Visitor {day}', email=f'v{day}@example.com', subject='Hi', message=message,
+            )
+            created_at = timezone.make_aware(datetime.datetime(2026, 1, day, 12))
+            Contact.objects.filter(pk=contact.pk).update(created_at=created_at)
+        cls.ids = list(Contact.objects.order_by('pk').values_list('pk', flat=True))
+        cls.admin_user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pw')
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def _export(self, filename, *args):
+        output = os.path.join(self.directory, filename)
+        call_command('export_contacts', output, *args, stdout=io.StringIO())
+        return output
+
+    def test_csv_with_date_range_escapes_formulas(self):
+        output = self._export('contacts.csv', '--since', '2026-01-02', '--until', '2026-01-05')
+        with open(output, newline='') as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows[0], list(export.FIELDS))
+        self.assertEqual([int(row[0]) for row in rows[1:]], self.ids[1:4])
+        self.assertEqual([row[4] for row in rows[1:]], ['\'=HYPERLINK("http://evil.example")', 'Bye', "'+1 555 0100"])
+
+    def test_gzipped_json_lines(self):
+        output = self._export('contacts.jsonl.gz', '--chunk-size', '2')
+        with gzip.open(output, 'rt') as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual([record['id'] for record in records], self.ids)
+        # Formulas are only escaped for spreadsheets
+        self.assertEqual(records[1]['message'], '=HYPERLINK("http://evil.example")')
+        self.assertEqual(records[0]['created_at'], '2026-01-01T12:00:00+00:00')
+
+    def test_interrupted_export_resumes_from_the_checkpoint(self):
+        expected = self._export('expected.csv.gz')
+        iter_chunks = export.iter_chunks
+
+        def crash_after_first_chunk(*args, **kwargs):
+            chunks = iter_chunks(*args, **kwargs)
+            yield next(chunks)
+            raise KeyboardInterrupt
+
+        output = os.path.join(self.directory, 'contacts.csv.gz')
+        with mock.patch.object(export, 'iter_chunks', crash_after_first_chunk), self.assertRaises(KeyboardInterrupt):
+            self._export('contacts.csv.gz', '--chunk-size', '2')
+        with open(f'{output}.checkpoint') as f:
+            self.assertEqual(json.load(f)['last_id'], self.ids[1])
+        # Bytes written after the last checkpoint are dropped on resume
+        with open(output, 'ab') as f:
+            f.write(b'half-written chunk')
+
+        stdout = io.StringIO()
+        call_command('export_contacts', output, '--chunk-size', '2', stdout=stdout)
+        self.assertIn(f'Resuming after contact {self.ids[1]} (2 rows already exported)', stdout.getvalue())
+        self.assertFalse(os.path.exists(f'{output}.checkpoint'))
+        with gzip.open(output) as resumed, gzip.open(expected) as full:
+            self.assertEqual(resumed.read(), full.read())
+
+    def test_checkpoint_of_other_options_is_refused(self):
+        output = os.path.join(self.directory, 'contacts.csv')
+        with open(f'{output}.checkpoint', 'w') as f:
+            json.dump({'format': 'csv', 'gzip': False, 'since': None, 'until': None, 'last_id': 1}, f)
+        with self.assertRaisesMessage(CommandError, 'other options'):
+            self._export('contacts.csv', '--since', '2026-01-02')
+        with self.assertRaises(CommandError):
+            self._export('contacts.csv', '--since', 'yesterday', '--restart')
+
+    def test_admin_actions_stream_the_selected_contacts(self):
+        self.client.force_login(self.admin_user)
+        url = reverse('admin:portfolio_app_contact_changelist')
+        selected = {'_selected_action': self.ids[:2]}
+
+        response = self.client.post(url, {'action': 'export_csv', **selected}, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertTrue(response['Content-Disposition'].startswith('attachment; filename="contacts-'))
+        rows = list(csv.reader(io.StringIO(gzip.decompress(b''.join(response.streaming_content)).decode())))
+        self.assertEqual([int(row[0]) for row in rows[1:]], self.ids[:2])
+        self.assertEqual(rows[2][4], '\'=HYPERLINK("http://evil.example")')
+
+        response = self.client.post(url, {'action': 'export_jsonl', **selected})
+        self.assertNotIn('Content-Encoding', response)
+        self.assertEqual(response['Content-Type'], export.CONTENT_TYPES['jsonl'])
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines], self.ids[:2])
+
+
+@override_settings(CONTACT_RETENTION_DAYS=30, RETENTION_BATCH_SIZE=2, RETENTION_BATCH_PAUSE=0)
+class RetentionTests(TestCase):
+    """Old contacts are archived before they are deleted, in batches and within the time budget."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        archive_dir = override_settings(CONTACT_ARCHIVE_DIR=directory.name)
+        archive_dir.enable()
+        self.addCleanup(archive_dir.disable)
+
+        self.now = timezone.make_aware(datetime.datetime(2026, 6, 1))
+        self.old = []
+        for day in (1, 20, 40, 50, 60):
+            contact = Contact.objects.create(name='Old', email='old@example.com', subject='Hi', message=f'Day {day}')
+            Contact.objects.filter(pk=contact.pk).update(created_at=self.now - datetime.timedelta(days=30 + day))
+            self.old.append(contact.pk)
+        self.recent = Contact.objects.create(name='New', email='new@example.com', subject='Hi', message='Hello')
+        EmailOutbox.objects.create(contact_id=self.old[0])
+
+    def _archived(self):
+        records = []
+        for month in ('2026-03', '2026-04', '2026-05'):
+            with gzip.open(retention.archive_path(month), 'rt') as f:
+                records.extend(json.loads(line) for line in f)
+        return sorted(record['id'] for record in records)
+
+    def test_old_contacts_are_archived_then_deleted(self):
+        self.assertEqual(retention.archive_contacts(self.now, retention._Budget()), 5)
+        self.assertEqual(self._archived(), self.old)
+        self.assertEqual(list(Contact.objects.values_list('pk', flat=True)), [self.recent.pk])
+        self.assertFalse(EmailOutbox.objects.exists())
+
+    def test_run_stops_after_one_batch_when_out_of_time(self):
+        with override_settings(RETENTION_MAX_SECONDS=0):
+            self.assertEqual(retention.archive_contacts(self.now, retention._Budget()), 2)
+        self.assertEqual(Contact.objects.count(), 4)
+        # The next run carries on
+        self.assertEqual(retention.archive_contacts(self.now, retention._Budget()), 3)
+        self.assertEqual(self._archived(), self.old)
+
+    def test_nothing_is_archived_without_both_settings(self):
+        with override_settings(CONTACT_ARCHIVE_DIR=None), self.assertLogs('portfolio_app.retention', 'ERROR'):
+            self.assertEqual(retention.archive_contacts(self.now, retention._Budget()), 0)
+        with override_settings(CONTACT_RETENTION_DAYS=None):
+            self.assertEqual(retention.archive_contacts(self.now, retention._Budget()), 0)
+        self.assertEqual(Contact.objects.count(), 6)
+
+    def test_expired_sessions_are_purged_in_batches(self):
+        for i in range(5):
+            Session.objects.create(
+                session_key=f'expired{i}', session_data='', expire_date=self.now - datetime.timedelta(days=1),
+            )
+        Session.objects.create(session_key='live', session_data='', expire_date=self.now + datetime.timedelta(days=1))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(retention.purge_sessions(self.now, retention._Budget()), 5)
+        self.assertEqual(list(Session.objects.values_list('pk', flat=True)), ['live'])
+        deletes = [query['sql'] for query in queries if query['sql'].startswith('DELETE')]
+        self.assertEqual(len(deletes), 3)  # Batches of 2, 2 and 1
+
+    def test_lock_keeps_a_second_run_out(self):
+        if not redis_available():
+            self.skipTest('Redis is not reachable')
+        lock_key = f'test:retention:{uuid.uuid4().hex}'
+        patcher = mock.patch.object(retention, 'LOCK_KEY', lock_key)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        redis = redis_client.get_redis()
+
+        redis.set(lock_key, 'another run', ex=60)
+        self.assertIsNone(retention.run(self.now))
+        self.assertEqual(Contact.objects.count(), 6)
+
+        # A run whose lock was taken over does not delete the new holder's lock
+        def take_over(now, budget):
+            redis.set(lock_key, 'next run', ex=60)
+            return 0
+
+        redis.delete(lock_key)
+        with mock.patch.object(retention, 'archive_contacts', take_over), \
+                self.assertLogs('portfolio_app.retention', 'WARNING'):
+            self.assertEqual(retention.run(self.now), {'contacts': 0, 'sessions': 0})
+        self.assertEqual(redis.get(lock_key), b'next run')
+
+        redis.delete(lock_key)
+        self.assertEqual(retention.run(self.now), {'contacts': 5, 'sessions': 0})
+        self.assertIsNone(redis.get(lock_key))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class RateLimitTests(TestCase):
+    """Token buckets per client IP answer 429 before the view runs."""
+
+    def setUp(self):
+        # A fresh key prefix per test, so buckets never carry over
+        self.settings_override = override_settings(
+            RATELIMIT_ENABLED=True,
+            RATELIMIT_KEY_PREFIX=f'test:ratelimit:{uuid.uuid4().hex}:',
+            RATELIMIT_RULES={'contact': {'rate': '1/m', 'burst': 2}},
+            RATELIMIT_PROXY_COUNT=1,
+        )
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+    def test_429_once_the_bucket_is_empty(self):
+        for _ in range(2):
+            response = self.client.post('/', {}, REMOTE_ADDR='203.0.113.5')
+            self.assertNotEqual(response.status_code, 429)
+
+        with self.assertNumQueries(0):
+            response = self.client.post('/', {}, REMOTE_ADDR='203.0.113.5')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+
+        # Other clients and safe methods are not affected
+        self.assertNotEqual(self.client.post('/', {}, REMOTE_ADDR='203.0.113.6').status_code, 429)
+        self.assertNotEqual(self.client.get('/', REMOTE_ADDR='203.0.113.5').status_code, 429)
+
+    def _client_ip(self, remote_addr, forwarded=None):
+        meta = {'REMOTE_ADDR': remote_addr}
+        if forwarded is not None:
+            meta['HTTP_X_FORWARDED_FOR'] = forwarded
+        return ratelimit.client_ip(RequestFactory().get('/', **meta))
+
+    def test_client_ip_ipv4(self):
+        self.assertEqual(self._client_ip('10.0.0.2'), '10.0.0.2')
+        # The entry added by the proxy counts, whatever the client put in front of it
+        self.assertEqual(self._client_ip('10.0.0.2', '1.2.3.4, 198.51.100.7'), '198.51.100.7')
+        with override_settings(RATELIMIT_PROXY_COUNT=2):
+            self.assertEqual(self._client_ip('10.0.0.2', '1.2.3.4, 198.51.100.7'), '1.2.3.4')
+            # Fewer hops than proxies: fall back to the peer address
+            self.assertEqual(self._client_ip('10.0.0.2', '198.51.100.7'), '10.0.0.2')
+        with override_settings(RATELIMIT_PROXY_COUNT=0):
+            self.assertEqual(self._client_ip('10.0.0.2', '198.51.100.7'), '10.0.0.2')
+
+    def test_client_ip_ipv6(self):
+        self.assertEqual(self._client_ip('10.0.0.2', '2001:db8:1:2:3:4:5:6'), '2001:db8:1:2::/64')
+        self.assertEqual(
+            self._client_ip('10.0.0.2', '2001:db8:1:2:ffff::1'),
+            self._client_ip('10.0.0.2', '2001:db8:1:2::9'),
+        )
+        self.assertEqual(self._client_ip('10.0.0.2', '::ffff:198.51.100.7'), '198.51.100.7')
+        self.assertEqual(self._client_ip('2001:db8::1'), '2001:db8::/64')
+
+    def test_client_ip_invalid_address(self):
+        self.assertEqual(self._client_ip('10.0.0.2', 'not-an-ip'), 'not-an-ip')
+        self.assertEqual(self._client_ip(''), 'unknown')
+
+
+@override_settings(CACHES=LOCMEM_CACHES, RATELIMIT_ENABLED=False, EMAIL_OUTBOX_ENABLED=True, CAPTCHA_STATELESS=True)
+class DuplicateSubmissionTests(TestCase):
+    """The same submission posted twice creates one Contact and one email."""
+
+    def setUp(self):
+        cache.clear()
+        # Keep the Redis claims of each test apart (the database backstop works without Redis)
+        prefix = f'test:dup:{uuid.uuid4().hex}:'
+        for name, value in (('KEY_PREFIX', prefix), ('COUNTER_KEY', f'{prefix}suppressed')):
+            patcher = mock.patch.object(duplicates, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _post(self, **fields):
+        challenge = captcha.new_challenge()
+        data = {
+            'name': 'Ada',
+            'email': 'ada@example.com',
+            'subject': 'Hello',
+            'message': 'I would like to talk about a project.',
+            'captcha': solve(challenge),
+            'captcha_token': challenge.token,
+            **fields,
+        }
+        return self.client.post('/', data)
+
+    def test_same_submission_twice_creates_one_contact(self):
+        first = self._post()
+        self.assertRedirects(first, '/#contact-msg', fetch_redirect_response=False)
+        second = self._post()
+        # The duplicate gets the same answer as an accepted submission
+        self.assertRedirects(second, '/#contact-msg', fetch_redirect_response=False)
+        self.assertEqual(Contact.objects.count(), 1)
+        self.assertEqual(EmailOutbox.objects.count(), 1)
+
+    def test_case_and_whitespace_do_not_make_a_new_submission(self):
+        self._post()
+        self._post(email='ADA@example.com', subject=' hello ', message='I would  like to talk\nabout a project.')
+        self.assertEqual(Contact.objects.count(), 1)
+
+    def test_replayed_request_with_a_used_captcha_is_rejected(self):
+        challenge = captcha.new_challenge()
+        data = {
+            'name': 'Ada', 'email': 'ada@example.com', 'subject': 'Hello', 'message': 'Replay me',
+            'captcha': solve(challenge), 'captcha_token': challenge.token,
+        }
+        self.client.post('/', data)
+        with mock.patch.object(duplicates, 'record_suppressed') as suppressed:
+            response = self.client.post('/', data)
+        self.assertEqual(Contact.objects.count(), 1)
+        # The duplicate check only sees valid submissions: the replay fails the CAPTCHA
+        shown = [str(message) for message in get_messages(response.wsgi_request)]
+        self.assertEqual(shown[-1], 'Incorrect CAPTCHA answer. Please try again.')
+        suppressed.assert_not_called()
+
+    def test_database_catches_duplicates_without_redis(self):
+        with mock.patch.object(duplicates, 'claim', return_value=True):
+            self._post()
+            self._post()
+        self.assertEqual(Contact.objects.count(), 1)
+        self.assertEqual(EmailOutbox.objects.count(), 1)
+
+    def test_different_message_is_saved(self):
+        self._post()
+        self._post(message='Something else entirely.')
+        self.assertEqual(Contact.objects.count(), 2)
+
+
+@override_settings(RATELIMIT_ENABLED=False, OTP_MAX_ATTEMPTS=3, OTP_RESEND_COOLDOWN=61)
+class OtpLoginTests(TestCase):
+    """Admin OTP codes are single use, attempts are limited and resends cool down."""
+
+    @classmethod
+    def setUpClass(cls):
+        if not redis_available():
+            raise unittest.SkipTest('Redis is not reachable')
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        get_user_model().objects.create_user('staff', 'staff.member@example.com', 'pw', is_staff=True)
+
+    def setUp(self):
+        self.sent = []
+        prefix = override_settings(OTP_KEY_PREFIX=f'test:otp:{uuid.uuid4().hex}:')
+        prefix.enable()
+        self.addCleanup(prefix.disable)
+        for patcher in (
+            mock.patch.object(otp, 'new_code', side_effect=(f'{n}' * 6 for n in range(1, 10))),
+            mock.patch.object(views, 'send_otp', lambda email, code: self.sent.append(code)),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.url = reverse('admin_login_2fa')
+
+    def _sign_in(self):
+        response = self.client.post(self.url, {'step': 'credentials', 'username': 'staff', 'password': 'pw'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.sent, ['111111'])
+        return self.sent[-1]
+
+    def _submit(self, code):
+        return self.client.post(self.url, {'step': 'otp', 'otp': code})
+
+    def test_right_code_logs_in_once(self):
+        code = self._sign_in()
+        response = self._submit(code)
+        self.assertRedirects(response, reverse('admin:index'), fetch_redirect_response=False)
+        self.assertNotIn(otp.SESSION_KEY, self.client.session)
+
+        # Submitting the same code again does not log in (the store side is tested below)
+        self.client.logout()
+        response = self._submit(code)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('_auth_user_id', self.client.session)
+
+    def test_code_is_single_use_in_the_store(self):
+        token, code = otp.start(1, username='staff')
+        self.assertEqual(otp.verify(token, code), (otp.VERIFIED, 1))
+        self.assertEqual(otp.verify(token, code), (otp.EXPIRED, 0))
+
+    def test_lockout_after_max_attempts(self):
+        code = self._sign_in()
+        for attempts_left in (2, 1):
+            response = self._submit('000000')
+            self.assertIn(f'({attempts_left} attempts left)', response.context['error'])
+        response = self._submit('000000')
+        self.assertEqual(response.context['error'], 'Too many wrong OTPs. Please sign in again.')
+
+        # The login is gone: the right code no longer works
+        response = self._submit(code)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('_auth_user_id', self.client.session)
+
+    def test_resend_waits_for_the_cooldown(self):
+        self._sign_in()
+        response = self.client.post(self.url, {'step': 'otp', 'resend': '1'})
+        self.assertEqual(len(self.sent), 1)
+        self.assertTrue(0 < response.context['cooldown'] <= 61)
+        self.assertTrue(response.context['error'].startswith('Please wait'))
+
+        # A wrong code lifts the cooldown, so a new code can be requested at once
+        self._submit('000000')
+        response = self.client.post(self.url, {'step': 'otp', 'resend': '1'})
+        self.assertEqual(len(self.sent), 2)
+        self.assertEqual(response.context['info'], 'A new OTP has been sent to your email.')
+
+        # Resends keep the attempt count and only the newest code works
+        self.assertNotEqual(self.sent[1], '111111')
+        response = self._submit('111111')
+        self.assertIn('(1 attempts left)', response.context['error'])
+        response = self._submit(self.sent[1])
+        self.assertRedirects(response, reverse('admin:index'), fetch_redirect_response=False)
+
+    def test_resend_keeps_the_session_token_as_long_as_the_login(self):
+        self._sign_in()
+        _, ephemeral_key = SessionStore._redis_keys(self.client.session.session_key)
+        redis = redis_client.get_redis()
+        redis.expire(ephemeral_key, 5)
+
+        self._submit('000000')
+        self.client.post(self.url, {'step': 'otp', 'resend': '1'})
+        self.assertEqual(len(self.sent), 2)
+        self.assertGreater(redis.ttl(ephemeral_key), 5)
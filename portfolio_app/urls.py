@@ -5,12 +5,19 @@ This module defines the URL patterns for the portfolio application.
 Each URL pattern maps to a specific view function that handles the request.
 """
 
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# Native async views are used when the site is served by an ASGI worker
+contact_views = async_views if settings.ASYNC_VIEWS_ENABLED else views
 
 # URL patterns for the portfolio application
 urlpatterns = [
     # Homepage with contact form
-    path('', views.contact, name='contact'),
+    path('', contact_views.contact, name='contact'),
+
+    # Refresh the contact form CAPTCHA without reloading the page
+    path('captcha/refresh/', contact_views.refresh_captcha_ajax, name='refresh_captcha'),
     
 ]
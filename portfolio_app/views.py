@@ -14,6 +14,9 @@ from django.views.decorators.http import require_http_methods
 from django.utils import timezone
 from datetime import datetime
 from .forms import ContactForm
+from . import cache_backend, captcha, duplicates, otp, page_cache, ratelimit, readiness, redis_client, worker_monitor
+from .captcha import generate_captcha
+from .redis_client import RedisError
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.cache import cache_page
 from django.views.decorators.vary import vary_on_headers
@@ -29,7 +32,7 @@ from django.shortcuts import render, redirect
 from django.contrib.auth import authenticate, login as auth_login, get_user_model
 from django.contrib.auth.views import LoginView
 from django.conf import settings
-import random
+from django.utils.crypto import constant_time_compare
 
 from django.core.mail import send_mail
 
@@ -38,92 +41,29 @@ from django.template.loader import render_to_string
 from django.urls import reverse
 from django.http import HttpResponseRedirect
 
-import time
-
 # Import Celery tasks for async email sending
 try:
     from .tasks import send_contact_email, send_admin_otp_email
-    from celery import current_app
-    import redis
     CELERY_AVAILABLE = True
     CELERY_IMPORT_ERROR = None
 except ImportError as e:
     CELERY_AVAILABLE = False
     CELERY_IMPORT_ERROR = str(e)
-    current_app = None
-    redis = None
 
-User = get_user_model()
 
-# Cache for worker availability check (avoid repeated checks)
-_worker_check_cache = {'available': False, 'timestamp': 0}
-CACHE_DURATION = 30  # Cache for 30 seconds
+User = get_user_model()
 
 def is_celery_worker_available():
     """
-    Check if both Redis and Celery workers are available.
-    Returns True if both Redis is accessible and Celery workers are active, False otherwise.
-    Uses caching to avoid repeated checks within 30 seconds.
+    Check if Celery workers are available to take email tasks.
+
+    Reads the circuit breaker state kept in memory by the background worker
+    monitor, so it never blocks the request on Redis or a Celery ping.
     """
     if not CELERY_AVAILABLE:
         print(f"Celery not available: {CELERY_IMPORT_ERROR}")
         return False
-    
-    # Check cache first
-    current_time = time.time()
-    if current_time - _worker_check_cache['timestamp'] < CACHE_DURATION:
-        return _worker_check_cache['available']
-    
-    redis_available = False
-    celery_available = False
-    
-    try:
-        # Check Redis connection
-        redis_url = getattr(settings, 'CELERY_BROKER_URL', 'redis://127.0.0.1:6379/0')
-        
-        # Parse Redis URL to get connection details
-        if redis_url.startswith('redis://'):
-            url_parts = redis_url.replace('redis://', '').split('/')
-            host_port = url_parts[0].split(':')
-            host = host_port[0] if host_port[0] else '127.0.0.1'
-            port = int(host_port[1]) if len(host_port) > 1 else 6379
-            db = int(url_parts[1]) if len(url_parts) > 1 else 0
-        else:
-            host, port, db = '127.0.0.1', 6379, 0
-        
-        # Test Redis connection with timeout
-        r = redis.Redis(host=host, port=port, db=db, socket_timeout=2, socket_connect_timeout=2)
-        r.ping()
-        redis_available = True
-        print("Redis available")
-        
-    except Exception as e:
-        print(f"Redis not available: {str(e)}")
-        return False
-    
-    if redis_available:
-        try:
-            # Check if Celery workers are active with shorter timeout
-            from celery import current_app
-            inspect = current_app.control.inspect(timeout=1)  # Reduced to 1 second
-            
-            # Try ping first (faster than active())
-            ping_result = inspect.ping()
-            if ping_result and len(ping_result) > 0:
-                celery_available = True
-                print("Celery workers available")
-            else:
-                print("Celery workers not available")
-                    
-        except Exception as e:
-            print(f"Celery workers not available: {str(e)}")
-    
-    # Update cache
-    result = redis_available and celery_available
-    _worker_check_cache['available'] = result
-    _worker_check_cache['timestamp'] = current_time
-    
-    return result
+    return worker_monitor.is_available()
 
 def send_contact_email_sync(name, email, subject, message):
     """
@@ -193,24 +133,37 @@ def send_admin_otp_email_sync(user_email, otp_code):
         print(f'Failed to send admin OTP email: {str(e)}')
         return False
 
-def generate_captcha():
+def issue_captcha(request):
     """
-    Generate a random math problem for CAPTCHA.
-    Returns a tuple of (question, answer).
-    Ensures all results are positive numbers under 100.
+    Create a new CAPTCHA challenge for the contact form.
+
+    In stateless mode the answer travels in a signed token and the session is
+    left untouched; in session mode the answer is stored in the session.
+    Returns a ``captcha.Challenge``.
     """
-    # Generate numbers between 1 and 50 to ensure sum is under 100
-    num1 = random.randint(1, 50)
-    num2 = random.randint(1, 50)
-    
-    # Only use addition
-    answer = num1 + num2
-    
-    # Create the question string
-    question = f"{num1} + {num2} = ?"
-    
-    return (question, answer)
+    if captcha.is_stateless():
+        return captcha.new_challenge()
+    captcha_question, captcha_answer = generate_captcha()
+    request.session['captcha_answer'] = (captcha_question, captcha_answer)
+    return captcha.Challenge(captcha_question, '')
+
+def duplicate_submission(request, counted=False):
+    """
+    Answer a duplicate contact submission like an accepted one.
 
+    Args:
+        request: HTTP request object
+        counted (bool): The duplicate was already counted (by ``duplicates.save_once``)
+    """
+    if not counted:
+        duplicates.record_suppressed()
+    if not captcha.is_stateless():
+        # The CAPTCHA was answered, so it is used up like after a submission
+        issue_captcha(request)
+    messages.success(request, 'Your message has been sent successfully!')
+    return redirect('/#contact-msg')
+
+@ratelimit.limit('contact')
 @vary_on_headers('User-Agent')
 def contact(request):
     """
@@ -227,14 +180,34 @@ def contact(request):
         HttpResponse: Rendered home page with form or success message
     """
     if request.method == 'POST':
-        # Get the CAPTCHA answer from session
-        captcha_answer = request.session.get('captcha_answer')
+        # Get the CAPTCHA answer from session (stateless mode checks the signed token)
+        captcha_answer = None if captcha.is_stateless() else request.session.get('captcha_answer')
         
         # Process form submission
         form = ContactForm(request.POST, captcha_answer=captcha_answer)
         if form.is_valid():
+            # A valid resubmission of the same message (double click, a new
+            # CAPTCHA on the same text) gets the success response again
+            # without a new row or email
+            fingerprint = duplicates.fingerprint(form.cleaned_data)
+            if not duplicates.claim(fingerprint):
+                return duplicate_submission(request)
+
+            if getattr(settings, 'EMAIL_OUTBOX_ENABLED', True):
+                # Save the submission and its notification in one transaction;
+                # the Celery beat relay sends the email, so SMTP and Redis stay
+                # off the request path
+                if not duplicates.save_once(form, fingerprint):
+                    return duplicate_submission(request, counted=True)
+                if not captcha.is_stateless():
+                    # Generate new CAPTCHA for next submission
+                    issue_captcha(request)
+                messages.success(request, 'Your message has been sent successfully!')
+                return redirect('/#contact-msg')
+
             # Save form data to database
-            form.save()
+            if not duplicates.save_once(form, fingerprint, with_outbox=False):
+                return duplicate_submission(request, counted=True)
 
             # Extract form data for email
             name = form.cleaned_data['name']
@@ -256,7 +229,6 @@ def contact(request):
 
             try:
                 # Check if email password is configured
-                from django.conf import settings
                 if not settings.EMAIL_HOST_PASSWORD:
                     messages.error(request, 'Email configuration error: EMAIL_HOST_PASSWORD not set.')
                     return redirect('/#contact-msg')
@@ -269,21 +241,21 @@ def contact(request):
                 if is_celery_worker_available():
                     try:
                         result = send_contact_email.delay(name, email, subject, message)
+                        worker_monitor.record_success()
                         print(f"✅ Email sent Asynchronously (Task ID: {result.id})")
                         email_sent = True
                     except Exception as celery_error:
                         print(f"Async email failed, using synchronous email: {celery_error}")
+                        worker_monitor.record_failure()
                         email_sent = send_contact_email_sync(name, email, subject, message)
                 else:
                     print("✅ Email sent Synchronously ")
                     email_sent = send_contact_email_sync(name, email, subject, message)
                 
                 if email_sent:
-                    # Clear the CAPTCHA from session after successful submission
-                    request.session.pop('captcha_answer', None)
-                    # Generate new CAPTCHA for next submission
-                    captcha_question, captcha_answer = generate_captcha()
-                    request.session['captcha_answer'] = (captcha_question, captcha_answer)
+                    if not captcha.is_stateless():
+                        # Generate new CAPTCHA for next submission
+                        issue_captcha(request)
                     messages.success(request, 'Your message has been sent successfully!')
                 else:
                     messages.error(request, 'Failed to send email. Please try again later.')
@@ -296,14 +268,7 @@ def contact(request):
                 messages.error(request, 'An unexpected error occurred while processing your request.')
                 return redirect('/#contact-msg')
         else:
-            # Form is invalid - generate new CAPTCHA and show errors
-            captcha_question, captcha_answer = generate_captcha()
-            request.session['captcha_answer'] = (captcha_question, captcha_answer)
-            
-            # Recreate form with new CAPTCHA
-            form = ContactForm(request.POST, captcha_answer=(captcha_question, captcha_answer))
-            
-            # Add error message for CAPTCHA
+            # Form is invalid - show errors, the redirected GET issues a new CAPTCHA
             if 'captcha' in form.errors:
                 messages.error(request, 'Incorrect CAPTCHA answer. Please try again.')
             
@@ -311,10 +276,14 @@ def contact(request):
     else:
         # GET request - display empty form
         # Generate new CAPTCHA for fresh form
-        captcha_question, captcha_answer = generate_captcha()
-        request.session['captcha_answer'] = (captcha_question, captcha_answer)
+        challenge = issue_captcha(request)
+
+        # Serve the shared render and splice in this visitor's CSRF token,
+        # CAPTCHA and messages
+        if getattr(settings, 'HOMEPAGE_CACHE_ENABLED', True):
+            return page_cache.render_homepage(request, challenge)
         
-        form = ContactForm(captcha_answer=(captcha_question, captcha_answer))
+        form = ContactForm(captcha_challenge=challenge)
         # Clear any existing messages when page loads normally
         storage = messages.get_messages(request)
         storage.used = True
@@ -333,158 +302,134 @@ def mask_email(email):
         return email
 
 
+def send_otp(email, otp_code):
+    """Send an OTP email through Celery, or synchronously when no worker is available."""
+    if is_celery_worker_available():
+        try:
+            result = send_admin_otp_email.delay(email, otp_code)
+            worker_monitor.record_success()
+            print(f"OTP email sent asynchronously (Task ID: {result.id})")
+            return
+        except Exception as celery_error:
+            print(f"Async OTP failed, using synchronous email: {celery_error}")
+            worker_monitor.record_failure()
+    else:
+        print("OTP email sent synchronously (Celery not available)")
+    send_admin_otp_email_sync(email, otp_code)
+
+
+def otp_context(context, state):
+    """Fill the login page context of the OTP step from the login state in Redis."""
+    context['otp_required'] = True
+    context['username'] = state.get('username')
+    context['email'] = state.get('email')
+    context['masked_email'] = state.get('masked_email')
+    if state.get('cooldown'):
+        context['cooldown'] = state['cooldown']
+    return context
+
+
 #admin login 2fa
+@ratelimit.limit('admin_login')
 def admin_login_2fa(request):
     """
     Custom admin login view with OTP two-factor authentication.
     Step 1: Validate username/password, generate/send OTP, show OTP field.
     Step 2: Validate OTP, log in user.
     Also supports resending OTP with a cooldown.
+
+    The OTP state lives in Redis (portfolio_app.otp); the session only holds
+    its token, read or written once per step.
     """
     context = {'site_header': 'iharpreet Admin Panel'}
-    OTP_COOLDOWN_SECONDS = 61  # 2 minutes
-    now = int(time.time())
-    if request.method == 'POST':
-        step = request.POST.get('step', 'credentials')
-        username = request.POST.get('username')
-        password = request.POST.get('password')
-        otp = request.POST.get('otp')
-        resend = request.POST.get('resend')
+    token = request.session.get(otp.SESSION_KEY)
+    try:
+        if request.method != 'POST':
+            state = otp.get(token)
+            if state is None:
+                return render(request, 'admin/login.html', context)
+            return render(request, 'admin/login.html', otp_context(context, state))
 
+        step = request.POST.get('step', 'credentials')
         if step == 'credentials':
-            user = authenticate(request, username=username, password=password)
-            if user is not None and user.is_active and user.is_staff:
-                # Generate OTP
-                otp_code = str(random.randint(100000, 999999))
-                request.session['otp_user_id'] = user.id
-                request.session['otp_code'] = otp_code
-                request.session['otp_valid'] = True
-                request.session['otp_last_sent'] = now
-                request.session['otp_email'] = user.email
-                request.session['otp_stage'] = True  # Set OTP stage flag
-                # Send OTP via email with fallback mechanism
-                if is_celery_worker_available():
-                    try:
-                        result = send_admin_otp_email.delay(user.email, otp_code)
-                        print(f"OTP email sent asynchronously (Task ID: {result.id})")
-                    except Exception as celery_error:
-                        print(f"Async OTP failed, using synchronous email: {celery_error}")
-                        send_admin_otp_email_sync(user.email, otp_code)
-                else:
-                    print("OTP email sent synchronously (Celery not available)")
-                    send_admin_otp_email_sync(user.email, otp_code)
-                # Store username for GET
-                request.session['otp_username'] = username
-                # Store masked email for GET
-                request.session['otp_masked_email'] = mask_email(user.email)
-                # Redirect to avoid resending OTP on refresh
-                return HttpResponseRedirect(request.path)
-            else:
+            username = request.POST.get('username')
+            user = authenticate(request, username=username, password=request.POST.get('password'))
+            if user is None or not user.is_active or not user.is_staff:
                 context['error'] = 'Invalid username or password.'
                 return render(request, 'admin/login.html', context)
-        elif step == 'otp':
-            if resend:
-                # Resend OTP logic
-                otp_failed = request.session.get('otp_failed', False)
-                if not otp_failed:
-                    last_sent = request.session.get('otp_last_sent', 0)
-                    if now - last_sent < OTP_COOLDOWN_SECONDS:
-                        wait_seconds = OTP_COOLDOWN_SECONDS - (now - last_sent)
-                        context['otp_required'] = True
-                        context['username'] = username
-                        context['email'] = request.session.get('otp_email')
-                        context['masked_email'] = request.session.get('otp_masked_email')
-                        context['cooldown'] = wait_seconds
-                        context['otp_sent'] = False
-                        context['error'] = f'You Entered the wrong OTP. Please try to resend OTP'
-                        return render(request, 'admin/login.html', context)
-                # If otp_failed is True, allow immediate resend and reset the flag
-                request.session['otp_failed'] = False
-                # Generate and send new OTP asynchronously using Celery
-                user_id = request.session.get('otp_user_id')
-                user = User.objects.get(id=user_id)
-                otp_code = str(random.randint(100000, 999999))
-                request.session['otp_code'] = otp_code
-                request.session['otp_last_sent'] = now
-                request.session['otp_valid'] = True
-                request.session['otp_email'] = user.email
-                # Send OTP via email with fallback mechanism (resend)
-                if is_celery_worker_available():
-                    try:
-                        result = send_admin_otp_email.delay(user.email, otp_code)
-                        print(f"OTP email resent asynchronously (Task ID: {result.id})")
-                    except Exception as celery_error:
-                        print(f"Async OTP resend failed, using synchronous email: {celery_error}")
-                        send_admin_otp_email_sync(user.email, otp_code)
-                else:
-                    print("OTP email resent synchronously (Celery not available)")
-                    send_admin_otp_email_sync(user.email, otp_code)
-                context['otp_required'] = True
-                context['otp_sent'] = True
-                context['username'] = username
-                context['email'] = user.email
-                context['masked_email'] = mask_email(user.email)
-                context['info'] = 'A new OTP has been sent to your email.'
-                context['cooldown'] = OTP_COOLDOWN_SECONDS  # Always set cooldown after resending OTP
+            otp.discard(token)
+            token, otp_code = otp.start(
+                user.id, username=username, email=user.email, masked_email=mask_email(user.email),
+            )
+            request.session[otp.SESSION_KEY] = token
+            send_otp(user.email, otp_code)
+            # Redirect to avoid resending OTP on refresh
+            return HttpResponseRedirect(request.path)
+
+        if request.POST.get('resend'):
+            otp_code, wait_seconds = otp.resend(token) if token else (None, 0)
+            state = otp.get(token)
+            if state is None:
+                request.session.pop(otp.SESSION_KEY, None)
+                context['error'] = 'Your login has expired. Please sign in again.'
                 return render(request, 'admin/login.html', context)
-            # Normal OTP check
-            if request.session.get('otp_valid') and request.session.get('otp_code') == otp:
-                user_id = request.session.get('otp_user_id')
-                user = User.objects.get(id=user_id)
-                auth_login(request, user)
-                # Clean up session
-                request.session.pop('otp_code', None)
-                request.session.pop('otp_user_id', None)
-                request.session.pop('otp_valid', None)
-                request.session.pop('otp_last_sent', None)
-                request.session.pop('otp_email', None)
-                request.session.pop('otp_failed', None)
-                request.session.pop('otp_stage', None)
-                request.session.pop('otp_username', None)
-                return HttpResponseRedirect(reverse('admin:index'))
-            else:
-                context['otp_required'] = True
-                context['username'] = username
-                context['email'] = request.session.get('otp_email')
-                context['masked_email'] = request.session.get('otp_masked_email')
-                context['error'] = 'Invalid OTP. Please try again.'
-                request.session['otp_failed'] = True  # Set flag for immediate resend
+            otp_context(context, state)
+            if otp_code is None:
+                context['cooldown'] = wait_seconds
+                context['error'] = f'Please wait {wait_seconds} seconds before requesting a new OTP.'
                 return render(request, 'admin/login.html', context)
-    else:
-        # GET request
-        if request.session.get('otp_stage'):
-            context['otp_required'] = True
-            context['username'] = request.session.get('otp_username')
-            context['email'] = request.session.get('otp_email')
-            context['masked_email'] = request.session.get('otp_masked_email')
-            # Calculate cooldown
-            last_sent = request.session.get('otp_last_sent', 0)
-            seconds_left = OTP_COOLDOWN_SECONDS - (now - last_sent)
-            if seconds_left > 0:
-                context['cooldown'] = seconds_left
+            # The resend gave the login another OTP_TTL; restart the TTL of its token too
+            if hasattr(request.session, 'refresh_ephemeral'):
+                request.session.refresh_ephemeral()
+            send_otp(state['email'], otp_code)
+            context['otp_sent'] = True
+            context['info'] = 'A new OTP has been sent to your email.'
             return render(request, 'admin/login.html', context)
+
+        result, value = otp.verify(token, request.POST.get('otp'))
+        if result == otp.VERIFIED:
+            user = User.objects.filter(pk=value, is_active=True, is_staff=True).first()
+            request.session.pop(otp.SESSION_KEY, None)
+            if user is None:
+                context['error'] = 'Invalid username or password.'
+                return render(request, 'admin/login.html', context)
+            auth_login(request, user)
+            return HttpResponseRedirect(reverse('admin:index'))
+        if result in (otp.LOCKED, otp.EXPIRED):
+            request.session.pop(otp.SESSION_KEY, None)
+            if result == otp.LOCKED:
+                context['error'] = 'Too many wrong OTPs. Please sign in again.'
+            else:
+                context['error'] = 'Your login has expired. Please sign in again.'
+            return render(request, 'admin/login.html', context)
+        # A wrong code lifts the resend cooldown, so a new OTP can be requested at once
+        otp_context(context, otp.get(token) or {})
+        context['error'] = f'Invalid OTP. Please try again ({value} attempts left).'
         return render(request, 'admin/login.html', context)
+    except (RedisError, RuntimeError) as e:
+        print(f'Admin OTP login unavailable: {e}')
+        context['error'] = 'Login is temporarily unavailable. Please try again shortly.'
+        return render(request, 'admin/login.html', context, status=503)
 
 def admin_login_reset(request):
-    # Clear all OTP-related session variables
-    for key in [
-        'otp_user_id', 'otp_code', 'otp_valid', 'otp_last_sent', 'otp_email',
-        'otp_failed', 'otp_stage', 'otp_username', 'otp_masked_email']:
-        request.session.pop(key, None)
+    # Forget the OTP login and start over
+    otp.discard(request.session.pop(otp.SESSION_KEY, None))
     return redirect('admin_login_2fa')
 
 @csrf_exempt
+@ratelimit.limit('captcha_refresh', json_response=True)
 def refresh_captcha_ajax(request):
     """
     AJAX endpoint to refresh CAPTCHA without reloading the page.
+    In stateless mode the response carries the new signed token as well.
     """
     if request.method == 'POST':
         # Generate new CAPTCHA
-        captcha_question, captcha_answer = generate_captcha()
-        request.session['captcha_answer'] = (captcha_question, captcha_answer)
+        challenge = issue_captcha(request)
         
         return JsonResponse({
-            'question': captcha_question,
+            'question': challenge.question,
+            'token': challenge.token,
             'success': True
         })
     
@@ -501,3 +446,34 @@ def health_check(request):
         'service': 'portfolio-django',
         'timestamp': timezone.now().isoformat()
     })
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def ready(request):
+    """Readiness endpoint: dependency status from the background probes, 503 when not ready"""
+    is_ready, payload = readiness.snapshot()
+    return JsonResponse(payload, status=200 if is_ready else 503)
+
+
+def _metrics_allowed(request):
+    """Allow staff users, or scrapers presenting ``Authorization: Bearer <METRICS_TOKEN>``."""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token and constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return True
+    return request.user.is_authenticated and request.user.is_staff
+
+
+@require_http_methods(["GET"])
+def metrics(request):
+    """Per-process runtime metrics (JSON) for scraping."""
+    if not _metrics_allowed(request):
+        return JsonResponse({'error': 'Forbidden'}, status=403)
+    return JsonResponse({
+        'redis_pool': redis_client.pool_stats(),
+        'cache': cache_backend.stats(),
+        'ratelimit': ratelimit.stats(),
+        'contact_duplicates': duplicates.stats(),
+        'celery_worker_breaker': worker_monitor.get_state(),
+        'readiness': readiness.details(),
+    })
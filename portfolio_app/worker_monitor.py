@@ -0,0 +1,283 @@
+"""
+Background Celery worker availability monitor.
+
+Celery workers publish a heartbeat key to Redis with a TTL while they are
+running. Each web process runs a small daemon thread that reads the heartbeat
+every few seconds and feeds a circuit breaker whose state
+(closed / open / half-open) is stored in Redis, so every gunicorn worker and
+pod agrees on it.
+
+Each check advances the shared breaker in one Lua script, with the dispatch
+failures and successes the process saw since its last check: failures are
+added with ``HINCRBY`` (a live heartbeat does not reset them, so failures
+counted by different processes add up), a missing heartbeat or
+``WORKER_BREAKER_FAILURE_THRESHOLD`` failures open it, and a half-open
+breaker closes only once a trial dispatch has succeeded.
+
+A half-open breaker lets a single trial dispatch through across all
+processes: the check that takes the probe key (``SET NX``, expiring after
+``WORKER_BREAKER_RESET_TIMEOUT``) gives its process one dispatch, and every
+other process keeps the breaker closed to traffic until the trial's result
+closes or reopens it. A trial that is never reported (the process died)
+frees the probe key when it expires.
+
+The request path never touches the network: ``is_available()`` only reads a
+value kept in memory by the monitor thread (seeded from Redis once when the
+process starts it).
+"""
+
+import logging
+import os
+import socket
+import threading
+import time
+
+from . import redis_client
+from .conf import setting
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+HEARTBEAT_KEY = 'portfolio:celery:heartbeat'
+BREAKER_KEY = 'portfolio:celery:breaker'
+PROBE_KEY = 'portfolio:celery:breaker:probe'
+
+# KEYS[1]: breaker hash, KEYS[2]: worker heartbeat, KEYS[3]: half-open probe
+# ARGV: failures, successes (dispatches since the last check), now, threshold,
+# reset timeout, probe owner
+# Returns {new state, 1 if this check took the trial dispatch else 0}
+_ADVANCE = """
+local state = redis.call('HGET', KEYS[1], 'state') or 'open'
+local opened_at = tonumber(redis.call('HGET', KEYS[1], 'opened_at') or '0')
+local failures = tonumber(ARGV[1])
+local successes = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local alive = redis.call('EXISTS', KEYS[2]) == 1
+if state == 'closed' then
+    local count
+    if failures > 0 then
+        count = redis.call('HINCRBY', KEYS[1], 'failures', failures)
+    elseif successes > 0 then
+        count = 0
+        redis.call('HSET', KEYS[1], 'failures', 0)
+    else
+        count = tonumber(redis.call('HGET', KEYS[1], 'failures') or '0')
+    end
+    if count >= tonumber(ARGV[4]) or not alive then
+        state = 'open'
+        opened_at = now
+    end
+elseif state == 'half-open' then
+    if failures > 0 or not alive then
+        state = 'open'
+        opened_at = now
+    elseif successes > 0 then
+        state = 'closed'
+        redis.call('HSET', KEYS[1], 'failures', 0)
+    end
+elseif alive and now - opened_at >= tonumber(ARGV[5]) then
+    state = 'half-open'
+end
+redis.call('HSET', KEYS[1], 'state', state, 'opened_at', tostring(opened_at))
+local trial = 0
+if state == 'half-open' then
+    if redis.call('SET', KEYS[3], ARGV[6], 'NX', 'EX', math.max(1, tonumber(ARGV[5]))) then
+        trial = 1
+    end
+else
+    redis.call('DEL', KEYS[3])
+end
+return {state, trial}
+"""
+
+# In-memory view of the breaker for this process
+_state = {
+    'available': False,
+    'state': OPEN,
+    'pid': None,
+    'pending_failures': 0,
+    'pending_successes': 0,
+    'trial': False,  # This process holds the one dispatch of a half-open breaker
+    'checked_at': 0.0,
+    'script': None,
+}
+_start_lock = threading.Lock()
+_pending_lock = threading.Lock()  # Request threads and the monitor thread update the counters
+
+
+# ---------------------------------------------------------------------------
+# Request path
+# ---------------------------------------------------------------------------
+
+def is_available():
+    """
+    Return True if tasks can be sent to Celery.
+
+    This is a plain in-memory read; the monitor thread is started on first
+    use (and again after a fork).
+    """
+    if _state['pid'] != os.getpid():
+        start_monitor()
+    if _state['state'] == HALF_OPEN:
+        # Only the trial dispatch, once
+        with _pending_lock:
+            trial = _state['trial']
+            _state['trial'] = False
+        return trial
+    return _state['available']
+
+
+def get_state():
+    """Return the breaker state last seen by this process."""
+    return _state['state']
+
+
+def record_failure():
+    """
+    Report a failed task dispatch from the request path.
+
+    The breaker opens locally at once; the failure is pushed to the shared
+    state by the monitor thread on its next check.
+    """
+    with _pending_lock:
+        _state['pending_failures'] += 1
+        _state['available'] = False
+
+
+def record_success():
+    """
+    Report a successful task dispatch from the request path.
+
+    Pushed by the next check: it closes a half-open breaker and resets the
+    failure count of a closed one.
+    """
+    with _pending_lock:
+        _state['pending_successes'] += 1
+
+
+# ---------------------------------------------------------------------------
+# Monitor thread (web processes)
+# ---------------------------------------------------------------------------
+
+def start_monitor():
+    """Start the monitor thread for the current process if it is not running."""
+    with _start_lock:
+        if _state['pid'] == os.getpid():
+            return
+        _state['pid'] = os.getpid()
+        _state['pending_failures'] = 0
+        _state['pending_successes'] = 0
+        _state['trial'] = False
+        _state['script'] = None
+        _seed()
+        thread = threading.Thread(target=_monitor_loop, name='celery-worker-monitor', daemon=True)
+        thread.start()
+
+
+def _seed():
+    """Take the shared breaker state, so a new process does not start out open."""
+    _state['available'] = False
+    _state['state'] = OPEN
+    if redis_client.redis is None:
+        return
+    try:
+        state = redis_client.get_redis().hget(BREAKER_KEY, 'state')
+    except Exception as e:
+        logger.warning(f'Reading the worker breaker failed: {e}')
+        return
+    if state is not None:
+        # A half-open breaker stays shut here until a check takes the trial
+        _state['state'] = state.decode()
+        _state['available'] = _state['state'] == CLOSED
+
+
+def _monitor_loop():
+    interval = setting('WORKER_MONITOR_INTERVAL', 5)
+    while True:
+        try:
+            check()
+        except Exception as e:
+            logger.warning(f'Worker monitor check failed: {e}')
+            _state['available'] = False
+            _state['state'] = OPEN
+        time.sleep(interval)
+
+
+def check(now=None):
+    """
+    Advance the shared breaker with the dispatches reported since the last
+    check and update the in-memory state of this process.
+
+    Args:
+        now (float): Current time (defaults to ``time.time()``)
+    """
+    if redis_client.redis is None:
+        _state['available'] = False
+        _state['state'] = OPEN
+        return
+    client = redis_client.get_redis()
+    if _state['script'] is None:
+        _state['script'] = client.register_script(_ADVANCE)
+
+    with _pending_lock:
+        failures = _state['pending_failures']
+        successes = _state['pending_successes']
+    previous = _state['state']
+    state, trial = _state['script'](
+        keys=[BREAKER_KEY, HEARTBEAT_KEY, PROBE_KEY],
+        args=[
+            failures,
+            successes,
+            time.time() if now is None else now,
+            setting('WORKER_BREAKER_FAILURE_THRESHOLD', 3),
+            setting('WORKER_BREAKER_RESET_TIMEOUT', 30),
+            f'{socket.gethostname()}:{os.getpid()}',
+        ],
+        client=client,
+    )
+    state = state.decode() if isinstance(state, bytes) else state
+    if state != previous:
+        logger.info(f'Celery worker breaker: {previous} -> {state}')
+
+    with _pending_lock:
+        # Only what was pushed; dispatches reported meanwhile go with the next check
+        _state['pending_failures'] -= failures
+        _state['pending_successes'] -= successes
+        if state != HALF_OPEN:
+            _state['trial'] = False
+        elif trial:
+            _state['trial'] = True
+        _state['state'] = state
+        _state['available'] = state == CLOSED and not _state['pending_failures']
+    _state['checked_at'] = time.time()
+
+
+# ---------------------------------------------------------------------------
+# Heartbeat thread (Celery workers)
+# ---------------------------------------------------------------------------
+
+def start_heartbeat(hostname=None):
+    """
+    Publish a heartbeat for this Celery worker until the process exits.
+
+    Args:
+        hostname (str): Worker node name stored as the heartbeat value
+    """
+    hostname = hostname or socket.gethostname()
+    interval = setting('WORKER_HEARTBEAT_INTERVAL', 10)
+    ttl = setting('WORKER_HEARTBEAT_TTL', 30)
+
+    def beat():
+        while True:
+            try:
+                redis_client.get_redis().set(HEARTBEAT_KEY, hostname, ex=ttl)
+            except Exception as e:
+                logger.warning(f'Failed to publish worker heartbeat: {e}')
+            time.sleep(interval)
+
+    thread = threading.Thread(target=beat, name='celery-worker-heartbeat', daemon=True)
+    thread.start()
+    return thread
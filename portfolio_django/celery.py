@@ -4,6 +4,7 @@ Celery configuration for portfolio_django project.
 
 import os
 from celery import Celery
+from celery.signals import worker_process_shutdown, worker_ready
 
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'portfolio_django.settings')
@@ -35,3 +36,15 @@ def debug_task(self):
     return f'Debug task completed: {self.request!r}'
 
 
+@worker_ready.connect
+def start_worker_heartbeat(sender, **kwargs):
+    """Publish this worker's heartbeat so web processes can see it is alive."""
+    from portfolio_app import worker_monitor
+    worker_monitor.start_heartbeat(sender.hostname)
+
+
+@worker_process_shutdown.connect
+def close_smtp_connection(**kwargs):
+    """Close this worker process's persistent SMTP connection."""
+    from portfolio_app import smtp_pool
+    smtp_pool.close()
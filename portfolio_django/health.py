@@ -0,0 +1,52 @@
+"""
+Fast path for the liveness check, ahead of Django.
+
+Load-balancer, ECS and Docker probes hit ``/health/`` every few seconds per
+task. Routed through Django, each probe runs the whole middleware stack
+(sessions, CSRF, auth, messages...), URL resolution and a view, only to
+return a constant payload. These wrappers sit around the WSGI and ASGI
+applications and answer GET/HEAD ``/health/`` themselves with a prebuilt
+response; every other request goes to Django unchanged.
+"""
+
+import json
+
+HEALTH_PATHS = frozenset({'/health/', '/health'})
+HEALTH_METHODS = frozenset({'GET', 'HEAD'})
+
+HEALTH_BODY = json.dumps({'status': 'healthy', 'service': 'portfolio-django'}).encode()
+HEALTH_HEADERS = [
+    ('Content-Type', 'application/json'),
+    ('Content-Length', str(len(HEALTH_BODY))),
+    ('Cache-Control', 'no-store'),
+]
+
+
+class HealthCheckWSGIMiddleware:
+    """Answer liveness probes before the Django WSGI handler runs."""
+
+    def __init__(self, app):
+        self.app = app
+
+    def __call__(self, environ, start_response):
+        if environ.get('PATH_INFO') in HEALTH_PATHS and environ.get('REQUEST_METHOD') in HEALTH_METHODS:
+            start_response('200 OK', HEALTH_HEADERS)
+            return [b''] if environ['REQUEST_METHOD'] == 'HEAD' else [HEALTH_BODY]
+        return self.app(environ, start_response)
+
+
+class HealthCheckASGIMiddleware:
+    """Answer liveness probes before the Django ASGI handler runs."""
+
+    _headers = [(name.lower().encode(), value.encode()) for name, value in HEALTH_HEADERS]
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and scope['path'] in HEALTH_PATHS and scope['method'] in HEALTH_METHODS:
+            await send({'type': 'http.response.start', 'status': 200, 'headers': self._headers})
+            body = b'' if scope['method'] == 'HEAD' else HEALTH_BODY
+            await send({'type': 'http.response.body', 'body': body})
+            return
+        await self.app(scope, receive, send)
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -171,6 +172,12 @@ LOGGING = {
             'handlers': ['null'],
             'propagate': False,
         },
+        # collectstatic report of the static storage (critical CSS and precompression sizes)
+        'portfolio_app.storage': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
 
     # Root logger
@@ -236,6 +243,14 @@ TEMPLATES = [
 # WSGI_APPLICATION points to the WSGI application object
 WSGI_APPLICATION = "portfolio_django.wsgi.application"
 
+# ASGI_APPLICATION is used when running under an ASGI server (uvicorn worker)
+ASGI_APPLICATION = "portfolio_django.asgi.application"
+
+# Route the contact, CAPTCHA refresh and health views to their native async versions.
+# Enable together with an ASGI worker class; under WSGI async views only add overhead.
+ASYNC_VIEWS_ENABLED = os.environ.get('ASYNC_VIEWS_ENABLED', 'False').lower() in ('true', '1', 'yes')
+ASYNC_EMAIL_THREADS = 32  # Threads per process for blocking email I/O from async views
+
 
 
 
@@ -295,6 +310,172 @@ STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'static'),
 ]
 
+# Content-hashed file names (e.g. style.3f2a9c1b7e4d.css) and a manifest, so nginx
+# can serve collected files with immutable far-future caching. Dangling references in
+# vendored CSS (missing source maps) are left unhashed instead of failing collectstatic.
+# Development (DEBUG) and the test runner have no collected manifest, so they use the
+# plain storage, which serves the source files under their own names
+TESTING = sys.argv[1:2] == ['test']
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage" if DEBUG or TESTING
+        else "portfolio_app.storage.TolerantManifestStaticFilesStorage",
+    },
+}
+
+# STATIC FILE SERVING
+# Without nginx (ECS Fargate) gunicorn serves STATIC_ROOT itself, see portfolio_django.static_serving;
+# collectstatic writes .br/.gz copies of the text assets for it (and for nginx gzip_static)
+STATIC_SERVE_ENABLED = os.environ.get('STATIC_SERVE_ENABLED', 'True').lower() in ('true', '1', 'yes')
+STATIC_SERVE_MAX_AGE = 3600  # Seconds browsers cache files without a content hash in their name
+
+# STATIC ASSET BUNDLES
+# Built by `python manage.py build_bundles` and hashed by collectstatic
+STATIC_BUNDLES_DIR = os.path.join(BASE_DIR, 'build', 'static')  # Generated bundles (not in git)
+if os.path.isdir(STATIC_BUNDLES_DIR):
+    STATICFILES_DIRS.append(STATIC_BUNDLES_DIR)
+STATIC_BUNDLES_ENABLED = os.environ.get('STATIC_BUNDLES_ENABLED', str(not DEBUG)).lower() in ('true', '1', 'yes')
+STATIC_BUNDLES = {
+    # Third-party styles, rarely change
+    'bundles/vendor.css': [
+        'css/open-iconic-bootstrap.min.css',
+        'css/animate.css',
+        'css/owl.carousel.min.css',
+        'css/owl.theme.default.min.css',
+        'css/magnific-popup.css',
+        'css/aos.css',
+        'css/ionicons.min.css',
+        'css/flaticon.css',
+        'css/icomoon.css',
+    ],
+    'bundles/site.css': [
+        'css/style.css',
+        'css/custom.css',
+    ],
+    'bundles/vendor.js': [
+        'js/jquery.min.js',
+        'js/jquery-migrate-3.0.1.min.js',
+        'js/popper.min.js',
+        'js/bootstrap.min.js',
+        'js/jquery.easing.1.3.js',
+        'js/jquery.waypoints.min.js',
+        'js/jquery.stellar.min.js',
+        'js/owl.carousel.min.js',
+        'js/jquery.magnific-popup.min.js',
+        'js/aos.js',
+        'js/jquery.animateNumber.min.js',
+        'js/scrollax.min.js',  # main.js calls $.Scrollax()
+        'js/typing-animation.js',
+    ],
+    'bundles/site.js': [
+        'js/main.js',
+    ],
+}
+
+# RESPONSIVE IMAGES
+# Built by `python manage.py build_images` into STATIC_BUNDLES_DIR and hashed by collectstatic
+RESPONSIVE_IMAGES = ['images/*.png', 'images/*.jpg', 'images/*.jpeg']  # Static paths to process
+RESPONSIVE_IMAGES_EXCLUDE = [
+    'images/unused_*', 'images/favicon-*', 'images/android-chrome-*', 'images/apple-touch-icon.png',
+]
+RESPONSIVE_IMAGES_DIR = 'images/responsive'  # Static path of the variants and manifest.json
+RESPONSIVE_IMAGE_WIDTHS = [320, 480, 768, 1024, 1280, 1920]  # Never upscaled past the source width
+RESPONSIVE_IMAGE_FORMATS = ['avif', 'webp', 'jpeg']  # jpeg becomes png for transparent images
+RESPONSIVE_IMAGE_QUALITY = {'avif': 60, 'webp': 78, 'jpeg': 80}
+
+# CSS PURGE
+# build_bundles drops CSS rules whose selectors use names found in none of these files
+CSS_PURGE_ENABLED = True
+CSS_PURGE_CONTENT = [
+    os.path.join(BASE_DIR, 'portfolio_app', 'templates', '**', '*.html'),
+    os.path.join(BASE_DIR, 'static', 'js', 'main.js'),
+    os.path.join(BASE_DIR, 'static', 'js', 'typing-animation.js'),
+]
+CSS_PURGE_SAFELIST = [  # Classes added at runtime by the libraries; shell patterns allowed
+    'aos-*', 'owl-*', 'mfp-*',  # AOS, Owl Carousel, Magnific Popup
+    'animated', 'fadeIn*', 'ftco-animated', 'item-animate',  # Scroll animations (main.js)
+    'show', 'collapse', 'collapsing', 'fade', 'active', 'disabled', 'open',  # Bootstrap plugins
+    'scrolled', 'awake', 'sleep', 'is-sticky',  # Sticky navbar
+]
+
+# ICON FONTS
+# build_bundles subsets each font to the icons the templates use (WOFF2 only) and
+# bundles a trimmed copy of its stylesheet; needs fonttools and brotli
+ICON_FONT_SUBSET_ENABLED = True
+ICON_FONTS = {  # Icon stylesheet -> font to subset
+    'css/icomoon.css': 'fonts/icomoon/icomoon.ttf',
+    'css/ionicons.min.css': 'fonts/ionicons/fonts/ionicons.ttf',
+    'css/flaticon.css': 'fonts/flaticon/font/Flaticon.ttf',
+    'css/open-iconic-bootstrap.min.css': 'fonts/open-iconic/open-iconic.ttf',
+}
+
+# CRITICAL CSS
+# Built during collectstatic from the rules matching the markup above each template's
+# <!-- /above-the-fold --> marker; inlined by {% critical_css %} while the full bundles load async
+CRITICAL_CSS = {
+    'index.html': ['bundles/vendor.css', 'bundles/site.css'],
+    'base.html': ['bundles/vendor.css', 'bundles/site.css'],
+}
+CRITICAL_CSS_SAFELIST = [  # Classes added by JavaScript that affect first paint
+    'owl-loaded', 'owl-drag', 'owl-stage-outer', 'owl-stage', 'owl-item', 'active',
+    'scrolled', 'awake', 'sleep', 'show', 'ftco-animated', 'fadeIn', 'fadeInUp',
+]
+CRITICAL_CSS_MAX_BYTES = 14 * 1024  # Larger critical CSS is not inlined; None for no limit
+
+
+
+# HOMEPAGE PAGE CACHE
+# The anonymous homepage render is cached once per content version and only the
+# per-visitor parts (CSRF token, CAPTCHA question, messages) are filled in per request
+HOMEPAGE_CACHE_ENABLED = os.environ.get('HOMEPAGE_CACHE_ENABLED', 'True').lower() in ('true', '1', 'yes')
+HOMEPAGE_CACHE_VERSION = os.environ.get('HOMEPAGE_CACHE_VERSION', '')  # Bump per deploy/content change
+HOMEPAGE_CACHE_TIMEOUT = 60 * 60 * 24  # Keep a rendered version for a day
+HOMEPAGE_CACHE_LOCK_TIMEOUT = 10  # Seconds a render lock is held at most
+HOMEPAGE_CACHE_LOCK_WAIT = 2.0  # Seconds other processes wait for a render in progress
+
+
+
+# CONTACT ADMIN SEARCH
+# On MySQL the admin searches contacts with MATCH ... AGAINST on a FULLTEXT index
+# (portfolio_app.fulltext); 'boolean' requires every word (prefix match), 'natural'
+# ranks rows matching any word. Other databases use the regular LIKE search
+CONTACT_SEARCH_MODE = 'boolean'
+
+# CONTACT ADMIN PAGINATION
+# The contact changelist pages on the (created_at, id) index (portfolio_app.pagination)
+CONTACT_ADMIN_ESTIMATED_COUNT_THRESHOLD = 100_000  # Unfiltered lists above this many rows show MySQL's estimate instead of COUNT(*)
+CONTACT_ADMIN_MAX_OFFSET = 1000  # Numbered pages past this many rows seek from a key read off the index
+
+# CONTACT EXPORT
+# manage.py export_contacts and the admin export actions read contacts in primary-key
+# chunks (portfolio_app.export), so memory use does not grow with the table
+CONTACT_EXPORT_CHUNK_SIZE = 2000  # Rows per query and per written chunk
+
+# DUPLICATE SUBMISSIONS
+# A contact submission with the same email, subject and message as one accepted
+# within the window gets the success response without a new row or email
+# (portfolio_app.duplicates); Contact.fingerprint backs it up when Redis is down
+CONTACT_DUPLICATE_WINDOW = 600  # Seconds a submission fingerprint is remembered
+
+# RATE LIMITING
+# Token buckets per client IP in Redis (Lua, atomic), per-process buckets while
+# Redis is down; over-limit requests get a 429 before the view runs (portfolio_app.ratelimit)
+RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', 'True').lower() in ('true', '1', 'yes')
+RATELIMIT_RULES = {
+    'contact': {'rate': '5/m', 'burst': 5},  # Contact form POSTs
+    'captcha_refresh': {'rate': '30/m', 'burst': 10},  # CAPTCHA refresh POSTs
+    'admin_login': {'rate': '10/m', 'burst': 5},  # Admin login and OTP POSTs
+}
+RATELIMIT_PROXY_COUNT = int(os.environ.get('RATELIMIT_PROXY_COUNT', '0'))  # Proxies appending to X-Forwarded-For; set per deployment
+RATELIMIT_REDIS_RETRY = 5  # Seconds before Redis is tried again after an error
+RATELIMIT_LOCAL_MAX_KEYS = 10_000  # Per-process fallback buckets kept (least recently used dropped)
+
+# CAPTCHA
+# Stateless mode signs the CAPTCHA into an expiring token instead of storing it in the session
+CAPTCHA_STATELESS = os.environ.get('CAPTCHA_STATELESS', 'True').lower() in ('true', '1', 'yes')
+CAPTCHA_TOKEN_MAX_AGE = 600  # Seconds a CAPTCHA token stays valid
+
 
 
 # Media files (user-uploaded content)
@@ -321,11 +502,67 @@ EMAIL_HOST_PASSWORD = 'ldjqbszfodflytmf'  # Use Gmail App Password (not your Gma
 
 # EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD')  # Use Gmail App Password (not your Gmail password)
 
+# Celery workers keep one SMTP connection open per process (portfolio_app.smtp_pool)
+SMTP_CONNECTION_MAX_AGE = 300  # Seconds before a connection is recycled
+SMTP_IDLE_CHECK_AFTER = 30  # Idle seconds after which the connection is checked with NOOP
+
 
 # CELERY CONFIGURATION
 # Celery settings for async task processing
 REDIS_URL = os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/0')
 
+# Shared Redis connection pool (portfolio_app.redis_client)
+# REDIS_URL may be redis://[:password@]host:port/db, rediss:// for TLS or unix:///path/to/redis.sock?db=0
+REDIS_MAX_CONNECTIONS = 50  # Per-process pool limit
+REDIS_SOCKET_TIMEOUT = 2  # Seconds
+REDIS_SOCKET_CONNECT_TIMEOUT = 2  # Seconds
+REDIS_HEALTH_CHECK_INTERVAL = 30  # PING idle connections before reuse after this many seconds
+REDIS_SSL_CERT_REQS = os.environ.get('REDIS_SSL_CERT_REQS', 'required')  # For rediss:// URLs
+
+# CACHE
+# Two tiers: a bounded LRU in each process in front of the shared Redis (portfolio_app.cache_backend).
+# Writes are published over Redis pub/sub so every process drops its local copy
+CACHES = {
+    'default': {
+        'BACKEND': 'portfolio_app.cache_backend.TwoTierCache',
+        'KEY_PREFIX': 'cache',  # clear() only deletes these keys; the database also holds the Celery queues
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'LOCAL_MAX_ENTRIES': 500,  # Keys kept per process
+            'LOCAL_MAX_BYTES': 8 * 1024 * 1024,  # Serialized bytes kept per process
+            'LOCAL_TIMEOUT': 60,  # Longest a local copy is used without asking Redis
+        },
+    },
+}
+
+# SESSIONS
+# Stored in Redis with native expiry (portfolio_app.session_backend) instead of MySQL rows.
+# Ephemeral keys live apart from the session record with a short TTL, so changing only
+# them never rewrites the record; unchanged sessions are not written at all
+SESSION_ENGINE = 'portfolio_app.session_backend'
+SESSION_REDIS_KEY_PREFIX = 'session:'
+SESSION_EPHEMERAL_KEYS = (
+    'captcha_answer',  # Session-mode CAPTCHA, reissued on every homepage view
+    'otp_token',  # Admin OTP login; the login state itself is in Redis (portfolio_app.otp)
+)
+SESSION_EPHEMERAL_TTL = 600  # Seconds; an OTP login or CAPTCHA left idle longer starts over
+
+# ADMIN OTP LOGIN
+# Codes, attempt counters and resend cooldowns of the two-factor admin login live in
+# Redis hashes with native expiry (portfolio_app.otp), shared by every replica
+OTP_KEY_PREFIX = 'otp:'
+OTP_TTL = 600  # Seconds a login stays valid after the last code was sent
+OTP_RESEND_COOLDOWN = 61  # Seconds before another code may be requested (lifted by a wrong code)
+OTP_MAX_ATTEMPTS = 5  # Wrong codes before the login is dropped and the password is asked again
+
+# Readiness endpoint (/ready/), served from background probes (portfolio_app.readiness)
+READINESS_PROBE_INTERVAL = 5  # Seconds between dependency probes in each web process
+READINESS_MAX_AGE = 30  # Report not ready if the last probe is older than this
+READINESS_REQUIRED_CHECKS = ('database',)  # Probes that must pass; redis and celery are reported only
+
+# Token required by scrapers of /metrics/ (staff users can always read it)
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
 # Celery Configuration Options
 CELERY_BROKER_URL = REDIS_URL
 CELERY_RESULT_BACKEND = REDIS_URL
@@ -344,8 +581,68 @@ CELERY_TASK_EAGER_PROPAGATES = False
 CELERY_TASK_ROUTES = {
     'portfolio_app.tasks.send_contact_email': {'queue': 'emails'},
     'portfolio_app.tasks.send_admin_otp_email': {'queue': 'emails'},
+    'portfolio_app.tasks.send_outbox_email': {'queue': 'emails'},
+    'portfolio_app.tasks.send_outbox_batch': {'queue': 'emails'},
+    'portfolio_app.tasks.send_contact_digest': {'queue': 'emails'},
+}
+
+# Celery beat - schedules are stored in the database by django_celery_beat
+CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
+CELERY_BEAT_SCHEDULE = {
+    'relay-email-outbox': {
+        'task': 'portfolio_app.tasks.relay_email_outbox',
+        'schedule': 10.0,  # Seconds between outbox relay runs
+    },
+}
+
+# Email outbox
+# Contact notifications are written to an outbox table with the Contact row and
+# relayed to Celery workers by the beat task above
+EMAIL_OUTBOX_ENABLED = os.environ.get('EMAIL_OUTBOX_ENABLED', 'True').lower() in ('true', '1', 'yes')
+EMAIL_OUTBOX_BATCH_SIZE = 50  # Rows relayed per beat run
+EMAIL_OUTBOX_REQUEUE_AFTER = 600  # Seconds before a queued row that never finished is relayed again
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5  # Delivery attempts before a row is marked failed
+EMAIL_OUTBOX_SEND_BATCH_SIZE = 10  # Rows sent per worker task over one SMTP connection
+
+# Contact digest mode
+# During a spike, waiting contact notifications are sent as one digest email per
+# window instead of one email each; low volume keeps the per-message path
+CONTACT_DIGEST_ENABLED = os.environ.get('CONTACT_DIGEST_ENABLED', 'False').lower() in ('true', '1', 'yes')
+CONTACT_DIGEST_WINDOW = 300  # Seconds per digest window
+CONTACT_DIGEST_ACTIVATE_AT = 10  # Submissions per window (or backlog) that switch to digests
+CONTACT_DIGEST_THRESHOLD = 100  # Backlog that flushes a digest without waiting for the window
+CONTACT_DIGEST_MAX_ITEMS = 500  # Submissions per digest email
+CONTACT_DIGEST_MESSAGE_CHARS = 500  # Message text included per submission
+CELERY_BEAT_SCHEDULE['send-contact-digest'] = {
+    'task': 'portfolio_app.tasks.send_contact_digest',
+    'schedule': float(CONTACT_DIGEST_WINDOW),
+}
+
+# Data retention
+# A beat task archives old contacts to gzipped monthly JSON Lines files and deletes
+# them, then purges expired database sessions, in small primary-key batches with
+# pauses in between so MySQL never holds long locks (portfolio_app.retention).
+# Contacts are only archived once both settings below are given explicitly
+_retention_days = os.environ.get('CONTACT_RETENTION_DAYS', '')
+CONTACT_RETENTION_DAYS = int(_retention_days) if _retention_days else None  # Contacts older than this are archived
+CONTACT_ARCHIVE_DIR = os.environ.get('CONTACT_ARCHIVE_DIR') or None  # Must be a persistent volume
+RETENTION_BATCH_SIZE = 500  # Rows per delete transaction
+RETENTION_BATCH_PAUSE = 0.2  # Seconds between batches
+RETENTION_MAX_SECONDS = 240  # A run stops after this long; the next run carries on
+CELERY_BEAT_SCHEDULE['prune-old-data'] = {
+    'task': 'portfolio_app.tasks.prune_old_data',
+    'schedule': 3600.0,  # Seconds between retention runs
 }
 
 # Celery worker configuration
 CELERY_WORKER_PREFETCH_MULTIPLIER = 1
-CELERY_TASK_ACKS_LATE = True
\ No newline at end of file
+CELERY_TASK_ACKS_LATE = True
+
+# Celery worker monitor
+# Workers publish a heartbeat key to Redis; web processes poll it in the background
+# and keep a shared closed/open/half-open circuit breaker instead of pinging per request
+WORKER_HEARTBEAT_INTERVAL = 10  # Seconds between worker heartbeats
+WORKER_HEARTBEAT_TTL = 30  # Heartbeat expires if a worker stops publishing
+WORKER_MONITOR_INTERVAL = 5  # Seconds between background checks in web processes
+WORKER_BREAKER_FAILURE_THRESHOLD = 3  # Dispatch failures before the breaker opens
+WORKER_BREAKER_RESET_TIMEOUT = 30  # Seconds the breaker stays open before a half-open trial
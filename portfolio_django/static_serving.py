@@ -0,0 +1,298 @@
+"""
+Serve the collected static files without nginx.
+
+The production image runs gunicorn alone on ECS Fargate, so nothing serves
+``STATIC_URL`` there. These wrappers sit around the WSGI and ASGI
+applications, like ``portfolio_django.health``, and answer GET/HEAD requests
+for files in STATIC_ROOT themselves; every other request goes to Django
+unchanged.
+
+At startup STATIC_ROOT is indexed in memory: URL, size, ETag, content type and
+the ``.br``/``.gz`` variants written by collectstatic
+(``portfolio_app.static_compression``). A request is then a dict lookup and a
+file read:
+
+- the smallest precompressed variant the client accepts is sent, with
+  ``Vary: Accept-Encoding``;
+- content-hashed names (``site.3f2a9c1b7e4d.css``) are cached for a year as
+  immutable, other files for STATIC_SERVE_MAX_AGE seconds;
+- ``If-None-Match`` is answered with 304, a single byte ``Range`` with 206
+  from the uncompressed file.
+
+Under ASGI the file is opened and read in a worker thread, one chunk at a
+time, so a cold read from disk does not block the event loop.
+
+Files collected after the process started are not served until a restart;
+the image runs collectstatic before the server starts.
+"""
+
+import mimetypes
+import os
+import re
+from email.utils import formatdate
+
+from asgiref.sync import sync_to_async
+
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{12}\.[A-Za-z0-9]+$')
+SERVE_METHODS = frozenset({'GET', 'HEAD'})
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))  # Preferred first
+CHUNK_SIZE = 64 * 1024
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+mimetypes.add_type('font/woff2', '.woff2')
+mimetypes.add_type('image/avif', '.avif')
+mimetypes.add_type('image/webp', '.webp')
+mimetypes.add_type('application/manifest+json', '.webmanifest')
+
+
+class StaticFile:
+    """One file of STATIC_ROOT and its precompressed variants."""
+
+    __slots__ = ('path', 'size', 'etag', 'headers', 'variants')
+
+    def __init__(self, path, headers, variants):
+        stat = os.stat(path)
+        self.path = path
+        self.size = stat.st_size
+        self.etag = f'"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+        self.headers = headers + [('Last-Modified', formatdate(stat.st_mtime, usegmt=True))]
+        # Encoding -> (path, size, ETag); each representation needs its own ETag
+        self.variants = {
+            encoding: (variant, os.path.getsize(variant), f'"{int(stat.st_mtime):x}-{stat.st_size:x}-{encoding}"')
+            for encoding, variant in variants
+        }
+
+
+def _content_type(path):
+    content_type, _ = mimetypes.guess_type(path)
+    content_type = content_type or 'application/octet-stream'
+    if content_type.startswith('text/') or content_type in ('application/javascript', 'application/json'):
+        content_type += '; charset=utf-8'
+    return content_type
+
+
+def build_index(root, prefix, max_age):
+    """
+    Index every file under ``root`` by its URL.
+
+    Args:
+        root (str): STATIC_ROOT
+        prefix (str): URL path the files are served under, e.g. '/static/'
+        max_age (int): Cache lifetime in seconds of files without a hash in their name
+
+    Returns:
+        dict: URL path -> StaticFile
+    """
+    index = {}
+    if not root or not os.path.isdir(root):
+        return index
+    for dirpath, _, filenames in os.walk(root):
+        present = set(filenames)
+        for filename in filenames:
+            if filename[-3:] in ('.br', '.gz') and filename[:-3] in present:
+                continue  # Served through the original
+            path = os.path.join(dirpath, filename)
+            name = os.path.relpath(path, root).replace(os.sep, '/')
+            if HASHED_NAME_RE.search(filename):
+                cache_control = 'public, max-age=31536000, immutable'
+            else:
+                cache_control = f'public, max-age={max_age}'
+            variants = [(encoding, path + suffix) for encoding, suffix in ENCODINGS if filename + suffix in present]
+            headers = [
+                ('Content-Type', _content_type(filename)),
+                ('Cache-Control', cache_control),
+                ('X-Content-Type-Options', 'nosniff'),
+            ]
+            if variants:
+                headers.append(('Vary', 'Accept-Encoding'))
+            index[prefix + name] = StaticFile(path, headers, variants)
+    return index
+
+
+def _accepted_encodings(header):
+    accepted = set()
+    for part in header.lower().split(','):
+        coding, _, params = part.partition(';')
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                if float(params[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip())
+    return accepted
+
+
+def _etag_matches(header, etag):
+    if header.strip() == '*':
+        return True
+    return any(tag.strip().removeprefix('W/') == etag for tag in header.split(','))
+
+
+def _byte_range(header, size):
+    """Return (start, end) of a single satisfiable byte range, None to ignore it, or False if unsatisfiable."""
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        return None  # Multiple or malformed ranges: send the whole file
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        start, end = max(0, size - int(last)), size - 1
+    else:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def respond(static_file, method, accept_encoding='', if_none_match='', range_header=''):
+    """
+    Choose the response for a request of an indexed file.
+
+    Returns:
+        tuple: (status line, headers, file path or None, offset, length)
+    """
+    headers = list(static_file.headers)
+    path, size, etag = static_file.path, static_file.size, static_file.etag
+    if range_header:
+        headers.append(('Accept-Ranges', 'bytes'))
+    else:
+        accepted = _accepted_encodings(accept_encoding)
+        for encoding, _ in ENCODINGS:
+            if encoding in accepted and encoding in static_file.variants:
+                path, size, etag = static_file.variants[encoding]
+                headers.append(('Content-Encoding', encoding))
+                break
+        else:
+            headers.append(('Accept-Ranges', 'bytes'))
+    headers.append(('ETag', etag))
+
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return '304 Not Modified', headers, None, 0, 0
+
+    status, offset, length = '200 OK', 0, size
+    if range_header:
+        byte_range = _byte_range(range_header, size)
+        if byte_range is False:
+            headers.append(('Content-Range', f'bytes */{size}'))
+            headers.append(('Content-Length', '0'))
+            return '416 Range Not Satisfiable', headers, None, 0, 0
+        if byte_range:
+            offset, end = byte_range
+            length = end - offset + 1
+            status = '206 Partial Content'
+            headers.append(('Content-Range', f'bytes {offset}-{end}/{size}'))
+    headers.append(('Content-Length', str(length)))
+    return status, headers, (path if method == 'GET' else None), offset, length
+
+
+def iter_file(path, offset, length):
+    """Yield ``length`` bytes of a file from ``offset`` in chunks."""
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _read_chunk(f, offset, size):
+    f.seek(offset)
+    return f.read(size)
+
+
+def _settings_index():
+    from django.conf import settings
+
+    prefix = settings.STATIC_URL or ''
+    if not getattr(settings, 'STATIC_SERVE_ENABLED', False) or not prefix.startswith('/'):
+        # Disabled, or STATIC_URL points at another host (CDN/S3)
+        return {}
+    return build_index(settings.STATIC_ROOT, prefix, getattr(settings, 'STATIC_SERVE_MAX_AGE', 3600))
+
+
+class StaticFilesWSGIMiddleware:
+    """Serve collected static files before the Django WSGI handler runs."""
+
+    def __init__(self, app, index=None):
+        self.app = app
+        self.index = _settings_index() if index is None else index
+
+    def __call__(self, environ, start_response):
+        if environ.get('REQUEST_METHOD') not in SERVE_METHODS or not self.index:
+            return self.app(environ, start_response)
+        try:
+            # PATH_INFO carries the raw bytes as latin-1
+            url = environ.get('PATH_INFO', '').encode('latin-1').decode('utf-8')
+        except UnicodeError:
+            return self.app(environ, start_response)
+        static_file = self.index.get(url)
+        if static_file is None:
+            return self.app(environ, start_response)
+
+        status, headers, path, offset, length = respond(
+            static_file,
+            environ['REQUEST_METHOD'],
+            environ.get('HTTP_ACCEPT_ENCODING', ''),
+            environ.get('HTTP_IF_NONE_MATCH', ''),
+            environ.get('HTTP_RANGE', ''),
+        )
+        start_response(status, headers)
+        if path is None:
+            return [b'']
+        if status.startswith('200') and 'wsgi.file_wrapper' in environ:
+            # Lets gunicorn use sendfile()
+            return environ['wsgi.file_wrapper'](open(path, 'rb'), CHUNK_SIZE)
+        return iter_file(path, offset, length)
+
+
+class StaticFilesASGIMiddleware:
+    """Serve collected static files before the Django ASGI handler runs."""
+
+    def __init__(self, app, index=None):
+        self.app = app
+        self.index = _settings_index() if index is None else index
+
+    async def __call__(self, scope, receive, send):
+        static_file = None
+        if scope['type'] == 'http' and scope['method'] in SERVE_METHODS and self.index:
+            static_file = self.index.get(scope['path'])
+        if static_file is None:
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = {name: value for name, value in scope['headers']}
+        status, headers, path, offset, length = respond(
+            static_file,
+            scope['method'],
+            request_headers.get(b'accept-encoding', b'').decode('latin-1'),
+            request_headers.get(b'if-none-match', b'').decode('latin-1'),
+            request_headers.get(b'range', b'').decode('latin-1'),
+        )
+        await send({
+            'type': 'http.response.start',
+            'status': int(status[:3]),
+            'headers': [(name.lower().encode(), value.encode('latin-1')) for name, value in headers],
+        })
+        if path is None:
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+        # Disk reads go to a worker thread, not the event loop
+        f = await sync_to_async(open, thread_sensitive=False)(path, 'rb')
+        try:
+            read = sync_to_async(_read_chunk, thread_sensitive=False)
+            while True:
+                chunk = await read(f, offset, min(CHUNK_SIZE, length)) if length > 0 else b''
+                offset += len(chunk)
+                length -= len(chunk)
+                more_body = bool(chunk) and length > 0
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': more_body})
+                if not more_body:
+                    break
+        finally:
+            f.close()
@@ -18,10 +18,18 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from portfolio_app.views import admin_login_2fa, admin_login_reset, health_check
+from portfolio_app import async_views
+from portfolio_app.views import admin_login_2fa, admin_login_reset, health_check, metrics, ready
+
+# Native async health checks when served by an ASGI worker
+if settings.ASYNC_VIEWS_ENABLED:
+    health_check = async_views.health_check
+    ready = async_views.ready
 
 urlpatterns = [
     path("health/", health_check, name="health_check"),  # Health check for ECS
+    path("ready/", ready, name="ready"),  # Readiness: MySQL, Redis and Celery status
+    path("metrics/", metrics, name="metrics"),  # Per-process runtime metrics
     path("admin/login/", admin_login_2fa, name="admin_login_2fa"),
     path("admin/reset/", admin_login_reset, name="admin_login_reset"),
     path("admin/", admin.site.urls),
@@ -11,6 +11,15 @@ import os
 
 from django.core.wsgi import get_wsgi_application
 
+from portfolio_django.health import HealthCheckWSGIMiddleware
+from portfolio_django.static_serving import StaticFilesWSGIMiddleware
+
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "portfolio_django.settings")
 
-application = get_wsgi_application()
+# /health/ and the collected static files are answered by the wrappers without entering Django
+application = HealthCheckWSGIMiddleware(StaticFilesWSGIMiddleware(get_wsgi_application()))
+
+# Probe the dependencies from the start, so /ready/ has results by the first poll
+from portfolio_app import readiness  # noqa: E402  (needs the apps loaded above)
+
+readiness.start_probes()
@@ -12,9 +12,9 @@ from pathlib import Path
 def check_redis_connection():
     """Check if Redis is accessible."""
     try:
-        import redis
-        r = redis.Redis(host='localhost', port=6379, db=0)
-        r.ping()
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'portfolio_django.settings')
+        from portfolio_app.redis_client import get_redis
+        get_redis().ping()
         print("✅ Redis connection successful")
         return True
     except Exception as e: